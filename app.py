@@ -2,9 +2,29 @@
 Title Pattern Analysis Dashboard
 Analyzes product title patterns from Google Shopping scrape data.
 """
+import multiprocessing
+import sqlite3
+from typing import Mapping, Optional, Union
+
 import streamlit as st
 import pandas as pd
-from utils.title_parser import parse_title
+from config.attributes import get_dictionary_version
+from utils.analysis import DEFAULT_SHOPPING_RESULTS, ParsedUpload, calculate_pattern_stats, with_attributes
+from utils.arrow_io import parsed_table, table_bytes
+from utils.arrow_strings import ArrowStrings
+from utils.columnar import PatternIndex
+from utils.parse_cache import ParseStore
+from utils.pattern_groups import PatternGroups
+from utils.pattern_state import PatternState
+from utils.profiling import ParseProfiler, profile_parsing
+from utils.streaming import StreamingAnalysis, content_digest, iter_scrape_chunks, read_scrape
+from utils.title_parser import parse_title_uncached, parser_pool
+
+# Category selector labels (other categories are title-cased)
+CATEGORY_LABELS = {"auto": "Auto-Detect", "auto-words": "Auto-Detect (whole words)"}
+
+# Example listings kept per pattern card (3 shown + 50 under "View more")
+MAX_CARD_EXAMPLES = 53
 
 # Page config
 st.set_page_config(
@@ -14,70 +34,187 @@ st.set_page_config(
 )
 
 
+def upload_key(uploaded_file) -> str:
+    """
+    Content hash of an upload, computed once per uploaded file.
+
+    Cached steps below take the upload (and the columns derived from it) as
+    underscore parameters, which st.cache_data doesn't hash, and are keyed
+    on this digest instead.
+    """
+    digests = st.session_state.setdefault('upload_digests', {})
+    if uploaded_file.file_id not in digests:
+        digests[uploaded_file.file_id] = content_digest(uploaded_file)
+    return digests[uploaded_file.file_id]
+
+
 @st.cache_data
-def load_data(uploaded_file) -> pd.DataFrame:
-    """Load and prepare the CSV data."""
-    df = pd.read_csv(uploaded_file)
+def load_data(_uploaded_file, upload_key: str) -> pd.DataFrame:
+    """Load the title, position and keyword columns of a CSV, Parquet or Arrow upload."""
+    _uploaded_file.seek(0)
+    df = read_scrape(_uploaded_file)
     return df
 
 
-@st.cache_data
-def analyze_patterns(df_hash: str, titles: list, positions: list, keywords: list, category: str) -> pd.DataFrame:
-    """Parse titles and analyze patterns."""
-    parsed_results = []
-    for i, title in enumerate(titles):
-        result = parse_title(title, category)
-        parsed_results.append({
-            'title': title,
-            'position': positions[i] if i < len(positions) else 0,
-            'keyword': keywords[i] if keywords and i < len(keywords) else '',
-            'pattern': result['pattern'],
-            'attributes': result['attributes'],
-            'attribute_types': [attr['type'] for attr in result['attributes']],
-        })
+@st.cache_resource
+def get_parse_store():
+    """
+    Persistent parse cache shared with other sessions and CLI runs (None if unavailable).
 
-    return pd.DataFrame(parsed_results)
+    Opened once per server process; results from older dictionary versions
+    are deleted then, so the file doesn't keep every past version.
+    """
+    try:
+        store = ParseStore()
+        store.prune(get_dictionary_version())
+        return store
+    except (OSError, sqlite3.Error):
+        return None
 
 
-def calculate_pattern_stats(parsed_df: pd.DataFrame, total_shopping_results: int = 40) -> pd.DataFrame:
+@st.cache_resource
+def get_parser_pool():
     """
-    Calculate statistics for each pattern.
+    Parser processes shared by every session (None on a single CPU).
 
-    Performance % = what percentage of competitors you're outranking
-    Based on typical Google Shopping showing ~40 results.
+    Started once and spawned rather than forked, so the workers don't
+    inherit the Streamlit server's threads.
     """
-    total_listings = len(parsed_df)
+    return parser_pool(0, "auto", multiprocessing.get_context("spawn"))
 
-    pattern_stats = parsed_df.groupby('pattern').agg({
-        'title': 'count',
-        'position': 'mean',
-    }).reset_index()
 
-    pattern_stats.columns = ['pattern', 'count', 'avg_position']
+@st.cache_data
+def load_keywords(_uploaded_file, upload_key: str) -> list:
+    """Distinct keywords in the upload, in order of appearance, read in chunks."""
+    _uploaded_file.seek(0)
+    keywords = {}
+    for chunk in iter_scrape_chunks(_uploaded_file):
+        if 'keyword' not in chunk.columns:
+            return []
+        keywords.update(dict.fromkeys(chunk['keyword'].unique()))
+    return list(keywords)
 
-    # Usage % = what percentage of listings use this pattern
-    pattern_stats['usage_pct'] = (pattern_stats['count'] / total_listings * 100).round(1)
 
-    # Performance % = what percentage of results are you ranking above
-    # Position 1 = above 97.5%, Position 10 = above 75%
-    pattern_stats['performance_pct'] = (
-        (1 - pattern_stats['avg_position'] / total_shopping_results) * 100
-    ).round(1)
-    pattern_stats['performance_pct'] = pattern_stats['performance_pct'].clip(0, 100)
+@st.cache_data
+def stream_patterns(_uploaded_file, upload_key: str, category: str, keyword: str, deduplicate: bool,
+                    normalize: bool, dictionary_version: str,
+                    shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS):
+    """Low-memory analysis: fold the upload chunk by chunk, keeping only card examples."""
+    _uploaded_file.seek(0)
+    analysis = StreamingAnalysis(category, keyword, deduplicate, store=get_parse_store(),
+                                 max_examples=MAX_CARD_EXAMPLES, normalize=normalize, executor=get_parser_pool())
+    for chunk in iter_scrape_chunks(_uploaded_file):
+        analysis.add_chunk(chunk)
+    pattern_stats, popular_attrs, examples = analysis.finish(shopping_results)
+    return pattern_stats, popular_attrs, examples, analysis.state, analysis.rows_read, analysis.rows_excluded
+
+
+@st.cache_resource(max_entries=4)
+def parse_upload(cache_key: tuple, _df: pd.DataFrame, category: str) -> ParsedUpload:
+    """
+    Parse every distinct title of an upload once.
+
+    cache_key is the upload digest and dictionary version; the frame itself
+    is not hashed. Held as a shared resource rather than copied out of the
+    cache on every rerun, since keyword and dedup changes only take views.
+    """
+    # Titles already in the on-disk cache are not parsed again; the rest are
+    # parsed in the shared process pool for large uploads
+    return ParsedUpload(_df, category, store=get_parse_store(), executor=get_parser_pool())
+
+
+@st.cache_data(max_entries=8)
+def group_patterns(view_key: tuple, group_by: str, low_memory: bool,
+                   shopping_results: Union[int, Mapping[str, int]], _pattern_stats: pd.DataFrame,
+                   _parsed_df: pd.DataFrame, _state: Optional[PatternState]) -> tuple[pd.DataFrame, PatternIndex]:
+    """
+    Pattern stats and index with similar patterns merged, built once per view
+    and grouping instead of on every sort or page change.
+
+    Stats are exact from the parsed rows, or (low-memory, where the rows are
+    only card examples) from the streamed pattern totals in _state.
+    """
+    groups = PatternGroups(_pattern_stats['pattern'], group_by)
+    if low_memory:
+        pattern_stats = groups.rollup(_state, total_shopping_results=shopping_results)
+    else:
+        pattern_stats = groups.rollup_rows(_parsed_df, shopping_results)
+    return pattern_stats, PatternIndex.from_labels(groups.relabel(_parsed_df['pattern']))
 
-    pattern_stats = pattern_stats.sort_values('count', ascending=False)
 
-    return pattern_stats
+@st.cache_data(max_entries=4)
+def build_exports(view_key: tuple, _parsed_df: pd.DataFrame, _parsed_columns) -> tuple[str, bytes]:
+    """
+    CSV and Parquet exports of every parsed row of a view.
 
+    view_key is the upload digest, category, keyword, dedup options and
+    dictionary version; the frames are not hashed. Building the exports
+    takes seconds for a large upload, so reruns that keep the view reuse them.
+    """
+    export_csv = with_attributes(_parsed_df, _parsed_columns).to_csv(index=False)
+    # Attributes as a list-of-struct column, without the CSV round-trip
+    export_parquet = table_bytes(parsed_table(_parsed_df, _parsed_columns), 'parquet')
+    return export_csv, export_parquet
 
-def get_popular_attributes(parsed_df: pd.DataFrame) -> dict:
-    """Get most common attributes across all titles."""
-    all_attrs = []
-    for attrs in parsed_df['attribute_types']:
-        all_attrs.extend(attrs)
 
-    attr_counts = pd.Series(all_attrs).value_counts()
-    return attr_counts.to_dict()
+@st.cache_data
+def profile_titles(cache_key: tuple, _titles: ArrowStrings, category: str) -> ParseProfiler:
+    """Parse the distinct titles again, bypassing the caches, with stage timings on."""
+    with profile_parsing() as profiler:
+        for title in dict.fromkeys(_titles):
+            parse_title_uncached(title, category)
+    return profiler
+
+
+def render_profile(profiler: ParseProfiler, category: str):
+    """Show where parse time goes and which dictionary entries never match."""
+    profile = profiler.to_dict()
+    with st.expander(f"⏱️ Parsing profile ({profile['titles']} titles, {profile['total_seconds']:.2f}s)"):
+        st.markdown("**Time per stage**")
+        st.dataframe(pd.DataFrame([
+            {'stage': stage, 'seconds': stats['seconds'], 'share %': stats['share'] * 100, 'calls': stats['calls']}
+            for stage, stats in profile['stages'].items()
+        ]), hide_index=True)
+
+        st.markdown("**Time per attribute type** (dictionary lookups)")
+        st.dataframe(pd.DataFrame([
+            {'attribute': attr_type, **stats} for attr_type, stats in profile['attributes'].items()
+        ]), hide_index=True)
+
+        dead = [
+            {'attribute': attr_type, 'value': value}
+            for attr_type, values in profiler.dead_entries(category).items() for value in values
+        ]
+        st.markdown(f"**Dictionary entries that never matched:** {len(dead)}")
+        if dead:
+            st.dataframe(pd.DataFrame(dead), hide_index=True)
+
+        st.download_button(
+            label="📥 Export Prometheus metrics",
+            data=profiler.to_prometheus(),
+            file_name="parse_profile.prom",
+            mime="text/plain"
+        )
+
+
+def shopping_results_input(keywords: list) -> Union[int, dict]:
+    """
+    Shopping results that performance % is measured against: one number,
+    or a {keyword: results} mapping once any keyword is given its own.
+    """
+    total = st.number_input("Shopping results per keyword", min_value=1, value=DEFAULT_SHOPPING_RESULTS,
+                            help="Performance % is the share of a keyword's results a listing ranks above")
+    keywords = [keyword for keyword in keywords if isinstance(keyword, str)]
+    if not keywords:
+        return total
+    with st.expander("Shopping results by keyword"):
+        edited = st.data_editor(
+            pd.DataFrame({'keyword': keywords, 'shopping_results': total}),
+            column_config={'shopping_results': st.column_config.NumberColumn(min_value=1, step=1, required=True)},
+            disabled=['keyword'], hide_index=True,
+        )
+    results = dict(zip(edited['keyword'], edited['shopping_results'].astype(int)))
+    return total if all(value == total for value in results.values()) else results
 
 
 def format_attribute_tags(attributes: list) -> str:
@@ -102,8 +239,33 @@ def format_attribute_tags(attributes: list) -> str:
     return " ".join(tags)
 
 
-def render_pattern_card(pattern: str, stats: dict, examples: pd.DataFrame, total_listings: int):
-    """Render a pattern analysis card using native Streamlit components."""
+def example_table(examples: pd.DataFrame) -> pd.DataFrame:
+    """Example listings as one display table, attributes joined into a single column."""
+    table = pd.DataFrame({
+        'Title': examples['title'],
+        'Position': examples['position'],
+    })
+    if 'keyword' in examples.columns and examples['keyword'].astype(bool).any():
+        table['Keyword'] = examples['keyword']
+    if 'attributes' in examples.columns:
+        table['Attributes'] = [
+            " → ".join(f"{attr['type']}: {attr['value']}" for attr in attributes)
+            for attributes in examples['attributes']
+        ]
+    return table
+
+
+def card_examples(examples: pd.DataFrame, parsed_columns) -> pd.DataFrame:
+    """Example rows with their attributes (low-memory examples already carry them)."""
+    return examples if parsed_columns is None else with_attributes(examples, parsed_columns)
+
+
+def render_pattern_card(pattern: str, stats: dict, examples: pd.DataFrame, total_listings: int, parsed_columns):
+    """
+    Render a pattern analysis card using native Streamlit components.
+
+    Only the examples that are shown get their attributes expanded.
+    """
     with st.container():
         # Header row with badges
         col1, col2, col3, col4 = st.columns([1, 1, 2, 2])
@@ -117,49 +279,172 @@ def render_pattern_card(pattern: str, stats: dict, examples: pd.DataFrame, total
 
         # Formula
         st.markdown(f"**FORMULA:** {pattern}")
-        st.caption(f"Avg. Position: {stats['avg_position']:.1f}")
-
-        # Example listings with attribute breakdown
-        for _, row in examples.head(3).iterrows():
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                st.markdown(f"**{row['title']}**")
-                # Show keyword tag if available
-                keyword = row.get('keyword', '')
-                if keyword:
-                    st.caption(f"🏷️ Keyword: `{keyword}`")
-                # Show attribute breakdown
-                attributes = row.get('attributes', [])
-                if attributes:
-                    attr_display = " → ".join([f"`{attr['type']}: {attr['value']}`" for attr in attributes])
-                    st.caption(attr_display)
-            with col2:
-                st.markdown(f"Position: **{row['position']}**")
-
-        if len(examples) > 3:
-            remaining = len(examples) - 3
-            with st.expander(f"View more ({remaining} more listings)"):
-                # Limit to 50 more to prevent timeout
-                for _, row in examples.iloc[3:53].iterrows():
-                    col1, col2 = st.columns([4, 1])
-                    with col1:
-                        st.markdown(f"**{row['title']}**")
-                        # Show keyword tag if available
-                        keyword = row.get('keyword', '')
-                        if keyword:
-                            st.caption(f"🏷️ Keyword: `{keyword}`")
-                        attributes = row.get('attributes', [])
-                        if attributes:
-                            attr_display = " → ".join([f"`{attr['type']}: {attr['value']}`" for attr in attributes])
-                            st.caption(attr_display)
-                    with col2:
-                        st.markdown(f"Position: **{row['position']}**")
+        if stats.get('patterns') and stats['patterns'] > 1:
+            st.caption(f"Groups {int(stats['patterns'])} similar patterns")
+        position_caption = f"Avg. Position: {stats['avg_position']:.1f}"
+        # Low-memory stats only carry the running totals, not the rank spread
+        if stats.get('median_position') is not None:
+            position_caption += (f" · Median: {stats['median_position']:.1f}"
+                                 f" · Top 3: {stats['top3_share']:.0f}%")
+        st.caption(position_caption)
+
+        # Example listings with attribute breakdown, as one element rather than widgets per listing
+        lines = []
+        for row in card_examples(examples.head(3), parsed_columns).to_dict('records'):
+            lines.append(f"**{row['title']}** · Position: **{row['position']}**")
+            # Show keyword tag if available
+            keyword = row.get('keyword', '')
+            if keyword:
+                lines.append(f":gray[🏷️ Keyword: `{keyword}`]")
+            # Show attribute breakdown
+            attributes = row.get('attributes', [])
+            if attributes:
+                lines.append(":gray[" + " → ".join([f"`{attr['type']}: {attr['value']}`" for attr in attributes]) + "]")
+        if lines:
+            st.markdown("  \n".join(lines))
+
+        if stats['count'] > 3:
+            remaining = stats['count'] - 3
+            # A toggle rather than an expander: the table is only built once it is switched on
+            if st.toggle(f"View more ({remaining} more listings)", key=f"more:{pattern}"):
+                # One table instead of a row of widgets per listing (limit to 50 more)
+                st.dataframe(example_table(card_examples(examples.iloc[3:53], parsed_columns)), hide_index=True)
                 if remaining > 50:
                     st.caption(f"...and {remaining - 50} more (export CSV for full list)")
 
         st.divider()
 
 
+@st.fragment
+def render_pattern_analysis(view_key: tuple, pattern_stats: pd.DataFrame, parsed_df: pd.DataFrame, parsed_columns,
+                            pattern_index: PatternIndex, low_memory: bool, export_csv: str,
+                            export_parquet: Optional[bytes],
+                            shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS,
+                            state: Optional[PatternState] = None):
+    """
+    Pattern cards and insights.
+
+    A fragment: changing the sort order or page reruns only this section,
+    not the upload, parsing, exports and the rest of the page.
+    """
+    # Title Pattern Analysis Section
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        st.header("Title Pattern Analysis")
+        st.markdown("Most popular title attribute patterns of Merchant Listings within the Shopping Tab results")
+    with col2:
+        sort_by = st.selectbox(
+            "Sort by",
+            options=['usage', 'performance', 'count'],
+            format_func=lambda x: x.title()
+        )
+        group_by = st.selectbox(
+            "Group",
+            options=['pattern', 'similar', 'prefix'],
+            format_func={
+                'pattern': "Exact patterns",
+                'similar': "Similar patterns",
+                'prefix': "First two attributes",
+            }.get,
+            help="Similar patterns differ only by a Color or a repeated attribute",
+        )
+    with col3:
+        # Export button (low-memory mode only has pattern totals, not every listing)
+        st.download_button(
+            label="📥 Export Stats" if low_memory else "📥 Export Raw",
+            data=export_csv,
+            file_name="pattern_analysis.csv",
+            mime="text/csv"
+        )
+        if export_parquet is not None:
+            st.download_button(
+                label="📥 Export Parquet",
+                data=export_parquet,
+                file_name="pattern_analysis.parquet",
+                mime="application/octet-stream"
+            )
+
+    # Merge similar patterns (cached per view, so sorting and paging don't regroup)
+    if group_by != 'pattern':
+        pattern_stats, pattern_index = group_patterns(view_key, group_by, low_memory, shopping_results,
+                                                      pattern_stats, parsed_df, state)
+
+    # Sort pattern stats based on selection
+    if sort_by == 'usage':
+        pattern_stats = pattern_stats.sort_values('usage_pct', ascending=False)
+    elif sort_by == 'performance':
+        pattern_stats = pattern_stats.sort_values('performance_pct', ascending=False)
+    else:  # count
+        pattern_stats = pattern_stats.sort_values('count', ascending=False)
+
+    # Pagination - show limited patterns per page
+    patterns_per_page = 20
+    total_patterns = len(pattern_stats)
+    total_pages = (total_patterns + patterns_per_page - 1) // patterns_per_page
+
+    page = st.number_input(
+        f"Page (1-{total_pages})",
+        min_value=1,
+        max_value=max(1, total_pages),
+        value=1,
+        step=1
+    )
+
+    start_idx = (page - 1) * patterns_per_page
+    end_idx = start_idx + patterns_per_page
+    pattern_stats_page = pattern_stats.iloc[start_idx:end_idx]
+
+    st.caption(f"Showing patterns {start_idx + 1}-{min(end_idx, total_patterns)} of {total_patterns}")
+
+    # Display each pattern
+    total_listings = int(pattern_stats['count'].sum())
+
+    for _, row in pattern_stats_page.iterrows():
+        pattern = row['pattern']
+        examples = parsed_df.iloc[pattern_index.rows_for(pattern, MAX_CARD_EXAMPLES)]
+
+        stats = {
+            'usage_pct': row['usage_pct'],
+            'performance_pct': row['performance_pct'],
+            'count': int(row['count']),
+            'avg_position': row['avg_position'],
+            'median_position': row.get('median_position'),
+            'top3_share': row.get('top3_share'),
+            'patterns': row.get('patterns'),
+        }
+
+        render_pattern_card(pattern, stats, examples, total_listings, parsed_columns)
+
+    # Additional insights
+    st.divider()
+    st.header("Insights")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        best_pattern = pattern_stats.iloc[0]
+        st.metric(
+            "Most Common Pattern",
+            f"{best_pattern['usage_pct']:.0f}% Usage",
+            f"Avg Position: {best_pattern['avg_position']:.1f}"
+        )
+
+    with col2:
+        best_performing = pattern_stats.loc[pattern_stats['avg_position'].idxmin()]
+        st.metric(
+            "Best Performing Pattern",
+            f"Position {best_performing['avg_position']:.1f}",
+            f"{best_performing['usage_pct']:.0f}% of listings"
+        )
+
+    with col3:
+        st.metric(
+            "Total Patterns Found",
+            len(pattern_stats),
+            f"Across {total_listings} listings"
+        )
+
+
 # Main app
 def main():
     st.title("📊 Title Pattern Analysis")
@@ -169,18 +454,32 @@ def main():
     with st.sidebar:
         st.header("Settings")
 
-        uploaded_file = st.file_uploader("Upload CSV file", type=['csv'])
+        uploaded_file = st.file_uploader("Upload scrape file", type=['csv', 'parquet', 'arrow', 'feather'])
 
         category = st.selectbox(
             "Product Category",
-            options=['auto', 'all', 'baby', 'sportswear', 'groceries'],
-            format_func=lambda x: "Auto-Detect" if x == "auto" else x.title()
+            options=['auto', 'auto-words', 'all', 'baby', 'sportswear', 'groceries'],
+            format_func=lambda x: CATEGORY_LABELS.get(x, x.title()),
+            help="Auto-Detect (whole words) ignores category words inside other words, "
+                 "e.g. \"tee\" in \"steel\"."
+        )
+
+        low_memory = st.checkbox(
+            "Low-memory mode",
+            help="Read the file in chunks and keep only pattern totals and a few examples per pattern. "
+                 "Use for exports too large to load at once."
+        )
+
+        profile = st.checkbox(
+            "Profile parsing",
+            help="Re-parse the titles with per-stage timings and show where the time goes. "
+                 "Not available in low-memory mode."
         )
 
         st.divider()
         st.markdown("### How it works")
         st.markdown("""
-        1. Upload your scrape data CSV
+        1. Upload your scrape data (CSV, Parquet or Arrow)
         2. Select the product category
         3. View pattern analysis
 
@@ -189,9 +488,38 @@ def main():
         common patterns in successful listings.
         """)
 
-    if uploaded_file is not None:
+    if uploaded_file is not None and low_memory:
+        # Show keyword filter if available
+        selected_keyword = 'All'
+        keyword_options = load_keywords(uploaded_file, upload_key(uploaded_file))
+        if keyword_options:
+            selected_keyword = st.selectbox("Filter by Keyword", ['All'] + keyword_options)
+
+        # Deduplicate option - average position for same title
+        deduplicate = st.checkbox("Deduplicate titles (average position)", value=True)
+        normalize = deduplicate and st.checkbox("Ignore case and spacing when matching titles", value=False)
+        shopping_results = shopping_results_input(keyword_options)
+
+        view_key = (upload_key(uploaded_file), category, selected_keyword, deduplicate, normalize,
+                    get_dictionary_version())
+        with st.spinner("Analyzing title patterns..."):
+            pattern_stats, popular_attrs, parsed_df, state, rows_read, rows_excluded = stream_patterns(
+                uploaded_file, upload_key(uploaded_file), category, selected_keyword, deduplicate, normalize,
+                get_dictionary_version(), shopping_results
+            )
+            # Example rows already carry their attributes
+            parsed_columns = None
+            pattern_index = PatternIndex.from_labels(parsed_df['pattern'])
+
+        st.success(f"Streamed {rows_read} listings")
+        if rows_excluded:
+            st.warning(f"Skipped {rows_excluded} listing(s) without a title")
+        if selected_keyword != 'All':
+            st.info(f"Analyzing {int(pattern_stats['count'].sum())} listings for keyword: **{selected_keyword}**")
+
+    elif uploaded_file is not None:
         # Load data
-        df = load_data(uploaded_file)
+        df = load_data(uploaded_file, upload_key(uploaded_file))
 
         st.success(f"Loaded {len(df)} listings")
 
@@ -200,37 +528,37 @@ def main():
         if 'keyword' in df.columns:
             keywords = ['All'] + list(df['keyword'].unique())
             selected_keyword = st.selectbox("Filter by Keyword", keywords)
-            if selected_keyword != 'All':
-                df = df[df['keyword'] == selected_keyword]
 
         # Deduplicate option - average position for same title
         deduplicate = st.checkbox("Deduplicate titles (average position)", value=True)
-        if deduplicate:
-            # Group by title, average the position
-            df = df.groupby('title').agg({
-                'position': 'mean',
-                **{col: 'first' for col in df.columns if col not in ['title', 'position']}
-            }).reset_index()
-            df['position'] = df['position'].round(1)
+        normalize = deduplicate and st.checkbox("Ignore case and spacing when matching titles", value=False)
+        shopping_results = shopping_results_input(list(df['keyword'].unique()) if 'keyword' in df.columns else [])
+
+        view_key = (upload_key(uploaded_file), category, selected_keyword, deduplicate, normalize,
+                    get_dictionary_version())
+        with st.spinner("Analyzing title patterns..."):
+            # Parsed once per upload (keyed on its contents, not the frame itself);
+            # the keyword filter and dedup only slice the parsed rows
+            state = None
+            parsed_upload = parse_upload((upload_key(uploaded_file), get_dictionary_version()), df, category)
+            parsed_df, parsed_columns = parsed_upload.view(selected_keyword, deduplicate, normalize)
+            pattern_index = parsed_columns.pattern_index()
+            pattern_stats = calculate_pattern_stats(parsed_df, shopping_results)
+            popular_attrs = parsed_columns.attribute_type_counts()
+
+        if parsed_upload.rows_excluded:
+            st.warning(f"Skipped {parsed_upload.rows_excluded} listing(s) without a title")
 
         # Show filtered count
         if selected_keyword != 'All':
-            st.info(f"Analyzing {len(df)} listings for keyword: **{selected_keyword}**")
-
-        # Analyze patterns
-        # Create cache key from filter settings
-        df_hash = f"{selected_keyword}_{category}_{deduplicate}_{len(df)}"
-
-        with st.spinner("Analyzing title patterns..."):
-            # Pass lists for proper caching (underscore-prefixed params are not hashed)
-            titles = df['title'].tolist()
-            positions = df['position'].tolist()
-            keywords = df['keyword'].tolist() if 'keyword' in df.columns else []
+            st.info(f"Analyzing {len(parsed_df)} listings for keyword: **{selected_keyword}**")
 
-            parsed_df = analyze_patterns(df_hash, titles, positions, keywords, category)
-            pattern_stats = calculate_pattern_stats(parsed_df)
-            popular_attrs = get_popular_attributes(parsed_df)
+        if profile:
+            with st.spinner("Profiling title parsing..."):
+                titles = ArrowStrings.from_pandas(parsed_df['title'])
+                render_profile(profile_titles(view_key, titles, category), category)
 
+    if uploaded_file is not None:
         # Popular Attributes Section
         st.header("Popular Title Attributes")
         st.markdown("Most commonly used product category attributes in Merchant Listing Titles within the Shopping Tab results")
@@ -244,105 +572,22 @@ def main():
 
         st.divider()
 
-        # Title Pattern Analysis Section
-        col1, col2, col3 = st.columns([3, 1, 1])
-        with col1:
-            st.header("Title Pattern Analysis")
-            st.markdown("Most popular title attribute patterns of Merchant Listings within the Shopping Tab results")
-        with col2:
-            sort_by = st.selectbox(
-                "Sort by",
-                options=['usage', 'performance', 'count'],
-                format_func=lambda x: x.title()
-            )
-        with col3:
-            # Export button
-            csv = parsed_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Export Raw",
-                data=csv,
-                file_name="pattern_analysis.csv",
-                mime="text/csv"
-            )
-
-        # Sort pattern stats based on selection
-        if sort_by == 'usage':
-            pattern_stats = pattern_stats.sort_values('usage_pct', ascending=False)
-        elif sort_by == 'performance':
-            pattern_stats = pattern_stats.sort_values('performance_pct', ascending=False)
-        else:  # count
-            pattern_stats = pattern_stats.sort_values('count', ascending=False)
-
-        # Pagination - show limited patterns per page
-        patterns_per_page = 20
-        total_patterns = len(pattern_stats)
-        total_pages = (total_patterns + patterns_per_page - 1) // patterns_per_page
-
-        page = st.number_input(
-            f"Page (1-{total_pages})",
-            min_value=1,
-            max_value=max(1, total_pages),
-            value=1,
-            step=1
-        )
-
-        start_idx = (page - 1) * patterns_per_page
-        end_idx = start_idx + patterns_per_page
-        pattern_stats_page = pattern_stats.iloc[start_idx:end_idx]
-
-        st.caption(f"Showing patterns {start_idx + 1}-{min(end_idx, total_patterns)} of {total_patterns}")
-
-        # Display each pattern
-        total_listings = len(parsed_df)
-
-        for _, row in pattern_stats_page.iterrows():
-            pattern = row['pattern']
-            examples = parsed_df[parsed_df['pattern'] == pattern]
-
-            stats = {
-                'usage_pct': row['usage_pct'],
-                'performance_pct': row['performance_pct'],
-                'count': int(row['count']),
-                'avg_position': row['avg_position'],
-            }
-
-            render_pattern_card(pattern, stats, examples, total_listings)
-
-        # Additional insights
-        st.divider()
-        st.header("Insights")
-
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            best_pattern = pattern_stats.iloc[0]
-            st.metric(
-                "Most Common Pattern",
-                f"{best_pattern['usage_pct']:.0f}% Usage",
-                f"Avg Position: {best_pattern['avg_position']:.1f}"
-            )
-
-        with col2:
-            best_performing = pattern_stats.loc[pattern_stats['avg_position'].idxmin()]
-            st.metric(
-                "Best Performing Pattern",
-                f"Position {best_performing['avg_position']:.1f}",
-                f"{best_performing['usage_pct']:.0f}% of listings"
-            )
+        # Exports are built once per view, not on every rerun (low-memory mode only has the pattern totals)
+        if low_memory:
+            export_csv, export_parquet = pattern_stats.to_csv(index=False), None
+        else:
+            export_csv, export_parquet = build_exports(view_key, parsed_df, parsed_columns)
 
-        with col3:
-            st.metric(
-                "Total Patterns Found",
-                len(pattern_stats),
-                f"Across {total_listings} listings"
-            )
+        # Sorting and paging rerun only this section
+        render_pattern_analysis(view_key, pattern_stats, parsed_df, parsed_columns, pattern_index, low_memory,
+                                export_csv, export_parquet, shopping_results, state)
 
     else:
         # Show demo/instructions when no file uploaded
         st.divider()
-        st.markdown("### 👈 Upload a CSV file to get started")
+        st.markdown("### 👈 Upload a CSV, Parquet or Arrow file to get started")
         st.markdown("""
-        Your CSV should have at least these columns:
+        Your file should have at least these columns:
         - `title` - Product title
         - `position` - Ranking position in search results
 
@@ -0,0 +1,247 @@
+"""
+Benchmarks for the title parsing hot path, with a regression gate.
+
+Usage:
+    python -m benchmarks.run                                  # 10k titles per category
+    python -m benchmarks.run --sizes 10k 100k 1M --save-baseline
+    python -m benchmarks.run --sizes 10k 100k                 # fails if slower than the baseline
+
+Exits 1 on a regression and 2 when there is no baseline to compare with
+(results missing from the baseline are listed as unchecked).
+
+Every case runs in a fresh interpreter, so its peak RSS is its own. Run the
+suite (and save a new baseline) on the same machine before and after
+growing the dictionaries: the baseline is only meaningful there.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CATEGORIES = ['baby', 'sportswear', 'groceries', 'auto']
+CASES = ['parse_title', 'detect_category', 'calculate_pattern_stats', 'analyze_patterns']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Allowed slowdown (or growth) before a result counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+
+def parse_size(text: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000."""
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    suffix = text[-1].lower()
+    if suffix in multipliers:
+        return int(float(text[:-1]) * multipliers[suffix])
+    return int(text)
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed_each(func, items) -> np.ndarray:
+    """Call func on every item; per-call latencies in seconds."""
+    latencies = np.empty(len(items))
+    clock = time.perf_counter
+    for i, item in enumerate(items):
+        started = clock()
+        func(item)
+        latencies[i] = clock() - started
+    return latencies
+
+
+def _listings(category: str, n: int):
+    from benchmarks.synthetic import generate_listings
+
+    if category != 'auto':
+        return generate_listings(category, n)
+    # Auto mode sees a mix of every category
+    titles, positions, keywords = [], [], []
+    for i, name in enumerate(CATEGORIES[:-1]):
+        part = generate_listings(name, n // 3 + (i < n % 3))
+        titles += part[0]
+        positions += part[1]
+        keywords += part[2]
+    return titles, positions, keywords
+
+
+def run_case(case: str, category: str, n: int) -> dict:
+    """Run one benchmark case (in the current process) and return its measurements."""
+    from utils.categories import detect_category, detect_categories
+    from utils.analysis import calculate_pattern_stats, parse_listings_columnar
+    from utils.title_parser import get_category_matcher, parse_cache, parse_title
+
+    titles, positions, keywords = _listings(category, n)
+    # Don't time building the compiled matchers
+    for name in [*CATEGORIES[:-1], 'all']:
+        get_category_matcher(name)
+    detect_category('')
+    parse_cache.clear()
+
+    latencies = None
+    started = time.perf_counter()
+    if case == 'parse_title':
+        latencies = _timed_each(lambda title: parse_title(title, category), titles)
+    elif case == 'detect_category':
+        latencies = _timed_each(detect_category, titles)
+    elif case == 'calculate_pattern_stats':
+        parsed_df, _ = parse_listings_columnar(titles, positions, keywords, category, workers=None)
+        started = time.perf_counter()
+        calculate_pattern_stats(parsed_df)
+    elif case == 'analyze_patterns':
+        # What the dashboard's analyze_patterns does, without Streamlit
+        parsed_df, parsed_columns = parse_listings_columnar(titles, positions, keywords, category, workers=None)
+        calculate_pattern_stats(parsed_df)
+        parsed_columns.attribute_type_counts()
+    else:
+        raise ValueError(f"unknown benchmark case: {case}")
+    seconds = time.perf_counter() - started
+
+    if case == 'detect_category':
+        # Batch detection, timed on its own so seconds covers only the per-title loop
+        batch_started = time.perf_counter()
+        detect_categories(titles)
+        batch_seconds = time.perf_counter() - batch_started
+
+    result = {
+        'case': case,
+        'category': category,
+        'titles': n,
+        'seconds': seconds,
+        'titles_per_sec': n / seconds if seconds else float('inf'),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+    if latencies is not None:
+        result['p50_us'] = float(np.percentile(latencies, 50) * 1e6)
+        result['p99_us'] = float(np.percentile(latencies, 99) * 1e6)
+    if case == 'detect_category':
+        result['batch_titles_per_sec'] = n / batch_seconds if batch_seconds else float('inf')
+    return result
+
+
+def run_isolated(case: str, category: str, n: int) -> dict:
+    """Run a case in a freshly spawned interpreter."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, case, category, n).result()
+
+
+def result_key(result: dict) -> str:
+    return f"{result['case']}/{result['category']}/{result['titles']}"
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> tuple[list[str], list[str]]:
+    """
+    Regressions against the baseline, as readable lines (empty if none),
+    and the keys of results the baseline has nothing to compare with.
+    """
+    previous = {result_key(result): result for result in baseline.get('results', [])}
+    regressions, unmatched = [], []
+    for result in results:
+        before = previous.get(result_key(result))
+        if before is None:
+            unmatched.append(result_key(result))
+            continue
+        # (metric, True if higher is better)
+        for metric, higher_is_better in (('titles_per_sec', True), ('batch_titles_per_sec', True),
+                                         ('p50_us', False), ('p99_us', False), ('peak_rss_mb', False)):
+            if metric not in result or metric not in before:
+                continue
+            old, new = before[metric], result[metric]
+            if higher_is_better and new < old * (1 - tolerance) or not higher_is_better and new > old * (1 + tolerance):
+                regressions.append(f"{result_key(result)} {metric}: {old:,.1f} -> {new:,.1f}")
+    return regressions, unmatched
+
+
+def format_result(result: dict) -> str:
+    line = (f"{result_key(result):<45} {result['titles_per_sec']:>12,.0f} titles/s "
+            f"{result['peak_rss_mb']:>8.1f} MB")
+    if 'p50_us' in result:
+        line += f"  p50 {result['p50_us']:>7.1f}us  p99 {result['p99_us']:>8.1f}us"
+    if 'batch_titles_per_sec' in result:
+        line += f"  batch {result['batch_titles_per_sec']:>10,.0f} titles/s"
+    return line
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmark title parsing.")
+    parser.add_argument("--sizes", nargs="+", default=["10k"], help="Titles per category, e.g. 10k 100k 1M")
+    parser.add_argument("--categories", nargs="+", choices=CATEGORIES, default=CATEGORIES)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative regression (default: 0.15)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    from config.attributes import get_dictionary_version
+
+    results = []
+    for size in args.sizes:
+        n = parse_size(size)
+        for category in args.categories:
+            for case in args.cases:
+                result = run_isolated(case, category, n)
+                print(format_result(result), flush=True)
+                results.append(result)
+
+    report = {
+        'dictionary_version': get_dictionary_version(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    # Nothing to compare with is a failure, not a pass: the gate would never fire
+    if not os.path.exists(args.baseline):
+        print(f"error: no baseline at {args.baseline}; nothing was checked. "
+              f"Run with --save-baseline first", file=sys.stderr)
+        return 2
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('dictionary_version') != report['dictionary_version']:
+        print(f"note: baseline dictionary version {baseline.get('dictionary_version')}, "
+              f"now {report['dictionary_version']}", file=sys.stderr)
+
+    regressions, unmatched = compare(results, baseline, args.tolerance)
+    if unmatched:
+        print(f"\nwarning: {len(unmatched)} result(s) not in the baseline, not checked:", file=sys.stderr)
+        for key in unmatched:
+            print(f"  {key}", file=sys.stderr)
+        if len(unmatched) == len(results):
+            print("error: no result could be checked against the baseline", file=sys.stderr)
+            return 2
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
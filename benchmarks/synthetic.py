@@ -0,0 +1,77 @@
+"""
+Synthetic product titles built from the attribute dictionaries.
+
+Titles are assembled from the same brands, attributes and category keywords
+the parser looks for, plus sizes, quantities and filler words, so the
+benchmark load grows along with config/attributes.py.
+"""
+import random
+
+from config.attributes import ATTRIBUTES, CATEGORY_INDICATORS, get_brands_for_category
+
+SIZE_UNITS = ["ml", "L", "g", "kg", "oz"]
+QUANTITY_FORMATS = ["{n} Pack", "{n}pk", "x {n}", "Pack of {n}", "{n} Count"]
+FILLER = ["New", "Premium", "Value", "Edition", "Classic", "Series", "Pro", "Plus", "Max", "Original"]
+
+# Chance of each part appearing in a title
+PART_RATES = {
+    "brand": 0.8,
+    "second_brand": 0.1,
+    "attribute": 0.45,
+    "keyword": 0.5,
+    "size": 0.5,
+    "quantity": 0.3,
+    "filler": 0.4,
+}
+
+
+def _size(rng: random.Random) -> str:
+    unit = rng.choice(SIZE_UNITS)
+    if unit in ("ml", "g"):
+        amount = rng.choice([100, 250, 260, 330, 500, 600, 750])
+    else:
+        amount = rng.choice([0.5, 1, 1.25, 1.5, 2, 3, 5])
+    return f"{amount:g}{unit}" if rng.random() < 0.7 else f"{amount:g} {unit}"
+
+
+def generate_titles(category: str, n: int, seed: int = 0) -> list[str]:
+    """
+    n synthetic titles for a category ('baby', 'sportswear', 'groceries').
+
+    The same (category, n, seed) always gives the same titles.
+    """
+    rng = random.Random(f"{category}:{seed}")
+    brands = get_brands_for_category(category)
+    attributes = [values for attr_type, values in ATTRIBUTES.get(category, {}).items()
+                  if attr_type not in ("size", "quantity")]
+    keywords = CATEGORY_INDICATORS.get(category, {}).get("keywords", [])
+
+    titles = []
+    for _ in range(n):
+        parts = []
+        if brands and rng.random() < PART_RATES["brand"]:
+            parts.append(rng.choice(brands))
+            if rng.random() < PART_RATES["second_brand"]:
+                parts.append(rng.choice(brands))
+        for values in attributes:
+            if values and rng.random() < PART_RATES["attribute"]:
+                parts.append(rng.choice(values))
+        if keywords and rng.random() < PART_RATES["keyword"]:
+            parts.append(rng.choice(keywords).title())
+        if rng.random() < PART_RATES["filler"]:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(FILLER))
+        if rng.random() < PART_RATES["size"]:
+            parts.append(_size(rng))
+        if rng.random() < PART_RATES["quantity"]:
+            parts.append(rng.choice(QUANTITY_FORMATS).format(n=rng.choice([2, 3, 4, 6, 10, 12, 24])))
+        titles.append(" ".join(parts) if parts else rng.choice(FILLER))
+    return titles
+
+
+def generate_listings(category: str, n: int, seed: int = 0) -> tuple[list[str], list[int], list[str]]:
+    """Titles with Google Shopping-like positions (1-40) and a handful of keywords."""
+    titles = generate_titles(category, n, seed)
+    rng = random.Random(f"{category}:{seed}:listings")
+    keywords = [f"{category} keyword {i}" for i in range(5)]
+    positions = [rng.randint(1, 40) for _ in range(n)]
+    return titles, positions, [rng.choice(keywords) for _ in range(n)]
@@ -0,0 +1,237 @@
+"""
+Headless title pattern analysis (no Streamlit needed).
+
+Usage:
+    python -m cli scrape.csv --category auto --output-dir results/
+    python -m cli scrape.parquet --keyword "Bottle Feeding" --format json
+
+    # Daily run: save today's state and report on the rolling window
+    python -m cli today.csv --no-dedup --save-state states/2024-06-01.json --merge-state states/*.json
+"""
+import argparse
+import datetime
+import json
+import numbers
+import os
+import sys
+import time
+from contextlib import nullcontext
+from typing import Mapping, Union
+
+import pandas as pd
+
+from config.attributes import ATTRIBUTES, get_dictionary_version
+from utils.analysis import (
+    DEFAULT_SHOPPING_RESULTS, ParsedUpload, calculate_keyword_pattern_stats, calculate_pattern_stats,
+    with_attributes,
+)
+from utils.arrow_io import parsed_table, write_table
+from utils.categories import AUTO_CATEGORIES
+from utils.parse_cache import ParseStore
+from utils.pattern_groups import PatternGroups
+from utils.pattern_state import PatternState, merge_states
+from utils.profiling import profile_parsing
+from utils.streaming import DEFAULT_CHUNKSIZE, iter_scrape_chunks, stream_pattern_analysis
+from utils.title_parser import DEFAULT_ENGINE, ENGINES
+
+CATEGORIES = [*AUTO_CATEGORIES, 'all', *ATTRIBUTES]
+FORMATS = ['csv', 'parquet', 'arrow', 'json']
+
+
+def write_output(df, path: str, fmt: str):
+    """Write a result frame (or Arrow table, for Parquet/Arrow) as CSV, Parquet, Arrow IPC or JSON records."""
+    if fmt in ('parquet', 'arrow'):
+        write_table(df, path, fmt)
+    elif fmt == 'json':
+        df.to_json(path, orient='records', force_ascii=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def load_shopping_results(value: str) -> Union[int, Mapping[str, int]]:
+    """
+    --shopping-results: one number for every keyword, or a JSON object or
+    CSV file (keyword and shopping_results columns) with one per keyword.
+    """
+    if value.isdigit():
+        return _shopping_results_count(int(value))
+    if value.endswith('.json'):
+        with open(value, encoding='utf-8') as f:
+            results = json.load(f)
+        if not isinstance(results, dict):
+            raise ValueError("expected a JSON object of keyword -> shopping results")
+    else:
+        table = pd.read_csv(value, usecols=['keyword', 'shopping_results'])
+        results = dict(zip(table['keyword'], table['shopping_results']))
+    return {str(keyword): _shopping_results_count(total) for keyword, total in results.items()}
+
+
+def _shopping_results_count(total) -> int:
+    """One keyword's shopping results as a positive int (40.0 from a CSV is fine, 0.5 or true is not)."""
+    whole = not isinstance(total, bool) and isinstance(total, numbers.Real) and float(total).is_integer()
+    if not whole or int(total) <= 0:
+        raise ValueError(f"shopping results must be positive whole numbers, got {total!r}")
+    return int(total)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Analyze product title patterns.")
+    parser.add_argument("input", nargs="?",
+                        help="CSV, Parquet or Arrow IPC (.arrow/.feather) file with title and position columns")
+    parser.add_argument("--category", choices=CATEGORIES, default="auto",
+                        help="Product category (default: auto). auto-words detects it from whole words only")
+    parser.add_argument("--keyword", help="Only analyze rows for this keyword")
+    parser.add_argument("--dedup", action=argparse.BooleanOptionalAction, default=True,
+                        help="Deduplicate titles, averaging their position (default: on)")
+    parser.add_argument("--normalize-titles", action="store_true",
+                        help="When deduplicating, treat titles differing only in case or whitespace as the same")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes (0 = every CPU, 1 = serial)")
+    parser.add_argument("--engine", choices=list(ENGINES), default=DEFAULT_ENGINE,
+                        help="Parsing engine: classic (default) or spans (positions of the matches themselves)")
+    parser.add_argument("--shopping-results", default=str(DEFAULT_SHOPPING_RESULTS), metavar="N|PATH",
+                        help="Shopping results per keyword, for performance_pct: a number, or a JSON object or CSV "
+                             f"(keyword,shopping_results) with one per keyword (default: {DEFAULT_SHOPPING_RESULTS})")
+    parser.add_argument("--output-dir", default=".", help="Directory for the result files")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Output format (default: csv)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows read at a time")
+    parser.add_argument("--include-parsed", action="store_true",
+                        help="Also write the per-title parse results (holds the whole input in memory)")
+    parser.add_argument("--group-patterns", choices=["similar", "prefix"],
+                        help="Also write pattern_groups: similar patterns (differing only by a Color or a "
+                             "repeated attribute) or patterns with the same first two attributes, combined")
+    parser.add_argument("--save-state", help="Write this run's mergeable pattern state (JSON) here")
+    parser.add_argument("--merge-state", nargs="+", default=[], metavar="PATH",
+                        help="Saved pattern states to combine with this run (input is optional)")
+    parser.add_argument("--snapshot-date", default=datetime.date.today().isoformat(),
+                        help="Date this scrape was taken, recorded as first/last seen (default: today)")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the persistent parse cache")
+    parser.add_argument("--prune-cache", action="store_true",
+                        help="Delete parse cache entries from older dictionary versions (needs no input)")
+    parser.add_argument("--cache-path", help="Parse cache location (default: $TITLE_PARSER_CACHE or ~/.cache)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each parse stage and write parse_profile.json/.prom (parses serially; "
+                             "combine with --no-cache to profile every title)")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+
+    if args.prune_cache and not args.no_cache:
+        removed = ParseStore(args.cache_path).prune(get_dictionary_version())
+        print(f"Pruned {removed} cached results from older dictionary versions", file=sys.stderr)
+        if args.input is None and not args.merge_state:
+            return 0
+    if args.input is None and not args.merge_state:
+        print("error: give an input file, --merge-state, or both", file=sys.stderr)
+        return 2
+    if args.include_parsed and (args.input is None or args.merge_state or args.save_state):
+        print("error: --include-parsed needs an input file and can't be combined with pattern states",
+              file=sys.stderr)
+        return 2
+
+    store = None if args.no_cache else ParseStore(args.cache_path)
+    outputs = {}
+    if args.profile:
+        # Worker processes would keep their timings to themselves
+        args.workers = 1
+
+    with profile_parsing() if args.profile else nullcontext() as profiler:
+        status = run_analysis(args, store, outputs)
+    if status:
+        return status
+    pattern_stats = outputs['pattern_stats']
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name, frame in outputs.items():
+        write_output(frame, os.path.join(args.output_dir, f"{name}.{args.format}"), args.format)
+    if profiler is not None:
+        with open(os.path.join(args.output_dir, "parse_profile.json"), "w", encoding="utf-8") as f:
+            json.dump({**profiler.to_dict(), "dead_entries": profiler.dead_entries(args.category)}, f,
+                      ensure_ascii=False, indent=2)
+        profiler.write_prometheus(os.path.join(args.output_dir, "parse_profile.prom"))
+
+    print(
+        f"Analyzed {int(pattern_stats['count'].sum())} listings, {len(pattern_stats)} patterns "
+        f"in {time.perf_counter() - started:.1f}s -> {args.output_dir}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run_analysis(args: argparse.Namespace, store, outputs: dict) -> int:
+    """Fill outputs with the result frames; returns a non-zero exit status on bad input."""
+    try:
+        shopping_results = load_shopping_results(args.shopping_results)
+    except (OSError, ValueError) as exc:
+        print(f"error: --shopping-results: {exc}", file=sys.stderr)
+        return 2
+
+    if args.include_parsed:
+        df = pd.concat(iter_scrape_chunks(args.input, args.chunksize), ignore_index=True)
+        # Every distinct title is parsed once; the views below only select rows
+        upload = ParsedUpload(df, args.category, workers=args.workers, store=store, engine=args.engine)
+        excluded = upload.rows_excluded
+
+        parsed_df, parsed_columns = upload.view(args.keyword, args.dedup, args.normalize_titles)
+        pattern_stats = calculate_pattern_stats(parsed_df, shopping_results)
+        popular_attrs = parsed_columns.attribute_type_counts()
+        if 'keyword' in df.columns:
+            # A title that ranks for two keywords counts for each, at its own position
+            keyword_df, _ = upload.view(args.keyword, args.dedup, args.normalize_titles, per_keyword=True)
+            outputs['keyword_pattern_stats'] = calculate_keyword_pattern_stats(keyword_df, shopping_results)
+        # Parquet/Arrow get a list-of-struct attributes column straight from the columnar results
+        if args.format in ('parquet', 'arrow'):
+            outputs['parsed_titles'] = parsed_table(parsed_df, parsed_columns)
+        else:
+            outputs['parsed_titles'] = with_attributes(parsed_df, parsed_columns)
+    else:
+        states = [PatternState.load(path) for path in args.merge_state]
+        excluded = 0
+
+        if args.input is not None:
+            # Bounded memory: only per-pattern aggregates (and distinct titles when deduplicating) are kept
+            try:
+                analysis = stream_pattern_analysis(
+                    args.input, args.category, keyword=args.keyword, deduplicate=args.dedup,
+                    chunksize=args.chunksize, workers=args.workers, store=store, seen=args.snapshot_date,
+                    engine=args.engine, normalize=args.normalize_titles,
+                    # States are kept per keyword, so theirs only merge titles within a keyword
+                    keyword_state=bool(args.save_state or args.merge_state),
+                )
+            except ValueError as exc:
+                print(f"error: {args.input}: {exc}", file=sys.stderr)
+                return 2
+            pattern_stats, popular_attrs, _ = analysis.finish(shopping_results)
+            state, state_keyword = analysis.state, None
+            excluded = analysis.rows_excluded
+            if args.save_state:
+                analysis.keyword_state.save(args.save_state)
+            if args.merge_state:
+                states.append(analysis.keyword_state)
+
+        if args.merge_state:
+            state = merge_states(states)
+            if len(state.dictionary_versions) > 1:
+                print("warning: merged states were parsed with different attribute dictionaries", file=sys.stderr)
+            state_keyword = args.keyword
+            pattern_stats = state.to_pattern_stats(keyword=args.keyword, total_shopping_results=shopping_results)
+            popular_attrs = state.popular_attributes(keyword=args.keyword)
+
+    if excluded:
+        print(f"note: skipped {excluded} listing(s) without a title", file=sys.stderr)
+
+    outputs['pattern_stats'] = pattern_stats
+    if args.group_patterns:
+        groups = PatternGroups(pattern_stats['pattern'], args.group_patterns)
+        if args.include_parsed:
+            outputs['pattern_groups'] = groups.rollup_rows(parsed_df, shopping_results)
+        else:
+            outputs['pattern_groups'] = groups.rollup(state, state_keyword, shopping_results)
+    outputs['popular_attributes'] = pd.DataFrame(list(popular_attrs.items()), columns=['attribute', 'count'])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@
 Product attribute dictionaries for title parsing.
 Sorted by length (longest first) for accurate matching.
 """
+import hashlib
 
 # Universal brands (add more as needed)
 BRANDS = sorted([
@@ -594,31 +595,11 @@ CATEGORY_INDICATORS = {
 }
 
 
-def detect_category(title: str) -> str:
-    """
-    Auto-detect product category based on title keywords and brands.
-    Returns the most likely category or 'all' if uncertain.
-    """
-    title_lower = title.lower()
-    scores = {"groceries": 0, "sportswear": 0, "baby": 0}
-
-    for category, indicators in CATEGORY_INDICATORS.items():
-        # Check keywords
-        for keyword in indicators["keywords"]:
-            if keyword in title_lower:
-                scores[category] += 2  # Keywords are strong indicators
-
-        # Check brands
-        for brand in indicators["brands"]:
-            if brand in title_lower:
-                scores[category] += 3  # Brands are stronger indicators
-
-    # Find category with highest score
-    max_score = max(scores.values())
-    if max_score >= 2:  # Minimum threshold
-        return max(scores, key=scores.get)
-
-    return "all"  # Uncertain, use combined attributes
+# Indicator weights: brands are stronger indicators than keywords
+KEYWORD_WEIGHT = 2
+BRAND_WEIGHT = 3
+# Minimum score for a category to be picked over 'all'
+MIN_CATEGORY_SCORE = 2
 
 
 # Brands to exclude from matching in specific categories
@@ -627,10 +608,17 @@ BRAND_EXCLUSIONS = {
 }
 
 
+def detect_category(title: str) -> str:
+    """Kept for existing callers; see utils.categories.detect_category."""
+    # Imported here: utils.categories builds on this module
+    from utils.categories import detect_category as _detect_category
+    return _detect_category(title)
+
+
 def get_brands_for_category(category: str) -> list:
     """Get brands list filtered for the specific category."""
     if category in BRAND_EXCLUSIONS:
-        exclusions = [b.lower() for b in BRAND_EXCLUSIONS[category]]
+        exclusions = {b.lower() for b in BRAND_EXCLUSIONS[category]}
         return [b for b in BRANDS if b.lower() not in exclusions]
     return BRANDS
 
@@ -638,23 +626,49 @@ def get_brands_for_category(category: str) -> list:
 def get_category_attributes(category: str) -> dict:
     """Get attributes for a specific category."""
     if category == "all":
-        # Combine all categories
+        # Combine all categories; dict keys dedup in first-seen order
         combined = {}
         for cat_attrs in ATTRIBUTES.values():
             for attr_type, values in cat_attrs.items():
-                if attr_type not in combined:
-                    combined[attr_type] = []
-                # Add values, avoiding duplicates
-                for v in values:
-                    if v not in combined[attr_type]:
-                        combined[attr_type].append(v)
+                combined.setdefault(attr_type, {}).update(dict.fromkeys(values))
         # Re-sort each attribute list by length (longest first)
-        for attr_type in combined:
-            combined[attr_type] = sorted(combined[attr_type], key=lambda x: -len(x))
-        return combined
+        return {attr_type: sorted(values, key=lambda x: -len(x)) for attr_type, values in combined.items()}
     return ATTRIBUTES.get(category, {})
 
 
 def get_all_attribute_types(category: str) -> list:
     """Get list of attribute types for a category."""
     return list(ATTRIBUTES.get(category, {}).keys())
+
+
+# Bumped by dictionaries_changed(); the version is only rehashed when it moves
+_dictionary_generation = 0
+_version_cache = {"generation": None, "version": None}
+
+
+def dictionaries_changed():
+    """
+    Call after editing BRANDS, ATTRIBUTES, CATEGORY_INDICATORS or
+    BRAND_EXCLUSIONS in place.
+
+    The next get_dictionary_version() hashes the dictionaries again, so
+    cached parse results and compiled matchers from before the edit are
+    no longer used.
+    """
+    global _dictionary_generation
+    _dictionary_generation += 1
+
+
+def get_dictionary_version() -> str:
+    """
+    Fingerprint of the attribute dictionaries.
+
+    Caches of parse results use this as part of their key. The content
+    hash is computed once at import and again after each
+    dictionaries_changed(), so looking it up costs one comparison.
+    """
+    if _version_cache["generation"] != _dictionary_generation:
+        content = repr((BRANDS, ATTRIBUTES, CATEGORY_INDICATORS, BRAND_EXCLUSIONS))
+        _version_cache["version"] = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+        _version_cache["generation"] = _dictionary_generation
+    return _version_cache["version"]
@@ -0,0 +1,217 @@
+"""
+Check a title parsing engine against the frozen reference parser.
+
+Usage:
+    python -m equivalence.run                        # current parser vs the golden corpus
+    python -m equivalence.run --differential 50000   # ...and vs the reference on fresh titles
+    python -m equivalence.run --engine mypkg.fast:parse_title
+    python -m equivalence.run --regenerate           # after a dictionary change
+
+An engine is any callable (title, category) -> dict shaped like
+parse_title's result. Mismatches are reported per category and per field.
+"""
+import argparse
+import gzip
+import importlib
+import io
+import json
+import os
+import sys
+from collections import Counter
+from typing import Callable, Iterable
+
+from config.attributes import ATTRIBUTES, get_dictionary_version
+from equivalence import reference
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'golden.jsonl.gz')
+DEFAULT_ENGINE = 'utils.title_parser:parse_title_uncached'
+FIELDS = ['attributes', 'pattern', 'remaining', 'detected_category']
+
+# Bump when the corpus layout changes
+GOLDEN_FORMAT = 1
+
+# Titles that exercise the rules a faster matcher is most likely to break:
+# first-match-wins, removal before the next search, original-title positions,
+# leftover text appended to Product Type, substring category detection.
+EDGE_CASES = [
+    "Tommee Tippee Natural Start Baby Bottles 260ml 3 Pack",
+    "Woolworths Spring Water Bottles 600ml x 24 Pack",
+    "Woolworths Spring Water Bottle 1.5L",
+    "FlowFly Kids Lunch Box Insulated for Girls, Boys Blue",
+    "Nike Men's Pegasus 41 Road Running Shoes",
+    "Woolworths Lean Beef Mince 500g",
+    "Black Pepper Womens Tee",
+    "Black Pepper Cracked 100g",
+    "NUK Nuk nuk Bottle",
+    "Dr. Brown's Dr Browns Options+ Bottle 2 x 250ml",
+    "Stainless Steel Drink Bottle 500ml",
+    "Scotch Finger Biscuits 250g",
+    "Pack of 6 Juice Boxes 200 ml x 6",
+    "Set of 4 Bento Lunchbox Containers",
+    "Single Baby Bottle",
+    "Dozen Eggs Free Range 700g",
+    "x24pack Sparkling Water 375ml",
+    "Blue Blue Blue",
+    "Nike Nike Adidas Puma Shoes",
+    "Kids' Water Bottle - Pink | 500mL",
+    "  Leading and trailing spaces  ",
+    "Crème Brûlée Yoghurt 4 x 100g",
+    "",
+    "-",
+    "123",
+]
+
+
+def load_engine(spec: str) -> Callable[[str, str], dict]:
+    """'package.module:function' -> the function."""
+    module_name, _, attr = spec.partition(':')
+    if not attr:
+        raise ValueError(f"engine must look like module:function, got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def build_corpus(per_category: int = 2000, seed: int = 0) -> list[tuple[str, str]]:
+    """(title, category) pairs: synthetic titles per category, mixed titles for 'auto'/'all', and edge cases."""
+    from benchmarks.synthetic import generate_titles
+
+    cases = []
+    mixed = []
+    for category in ATTRIBUTES:
+        titles = generate_titles(category, per_category, seed)
+        cases += [(title, category) for title in titles]
+        mixed += titles[:per_category // 3]
+    cases += [(title, 'auto') for title in mixed]
+    cases += [(title, 'all') for title in mixed[::3]]
+    for category in [*ATTRIBUTES, 'all', 'auto']:
+        cases += [(title, category) for title in EDGE_CASES]
+    return cases
+
+
+def _expected(result: dict) -> dict:
+    return {field: result[field] for field in FIELDS}
+
+
+def write_golden(path: str, cases: list[tuple[str, str]]):
+    """Run the reference parser over the cases and store title, category and expected output."""
+    # mtime=0 keeps the file byte-identical when nothing changed
+    with gzip.GzipFile(path, 'wb', mtime=0) as raw, io.TextIOWrapper(raw, encoding='utf-8') as f:
+        f.write(json.dumps({'format': GOLDEN_FORMAT, 'dictionary_version': get_dictionary_version()}) + '\n')
+        for title, category in cases:
+            expected = _expected(reference.parse_title(title, category))
+            f.write(json.dumps({'title': title, 'category': category, 'expected': expected},
+                               ensure_ascii=False) + '\n')
+
+
+def load_golden(path: str) -> tuple[dict, list[dict]]:
+    """Returns: (header, entries)"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != GOLDEN_FORMAT:
+            raise ValueError(f"unsupported golden corpus format: {header.get('format')}")
+        return header, [json.loads(line) for line in f]
+
+
+def diff_fields(expected: dict, actual: dict) -> list[str]:
+    """
+    Fields of a parse result that differ from the expected output.
+
+    Attributes are compared on the reference's keys only, so an engine may
+    add its own (such as "span").
+    """
+    return [field for field in FIELDS if expected.get(field) != _comparable(field, actual.get(field))]
+
+
+def _comparable(field: str, value):
+    if field == 'attributes' and isinstance(value, list):
+        return [{key: attr.get(key) for key in ('type', 'value', 'position')} if isinstance(attr, dict) else attr
+                for attr in value]
+    return value
+
+
+def check(engine: Callable[[str, str], dict], entries: Iterable[dict]) -> list[dict]:
+    """Run the engine over golden entries; returns the mismatching entries with what the engine gave."""
+    mismatches = []
+    for entry in entries:
+        try:
+            actual = engine(entry['title'], entry['category'])
+        except Exception as exc:  # A crash is a mismatch too
+            actual = {'error': f"{type(exc).__name__}: {exc}"}
+        fields = diff_fields(entry['expected'], actual)
+        if fields:
+            mismatches.append({**entry, 'actual': actual, 'fields': fields})
+    return mismatches
+
+
+def differential_entries(n: int, seed: int) -> list[dict]:
+    """Fresh synthetic cases with expected output from the live reference parser."""
+    per_category = max(n // (len(ATTRIBUTES) + 1), 1)
+    return [
+        {'title': title, 'category': category, 'expected': _expected(reference.parse_title(title, category))}
+        for title, category in build_corpus(per_category, seed)
+    ]
+
+
+def report(name: str, entries: list[dict], mismatches: list[dict], show: int) -> str:
+    lines = [f"{name}: {len(entries) - len(mismatches)}/{len(entries)} identical"]
+    if mismatches:
+        by_category = Counter(m['category'] for m in mismatches)
+        totals = Counter(e['category'] for e in entries)
+        by_field = Counter(field for m in mismatches for field in m['fields'])
+        lines.append("  by category: " + ", ".join(
+            f"{category} {count}/{totals[category]}" for category, count in by_category.most_common()))
+        lines.append("  by field:    " + ", ".join(f"{field} {count}" for field, count in by_field.most_common()))
+        for m in mismatches[:show]:
+            lines.append(f"  - [{m['category']}] {m['title']!r} differs in {', '.join(m['fields'])}")
+            for field in m['fields']:
+                lines.append(f"      expected {field}: {m['expected'][field]!r}")
+                lines.append(f"      actual   {field}: {m['actual'].get(field, m['actual'].get('error'))!r}")
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m equivalence.run",
+                                     description="Compare a parsing engine with the reference parser.")
+    parser.add_argument("--engine", action="append", metavar="MODULE:FUNCTION",
+                        help=f"Engine(s) to check (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden corpus (gzipped JSON lines)")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="Rebuild the golden corpus from the reference parser and exit")
+    parser.add_argument("--per-category", type=int, default=2000, help="Synthetic titles per category (regenerate)")
+    parser.add_argument("--differential", type=int, default=0, metavar="N",
+                        help="Also compare against the live reference on about N fresh synthetic titles")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for --differential titles")
+    parser.add_argument("--show", type=int, default=5, help="Mismatches to print per engine")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.regenerate:
+        cases = build_corpus(args.per_category)
+        write_golden(args.golden, cases)
+        print(f"Wrote {len(cases)} golden cases to {args.golden}")
+        return 0
+
+    header, golden = load_golden(args.golden)
+    if header.get('dictionary_version') != get_dictionary_version():
+        print(f"error: the golden corpus was built with dictionary version {header.get('dictionary_version')}, "
+              f"now {get_dictionary_version()}. Run with --regenerate after a dictionary change.", file=sys.stderr)
+        return 2
+
+    suites = [('golden', golden)]
+    if args.differential:
+        suites.append((f'differential (seed {args.seed})', differential_entries(args.differential, args.seed)))
+
+    failed = False
+    for spec in args.engine or [DEFAULT_ENGINE]:
+        engine = load_engine(spec)
+        for name, entries in suites:
+            mismatches = check(engine, entries)
+            print(report(f"{spec} / {name}", entries, mismatches, args.show))
+            failed = failed or bool(mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,504 @@
+"""
+HTTP service for parsing and analyzing titles (asyncio, standard library only).
+
+Usage:
+    python -m server --port 8080 --workers 4
+
+Endpoints:
+    POST /parse     {"title": "...", "category": "auto"}        -> parse_title result
+                    {"titles": ["...", ...], "category": "auto"} -> list of results
+    POST /analyze   {"listings": [{"title": ..., "position": ..., "keyword": ...}, ...],
+                     "category": "auto", "keyword": null, "dedup": true}
+                                                                 -> pattern stats and popular attributes
+                    ("dedup": "normalized" also merges titles differing only in case or spacing)
+                    ("category": "auto-words" detects categories from whole words only)
+                    ("shopping_results": 40 or {"keyword": 60, ...} sets the results per
+                     keyword that performance_pct is measured against)
+    GET  /metrics   Prometheus text format
+    GET  /health    Queue depth and latency percentiles (JSON)
+
+Titles from concurrent /parse requests are queued and parsed in
+micro-batches by a process pool running parse_titles_batch. The queue is
+bounded: when it is full (or too many analyses are running) the server
+answers 503 with Retry-After instead of letting latency grow without limit.
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Mapping, Optional, Union
+
+import pandas as pd
+
+from config.attributes import ATTRIBUTES
+from utils.analysis import (
+    DEFAULT_SHOPPING_RESULTS, calculate_pattern_stats, deduplicate_titles, drop_missing_titles, filter_keyword,
+    parse_listings_columnar,
+)
+from utils.categories import AUTO_CATEGORIES
+from utils.title_parser import DEFAULT_ENGINE, ENGINES, get_category_matcher, parse_titles_batch
+
+CATEGORIES = [*AUTO_CATEGORIES, 'all', *ATTRIBUTES]
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the micro-batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_HEADER_LINES = 100
+
+
+class HTTPError(Exception):
+    """A request that gets an error response with this status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Overloaded(HTTPError):
+    """The parse queue or the analysis slots are full."""
+
+    def __init__(self, message: str):
+        super().__init__(503, message)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes them."""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty or beyond the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def prometheus(self, name: str, labels: str = "") -> list[str]:
+        sep = "," if labels else ""
+        lines = []
+        seen = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            seen += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {seen}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines += [f"{name}_sum{suffix} {self.sum:.9f}", f"{name}_count{suffix} {self.count}"]
+        return lines
+
+
+def _init_worker():
+    """Build every category's compiled matcher once per worker process."""
+    for category in ['all', *ATTRIBUTES]:
+        get_category_matcher(category)
+
+
+def analyze_listings(listings: list[dict], category: str, keyword: Optional[str] = None,
+                     deduplicate: bool = True, normalize: bool = False,
+                     shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS) -> dict:
+    """
+    Pattern stats and popular attributes for listings (title, position and
+    optional keyword); shopping_results is passed on to calculate_pattern_stats.
+    """
+    df = pd.DataFrame.from_records(listings)
+    missing = [col for col in ('title', 'position') if col not in df.columns]
+    if missing:
+        raise ValueError(f"listings are missing required field(s): {', '.join(missing)}")
+
+    df, excluded = drop_missing_titles(df)
+    df = filter_keyword(df, keyword)
+    if deduplicate:
+        df = deduplicate_titles(df, normalize)
+    parsed_df, parsed_columns = parse_listings_columnar(
+        df['title'].tolist(), df['position'].tolist(),
+        df['keyword'].tolist() if 'keyword' in df.columns else [], category, workers=None,
+    )
+    pattern_stats = calculate_pattern_stats(parsed_df, shopping_results)
+    return {
+        'listings': len(parsed_df),
+        # Listings without a title, left out
+        'excluded_listings': excluded,
+        'pattern_stats': pattern_stats.to_dict('records'),
+        'popular_attributes': parsed_columns.attribute_type_counts(),
+    }
+
+
+class MicroBatcher:
+    """
+    Queue of single titles, parsed in batches by a process pool.
+
+    A batch is dispatched once max_batch titles are waiting or the first
+    one has waited max_wait seconds. At most max_inflight batches run at
+    once; while they do, titles keep queueing, so batches grow with load.
+    """
+
+    def __init__(self, executor: ProcessPoolExecutor, max_inflight: int, max_batch: int = 256,
+                 max_wait: float = 0.005, max_queue: int = 10_000):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.titles_parsed = 0
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._tasks: set = set()
+
+    async def parse(self, titles: list[str], category: str, engine: str = DEFAULT_ENGINE) -> list[dict]:
+        """Parse results for titles, in order; raises Overloaded if the queue can't take them all."""
+        if self.queue.maxsize - self.queue.qsize() < len(titles):
+            raise Overloaded(f"parse queue is full ({self.queue.qsize()} titles waiting)")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for title in titles:
+            future = loop.create_future()
+            self.queue.put_nowait((title, category, engine, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def run(self):
+        """Collect and dispatch batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: list[tuple]):
+        loop = asyncio.get_running_loop()
+        try:
+            self.batch_sizes.observe(len(batch))
+            groups: dict[tuple, list] = {}
+            for title, category, engine, future in batch:
+                groups.setdefault((category, engine), []).append((title, future))
+
+            for (category, engine), items in groups.items():
+                titles = [title for title, _ in items]
+                try:
+                    results = await loop.run_in_executor(
+                        self.executor, partial(parse_titles_batch, titles, category, engine=engine)
+                    )
+                except Exception as exc:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(exc)
+                    continue
+                self.titles_parsed += len(titles)
+                for (_, future), result in zip(items, results):
+                    # The client may have disconnected meanwhile
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._slots.release()
+
+
+class TitleService:
+    """Routes requests to the batcher and the pool, and keeps the metrics."""
+
+    def __init__(self, executor: ProcessPoolExecutor, batcher: MicroBatcher, max_analyses: int):
+        self.executor = executor
+        self.batcher = batcher
+        self.max_analyses = max_analyses
+        self.analyses_running = 0
+        self.requests: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self.latency: dict[str, Histogram] = {}
+        self.started = time.time()
+        self.routes = {
+            ('POST', '/parse'): self.handle_parse,
+            ('POST', '/analyze'): self.handle_analyze,
+            ('GET', '/metrics'): self.handle_metrics,
+            ('GET', '/health'): self.handle_health,
+        }
+
+    async def handle_parse(self, body: dict):
+        category = _option(body, 'category', 'auto', CATEGORIES)
+        engine = _option(body, 'engine', DEFAULT_ENGINE, list(ENGINES))
+        if 'titles' in body:
+            titles = body['titles']
+            if not isinstance(titles, list) or not all(isinstance(title, str) for title in titles):
+                raise HTTPError(400, '"titles" must be a list of strings')
+            if len(titles) > self.batcher.queue.maxsize:
+                # Would never fit, however long the client waited
+                raise HTTPError(413, f"at most {self.batcher.queue.maxsize} titles per request")
+            return 200, await self.batcher.parse(titles, category, engine)
+        title = body.get('title')
+        if not isinstance(title, str):
+            raise HTTPError(400, 'give "title" (a string) or "titles" (a list of strings)')
+        return 200, (await self.batcher.parse([title], category, engine))[0]
+
+    async def handle_analyze(self, body: dict):
+        listings = body.get('listings')
+        if not isinstance(listings, list) or not all(isinstance(row, dict) for row in listings):
+            raise HTTPError(400, '"listings" must be a list of objects with title and position')
+        category = _option(body, 'category', 'auto', CATEGORIES)
+        dedup = body.get('dedup', True)
+        if dedup not in (True, False, 'normalized'):
+            raise HTTPError(400, '"dedup" must be true, false or "normalized"')
+        shopping_results = body.get('shopping_results', DEFAULT_SHOPPING_RESULTS)
+        totals = shopping_results.values() if isinstance(shopping_results, dict) else [shopping_results]
+        if not all(isinstance(total, int) and not isinstance(total, bool) and total > 0 for total in totals):
+            raise HTTPError(400, '"shopping_results" must be a positive integer or an object of keyword -> integer')
+        if self.analyses_running >= self.max_analyses:
+            raise Overloaded(f"{self.analyses_running} analyses already running")
+
+        self.analyses_running += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                partial(analyze_listings, listings, category, body.get('keyword'),
+                        deduplicate=bool(dedup), normalize=dedup == 'normalized',
+                        shopping_results=shopping_results),
+            )
+        except ValueError as exc:
+            raise HTTPError(400, str(exc))
+        finally:
+            self.analyses_running -= 1
+        return 200, result
+
+    async def handle_metrics(self, body: dict):
+        return 200, self.prometheus()
+
+    async def handle_health(self, body: dict):
+        return 200, {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'queued_titles': self.batcher.queue.qsize(),
+            'analyses_running': self.analyses_running,
+            'latency': {
+                endpoint: {'p50': histogram.quantile(0.5), 'p99': histogram.quantile(0.99), 'count': histogram.count}
+                for endpoint, histogram in self.latency.items()
+            },
+        }
+
+    def observe(self, endpoint: str, status: int, seconds: float):
+        self.requests[(endpoint, status)] += 1
+        if status == 503:
+            self.rejected[endpoint] += 1
+        self.latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(seconds)
+
+    def prometheus(self, prefix: str = "title_service") -> str:
+        lines = [
+            f"# HELP {prefix}_requests_total Requests by endpoint and response status.",
+            f"# TYPE {prefix}_requests_total counter",
+            *(f'{prefix}_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+              for (endpoint, status), count in sorted(self.requests.items())),
+            f"# HELP {prefix}_rejected_total Requests turned away with 503 because the service was full.",
+            f"# TYPE {prefix}_rejected_total counter",
+            *(f'{prefix}_rejected_total{{endpoint="{endpoint}"}} {count}'
+              for endpoint, count in sorted(self.rejected.items())),
+            f"# HELP {prefix}_request_seconds Time from reading a request to writing its response.",
+            f"# TYPE {prefix}_request_seconds histogram",
+        ]
+        for endpoint, histogram in sorted(self.latency.items()):
+            lines += histogram.prometheus(f"{prefix}_request_seconds", f'endpoint="{endpoint}"')
+        lines += [
+            f"# HELP {prefix}_batch_size Titles per micro-batch sent to the parser pool.",
+            f"# TYPE {prefix}_batch_size histogram",
+            *self.batcher.batch_sizes.prometheus(f"{prefix}_batch_size"),
+            f"# HELP {prefix}_titles_parsed_total Titles parsed by the pool.",
+            f"# TYPE {prefix}_titles_parsed_total counter",
+            f"{prefix}_titles_parsed_total {self.batcher.titles_parsed}",
+            f"# HELP {prefix}_queued_titles Titles waiting for a batch.",
+            f"# TYPE {prefix}_queued_titles gauge",
+            f"{prefix}_queued_titles {self.batcher.queue.qsize()}",
+            f"# HELP {prefix}_analyses_running Analyses currently in the pool.",
+            f"# TYPE {prefix}_analyses_running gauge",
+            f"{prefix}_analyses_running {self.analyses_running}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection (keep-alive) until the client closes it."""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as exc:
+                    await _write_response(writer, exc.status, {'error': str(exc)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, keep_alive, raw_body = request
+
+                started = time.perf_counter()
+                handler = self.routes.get((method, path))
+                endpoint = path if handler else 'other'
+                headers = {}
+                try:
+                    if handler is None:
+                        raise HTTPError(405 if any(path == route for _, route in self.routes) else 404,
+                                        f"no route for {method} {path}")
+                    status, payload = await handler(_json_body(raw_body) if method == 'POST' else {})
+                except HTTPError as exc:
+                    status, payload = exc.status, {'error': str(exc)}
+                    if isinstance(exc, Overloaded):
+                        headers['Retry-After'] = '1'
+                except Exception as exc:  # A bug in one request shouldn't take the connection down silently
+                    status, payload = 500, {'error': f"{type(exc).__name__}: {exc}"}
+
+                await _write_response(writer, status, payload, keep_alive, headers)
+                self.observe(endpoint, status, time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _option(body: dict, name: str, default: str, choices: list) -> str:
+    value = body.get(name, default)
+    if value not in choices:
+        raise HTTPError(400, f'"{name}" must be one of: {", ".join(choices)}')
+    return value
+
+
+def _json_body(raw: bytes) -> dict:
+    try:
+        body = json.loads(raw or b'{}')
+    except ValueError as exc:
+        raise HTTPError(400, f"invalid JSON: {exc}")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "request body must be a JSON object")
+    return body
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[tuple[str, str, bool, bytes]]:
+    """Returns: (method, path, keep_alive, body), or None when the client closed the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(431, "too many header lines")
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(411, "chunked bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return method, target.split('?', 1)[0], keep_alive, body
+
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 411: 'Length Required',
+           413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool,
+                          headers: Optional[dict] = None):
+    if isinstance(payload, str):
+        body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json'
+    head = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        *(f"{name}: {value}" for name, value in (headers or {}).items()),
+    ]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+
+async def serve(host: str, port: int, workers: int, max_batch: int, max_wait: float, max_queue: int,
+                max_analyses: int):
+    """Run the service until cancelled."""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        # One batch per worker plus one being collected keeps the pool busy
+        batcher = MicroBatcher(executor, workers + 1, max_batch, max_wait, max_queue)
+        service = TitleService(executor, batcher, max_analyses)
+        batch_loop = asyncio.create_task(batcher.run())
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port} with {workers} parser processes", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_loop.cancel()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m server", description="HTTP service for title parsing.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes (0 = every CPU)")
+    parser.add_argument("--max-batch", type=int, default=256, help="Most titles per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="Longest a queued title waits for its batch to fill (default: 5)")
+    parser.add_argument("--max-queue", type=int, default=10_000,
+                        help="Titles that may wait for a batch before /parse answers 503")
+    parser.add_argument("--max-analyses", type=int, default=4,
+                        help="Concurrent /analyze requests before answering 503")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        asyncio.run(serve(args.host, args.port, workers, args.max_batch, args.max_wait_ms / 1000,
+                          args.max_queue, args.max_analyses))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
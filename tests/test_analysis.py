@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from utils.analysis import ParsedUpload, calculate_keyword_pattern_stats, calculate_pattern_stats
+from utils.pattern_groups import PatternGroups
+from utils.streaming import StreamingAnalysis
+from utils.title_parser import parse_title
+
+UPLOAD = pd.DataFrame({
+    'title': ["Nike Running Shoes", None, "   ", "Adidas Hoodie", "Nike Running Shoes", np.nan],
+    'position': [1, 2, 3, 4, 5, 6],
+    'keyword': ["a", "a", "b", "b", "b", "b"],
+})
+
+
+def test_upload_with_null_titles():
+    upload = ParsedUpload(UPLOAD, "auto", workers=None)
+    assert upload.rows_excluded == 2
+
+    parsed_df, parsed = upload.view(deduplicate=False)
+    assert parsed_df['title'].tolist() == ["Nike Running Shoes", "   ", "Adidas Hoodie", "Nike Running Shoes"]
+    assert parsed.to_results()[1]['pattern'] == "[Unknown]"
+
+    parsed_df, _ = upload.view("b")
+    assert sorted(parsed_df['title']) == ["   ", "Adidas Hoodie", "Nike Running Shoes"]
+
+
+def test_streaming_skips_the_same_rows():
+    for deduplicate in (False, True):
+        analysis = StreamingAnalysis("auto", deduplicate=deduplicate, workers=None)
+        analysis.add_chunk(UPLOAD)
+        pattern_stats, _, _ = analysis.finish()
+        assert analysis.rows_excluded == 2
+
+        parsed_df, _ = ParsedUpload(UPLOAD, "auto", workers=None).view(deduplicate=deduplicate)
+        expected = calculate_pattern_stats(parsed_df).set_index('pattern')
+        streamed = pattern_stats.set_index('pattern').loc[expected.index]
+        assert streamed['count'].tolist() == expected['count'].tolist()
+        np.testing.assert_allclose(streamed['avg_position'], expected['avg_position'])
+
+
+TWO_KEYWORDS = pd.DataFrame({
+    'title': ["Nike Running Shoes", "Nike Running Shoes", "Adidas Hoodie"],
+    'position': [1, 30, 2],
+    'keyword': ["running shoes", "nike", "nike"],
+})
+
+
+def test_keyword_stats_keep_each_keywords_position():
+    upload = ParsedUpload(TWO_KEYWORDS, "auto", workers=None)
+    parsed_df, _ = upload.view()
+    assert len(parsed_df) == 2
+
+    keyword_df, _ = upload.view(per_keyword=True)
+    stats = calculate_keyword_pattern_stats(keyword_df).set_index(['keyword', 'pattern'])
+    shoes = parse_title("Nike Running Shoes", "auto")["pattern"]
+    assert stats.loc[("running shoes", shoes), 'avg_position'] == 1
+    assert stats.loc[("nike", shoes), 'avg_position'] == 30
+
+
+def test_shopping_results_per_keyword():
+    totals = {"running shoes": 20, "nike": 60}
+    parsed_df, _ = ParsedUpload(TWO_KEYWORDS, "auto", workers=None).view(per_keyword=True)
+    expected = calculate_pattern_stats(parsed_df, totals).set_index('pattern')
+    # (1 - 1/20 + 1 - 30/60) / 2
+    assert expected.loc[parse_title("Nike Running Shoes", "auto")["pattern"], 'performance_pct'] == 72.5
+
+    analysis = StreamingAnalysis("auto", workers=None, per_keyword=True)
+    analysis.add_chunk(TWO_KEYWORDS)
+    pattern_stats, _, _ = analysis.finish(totals)
+    streamed = pattern_stats.set_index('pattern').loc[expected.index]
+    assert streamed['performance_pct'].tolist() == expected['performance_pct'].tolist()
+
+    groups = PatternGroups(pattern_stats['pattern'], 'prefix').rollup(analysis.state, None, totals)
+    assert groups['performance_pct'].notna().all()
+
@@ -0,0 +1,44 @@
+import numpy as np
+
+from utils.categories import detect_categories, score_category
+from utils.columnar import ParsedColumns
+from utils.title_parser import parse_cache, parse_title, parse_titles_batch
+
+TITLES = ["Stainless Steel Drink Bottle", "Nike Running Shoes", "Woolworths Lean Beef Mince 500g", "Plain Box"]
+
+
+def test_whole_words_ignore_indicators_inside_words():
+    # "tee" inside "steel" is a sportswear keyword unless whole words are required
+    assert parse_title("Stainless Steel Drink Bottle", "auto")["detected_category"] == "sportswear"
+    assert parse_title("Stainless Steel Drink Bottle", "auto-words")["detected_category"] == "baby"
+
+
+def test_batch_confidence_matches_single_titles():
+    for whole_words in (False, True):
+        categories, confidence = detect_categories(TITLES, whole_words)
+        singles = [score_category(title, whole_words) for title in TITLES]
+        assert list(categories) == [category for category, _ in singles]
+        np.testing.assert_allclose(confidence, [value for _, value in singles])
+
+
+def test_parse_results_carry_confidence():
+    parse_cache.clear()
+    batch = parse_titles_batch(TITLES, "auto-words")
+    parse_cache.clear()
+    assert batch == [parse_title(title, "auto-words") for title in TITLES]
+    assert batch[3]["detected_category"] == "all" and batch[3]["category_confidence"] == 0.0
+    assert parse_title("Nike Running Shoes", "sportswear")["category_confidence"] is None
+
+
+def test_parsed_columns_keep_confidence():
+    results = parse_titles_batch(TITLES, "auto") + parse_titles_batch(TITLES[:1], "baby")
+    assert ParsedColumns.from_results(results).to_results() == results
+
+
+def test_old_import_locations_still_work():
+    from config.attributes import detect_category as config_detect_category
+    from utils.categories import detect_category
+    from utils.title_parser import find_attribute_in_original
+
+    assert [config_detect_category(title) for title in TITLES] == [detect_category(title) for title in TITLES]
+    assert find_attribute_in_original("Nike Shoes", "Nike Shoes", ["Nike"]) == ("Nike", 0, "Shoes")
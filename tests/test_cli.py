@@ -0,0 +1,53 @@
+import json
+
+import pandas as pd
+import pytest
+
+from cli import CATEGORIES, build_parser, load_shopping_results, main
+from config.attributes import ATTRIBUTES
+from utils.pattern_state import PatternState
+
+SCRAPE = pd.DataFrame({
+    'title': ["Nike Running Shoes", "Nike Running Shoes", "Adidas Hoodie"],
+    'position': [1, 9, 2],
+    'keyword': ["running shoes", "nike", "nike"],
+})
+
+
+def run_cli(tmp_path, name, *args):
+    source = tmp_path / "scrape.csv"
+    SCRAPE.to_csv(source, index=False)
+    output_dir = tmp_path / name
+    assert main([str(source), "--no-cache", "--workers", "1", "--output-dir", str(output_dir), *args]) == 0
+    return pd.read_csv(output_dir / "pattern_stats.csv")
+
+
+def test_saving_state_leaves_the_report_alone(tmp_path):
+    plain = run_cli(tmp_path, "plain")
+    saved = run_cli(tmp_path, "saved", "--save-state", str(tmp_path / "state.json"))
+    pd.testing.assert_frame_equal(plain, saved)
+    assert plain['count'].sum() == 2
+
+    # The state itself counts the title once per keyword
+    state = PatternState.load(tmp_path / "state.json")
+    assert sum(aggregate.count for aggregate in state.aggregates.values()) == 3
+
+
+def test_categories_follow_the_dictionaries():
+    assert set(ATTRIBUTES) < set(CATEGORIES)
+    assert build_parser().parse_args(["x.csv", "--category", "auto-words"]).category == "auto-words"
+
+
+def test_shopping_results_must_be_positive_whole_numbers(tmp_path):
+    assert load_shopping_results("40") == 40
+    path = tmp_path / "totals.csv"
+    path.write_text("keyword,shopping_results\nnike,60\nshoes,40.0\n")
+    assert load_shopping_results(str(path)) == {"nike": 60, "shoes": 40}
+
+    for value in ["0", 0.5, -3, True, "40", None, 1e400]:
+        path = tmp_path / "totals.json"
+        path.write_text(json.dumps({"nike": 60, "shoes": value}))
+        with pytest.raises(ValueError):
+            load_shopping_results(str(path))
+    with pytest.raises(ValueError):
+        load_shopping_results("0")
@@ -0,0 +1,29 @@
+import numpy as np
+
+from utils.analysis import parse_listings_columnar
+from utils.arrow_io import parsed_table
+from utils.columnar import ParsedColumns
+from utils.title_parser import parse_titles_batch
+
+TITLES = ["Nike Running Shoes", "Tommee Tippee Baby Bottles 260ml 3 Pack", "Plain Box", "Nike Running Shoes"]
+
+
+def test_spans_survive_the_columnar_round_trip():
+    results = parse_titles_batch(TITLES, "auto", engine="spans")
+    parsed = ParsedColumns.from_results(results)
+    assert parsed.to_results() == results
+    assert parsed.take(np.array([3, 1])).to_results() == [results[3], results[1]]
+
+
+def test_classic_results_have_no_spans():
+    parsed = ParsedColumns.from_results(parse_titles_batch(TITLES, "auto"))
+    assert parsed.spans() is None
+    assert all("span" not in attr for result in parsed.to_results() for attr in result["attributes"])
+
+
+def test_parsed_table_carries_spans():
+    parsed_df, parsed = parse_listings_columnar(TITLES, [1, 2, 3, 4], [], "auto", workers=None, engine="spans")
+    attributes = parsed_table(parsed_df, parsed).column("attributes").to_pylist()
+    expected = parse_titles_batch(TITLES, "auto", engine="spans")
+    assert [[(a["span_start"], a["span_end"]) for a in row] for row in attributes] == \
+        [[tuple(a["span"]) for a in result["attributes"]] for result in expected]
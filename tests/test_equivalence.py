@@ -0,0 +1,29 @@
+from collections import defaultdict
+
+from config.attributes import get_dictionary_version
+from equivalence.run import GOLDEN_PATH, check, diff_fields, load_golden
+from utils.title_parser import parse_title_uncached, parse_titles_batch
+
+HEADER, GOLDEN = load_golden(GOLDEN_PATH)
+
+
+def test_golden_corpus_is_current():
+    # Otherwise: python -m equivalence.run --regenerate
+    assert HEADER['dictionary_version'] == get_dictionary_version()
+
+
+def test_classic_parser_matches_golden():
+    assert check(parse_title_uncached, GOLDEN) == []
+
+
+def test_batch_parser_matches_golden():
+    by_category = defaultdict(list)
+    for entry in GOLDEN:
+        by_category[entry['category']].append(entry)
+
+    mismatches = []
+    for category, entries in by_category.items():
+        results = parse_titles_batch([entry['title'] for entry in entries], category, workers=None)
+        mismatches += [entry['title'] for entry, result in zip(entries, results)
+                       if diff_fields(entry['expected'], result)]
+    assert mismatches == []
@@ -0,0 +1,92 @@
+import re
+
+from utils.matcher import DictionaryMatcher, RegexBank
+
+BRANDS = ["Baby Bottles", "Tommee Tippee", "Tommee", "Nike", "NIKE", "C++", "L'Oreal", "Bottles"]
+
+
+def sequential_search(values: list[str], text: str):
+    """What DictionaryMatcher replaces: re.search each value in list order, keep the first hit."""
+    for value in values:
+        match = re.search(r'\b' + re.escape(value.lower()) + r'\b', text)
+        if match:
+            return value, match.start()
+    return None
+
+
+def dictionary_match(values: list[str], text: str):
+    matcher = DictionaryMatcher({'brand': values})
+    found = matcher.first_match(matcher.scan(text), 'brand')
+    return None if found is None else (found[0], found[2])
+
+
+def test_dictionary_list_order_wins():
+    # "Tommee" is found first in the text, but "Tommee Tippee" is earlier in the list
+    assert dictionary_match(BRANDS, "tommee tippee bottle") == ("Tommee Tippee", 0)
+    assert dictionary_match(["Tommee", "Tommee Tippee"], "tommee tippee bottle") == ("Tommee", 0)
+    # Case-only duplicates: the first spelling wins
+    assert dictionary_match(BRANDS, "nike shoes") == ("Nike", 0)
+
+
+def test_dictionary_overlapping_entries():
+    text = "tommee tippee baby bottles"
+    matcher = DictionaryMatcher({'brand': BRANDS})
+    hits = matcher.scan(text)
+    assert sorted(key for _, key in hits) == ["baby bottles", "bottles", "tommee", "tommee tippee"]
+    assert matcher.first_match(hits, 'brand') == ("Baby Bottles", "baby bottles", 14, 26)
+
+    # Hits over consumed characters are skipped, so the next value in the list wins
+    consumed = bytearray(len(text))
+    consumed[14:26] = b"\x01" * 12
+    assert matcher.first_match(hits, 'brand', consumed) == ("Tommee Tippee", "tommee tippee", 0, 13)
+
+
+def test_dictionary_word_boundaries():
+    for text in ["nikes", "unike", "nike_air", "nike-air", "(nike)", "c++ primer", "c++x", "xc++",
+                 "l'oreal paris", "l'oreals", "bottles.", "", "nike", "tommee tippee"]:
+        assert dictionary_match(BRANDS, text) == sequential_search(BRANDS, text), text
+
+
+def test_dictionary_first_occurrence_wins():
+    assert dictionary_match(BRANDS, "bottles and more bottles") == ("Bottles", 0)
+    assert DictionaryMatcher.first_positions([(0, "nike"), (5, "bottles"), (9, "nike")]) == {"nike": 0, "bottles": 5}
+
+
+PATTERNS = [r"\d+\s*pack", r"\d+\s*ml", r"\d+"]
+
+
+def sequential_regex(patterns: list[str], text: str):
+    for index, pattern in enumerate(patterns):
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return index, match.span()
+    return None
+
+
+def bank_search(bank: RegexBank, text: str, *args):
+    found = bank.search(text, *args)
+    return None if found is None else (found[0], found[1].span())
+
+
+def test_regex_bank_list_order_wins():
+    bank = RegexBank(PATTERNS, re.IGNORECASE, precheck=r"\d")
+    for text in ["260ml bottles 6 pack", "6 Pack of 260 ML", "size 3", "no digits", "12 PACK 12pack", ""]:
+        assert bank_search(bank, text) == sequential_regex(PATTERNS, text), text
+
+
+def test_regex_bank_first_occurrence_and_overlaps():
+    bank = RegexBank(PATTERNS, re.IGNORECASE)
+    # "6 pack" and "6" both match at 0; the pack pattern outranks the bare number
+    assert bank_search(bank, "6 pack, 2 pack") == (0, (0, 6))
+    # Later, higher-priority match beats an earlier bare number
+    assert bank_search(bank, "x 3 then 500ml") == (1, (9, 14))
+    assert bank_search(bank, "x 3 then 500ml", 0, 5) == (2, (2, 3))
+
+
+def test_regex_bank_segments():
+    bank = RegexBank(PATTERNS, re.IGNORECASE)
+    text = "12 red 6 pack"
+    found = bank.search_segments(text, [(0, 6), (7, len(text))])
+    assert (found[0], found[1].span()) == (0, (7, 13))
+    # No match spans two segments
+    assert bank.search_segments("6 | pack", [(0, 2), (4, 8)])[0] == 2
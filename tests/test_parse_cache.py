@@ -0,0 +1,103 @@
+from cli import main
+from config.attributes import BRANDS, dictionaries_changed, get_dictionary_version
+from utils.columnar import ParsedColumns, ParsedColumnsBuilder
+from utils.parse_cache import PARSER_VERSION, ParseCache, ParseStore
+from utils.title_parser import iter_parsed_blocks, parse_cache, parse_title, parse_titles_batch
+
+RESULT = {"attributes": [], "pattern": "[Unknown]", "remaining": "x", "detected_category": "baby"}
+BRAND_RESULT = {"attributes": [{"type": "Brand", "value": "Nike", "position": 0}], "pattern": "[Brand]",
+                "remaining": "", "detected_category": "sportswear"}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ParseCache(max_entries=2)
+    cache.put("a", "auto", "v1", RESULT)
+    assert cache.get("a", "auto", "v1") is None  # version not current yet, so nothing was stored
+    cache.put("a", "auto", "v1", RESULT)
+    cache.put("b", "auto", "v1", RESULT)
+    assert cache.get("a", "auto", "v1") == RESULT  # "b" is now the least recently used
+    cache.put("c", "auto", "v1", RESULT)
+    assert cache.get("b", "auto", "v1") is None
+    assert cache.get("a", "auto", "v1") == cache.get("c", "auto", "v1") == RESULT
+
+    cache.resize(1)
+    assert cache.get("a", "auto", "v1") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_cache_returns_copies():
+    cache = ParseCache()
+    cache.get("nike", "auto", "v1")
+    result = {**BRAND_RESULT, "attributes": [dict(attr) for attr in BRAND_RESULT["attributes"]]}
+    cache.put("nike", "auto", "v1", result)
+    result["attributes"][0]["value"] = "changed"
+
+    cached = cache.get("nike", "auto", "v1")
+    assert cached == BRAND_RESULT
+    cached["attributes"].append({"type": "Size", "value": "10", "position": 5})
+    cached["pattern"] = "changed"
+    assert cache.get("nike", "auto", "v1") == BRAND_RESULT
+
+
+def test_cache_is_dropped_when_dictionaries_change():
+    title = "Zorblax Running Shoes"
+    assert parse_title(title, "auto")["pattern"] == "[Product Type]"
+    assert parse_cache.get(title, "auto", get_dictionary_version()) is not None
+    BRANDS.insert(0, "Zorblax")
+    try:
+        dictionaries_changed()
+        assert parse_cache.get(title, "auto", get_dictionary_version()) is None
+        assert parse_cache.stats()["entries"] == 0
+        assert parse_title(title, "auto")["pattern"] == "[Brand] + [Product Type]"
+    finally:
+        BRANDS.remove("Zorblax")
+        dictionaries_changed()
+    assert parse_title(title, "auto")["pattern"] == "[Product Type]"
+
+
+def test_prune_keeps_only_current_version(tmp_path):
+    store = ParseStore(str(tmp_path / "cache.sqlite3"))
+    store.put_many({"a": RESULT, "b": RESULT}, "baby", "old")
+    store.put_many({"a": RESULT}, "baby", "new")
+
+    assert store.prune("new") == 2
+    assert len(store) == 1
+    assert store.get_many(["a"], "baby", "new") == {"a": RESULT}
+
+
+def test_results_from_another_parser_version_are_not_served(tmp_path, monkeypatch):
+    store = ParseStore(str(tmp_path / "cache.sqlite3"))
+    store.put_many({"a": RESULT}, "baby", "v1")
+
+    monkeypatch.setattr("utils.parse_cache.PARSER_VERSION", PARSER_VERSION + 1)
+    assert store.get_many(["a"], "baby", "v1") == {}
+    store.put_many({"b": RESULT}, "baby", "v1")
+    assert store.prune("v1") == 1
+    assert store.get_many(["a", "b"], "baby", "v1") == {"b": RESULT}
+
+
+def test_cli_prune_cache_without_input(tmp_path, monkeypatch):
+    monkeypatch.setattr("cli.get_dictionary_version", lambda: "new")
+    path = str(tmp_path / "cache.sqlite3")
+    store = ParseStore(path)
+    store.put_many({"a": RESULT}, "baby", "old")
+    store.put_many({"b": RESULT}, "baby", "new")
+
+    assert main(["--prune-cache", "--cache-path", path]) == 0
+    assert len(store) == 1
+
+
+def test_blockwise_parsing_through_store(tmp_path):
+    titles = ["Nike Running Shoes", "Tommee Tippee Baby Bottles 260ml", "Woolworths Lean Beef Mince 500g",
+              "Adidas Hoodie", "Plain Box"]
+    store = ParseStore(str(tmp_path / "cache.sqlite3"))
+    store.put_many({titles[1]: RESULT}, "auto", get_dictionary_version())
+
+    builder = ParsedColumnsBuilder()
+    for block in iter_parsed_blocks(titles, "auto", store=store, blocksize=2):
+        builder.extend(block)
+
+    expected = parse_titles_batch(titles, "auto")
+    expected[1] = RESULT
+    assert builder.build().to_results() == ParsedColumns.from_results(expected).to_results()
+    assert len(store) == len(titles)
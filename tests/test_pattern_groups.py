@@ -0,0 +1,92 @@
+import math
+
+import pandas as pd
+import pytest
+
+from utils.analysis import calculate_pattern_stats
+from utils.pattern_groups import PatternGroups, pattern_key
+from utils.pattern_state import PatternState
+
+BRAND_TYPE = "[Brand] + [Product Type]"
+BRAND_TYPE_COLOR = "[Brand] + [Product Type] + [Color]"
+BRAND_BRAND_TYPE = "[Brand] + [Brand] + [Product Type]"
+BRAND_TYPE_SIZE = "[Brand] + [Product Type] + [Size]"
+TYPE_SIZE = "[Product Type] + [Size]"
+
+# position None: a listing the scrape has no position for
+ROWS = pd.DataFrame({
+    'title': ["a", "b", "c", "d", "e", "f", "g"],
+    'pattern': [BRAND_TYPE, BRAND_TYPE, BRAND_TYPE_COLOR, BRAND_BRAND_TYPE, BRAND_TYPE_SIZE, TYPE_SIZE, TYPE_SIZE],
+    'position': [1, None, 10, 4, 20, 2, 8],
+    'keyword': ["shoes", "shoes", "shoes", "boots", "boots", "boots", "shoes"],
+})
+
+
+def state_of(rows: pd.DataFrame) -> PatternState:
+    state = PatternState()
+    state.add_frame(rows)
+    return state
+
+
+def test_pattern_key():
+    assert pattern_key(["Brand", "Product Type", "Brand", "Color"]) == ("Brand", "Product Type")
+    assert pattern_key(["Color", "Color"]) == ("Color",)
+    assert pattern_key([]) == ()
+
+
+def test_levels():
+    patterns = ROWS['pattern'].unique()
+    similar = PatternGroups(patterns, 'similar')
+    assert {similar.group_of(p) for p in (BRAND_TYPE, BRAND_TYPE_COLOR, BRAND_BRAND_TYPE)} == {BRAND_TYPE}
+    assert similar.group_of(BRAND_TYPE_SIZE) == BRAND_TYPE_SIZE
+    assert len(similar) == 3
+
+    prefix = PatternGroups(patterns, 'prefix')
+    assert prefix.group_of(BRAND_TYPE_SIZE) == BRAND_TYPE
+    assert prefix.group_of(TYPE_SIZE) == TYPE_SIZE
+    assert len(prefix) == 2
+
+    assert len(PatternGroups(patterns, 'pattern')) == len(patterns)
+    with pytest.raises(ValueError):
+        PatternGroups(patterns, 'brand')
+
+
+def test_relabel():
+    groups = PatternGroups([BRAND_TYPE, BRAND_TYPE_COLOR], 'similar')
+    labels = groups.relabel(pd.Series([BRAND_TYPE_COLOR, TYPE_SIZE, None, BRAND_TYPE], index=[5, 6, 7, 8]))
+    assert labels.index.tolist() == [5, 6, 7, 8]
+    assert labels.iloc[[0, 3]].tolist() == [BRAND_TYPE, BRAND_TYPE]
+    assert labels.iloc[[1, 2]].isna().all()
+
+
+def test_rollup_totals():
+    groups = PatternGroups(ROWS['pattern'], 'prefix')
+    rollup = groups.rollup(state_of(ROWS)).set_index('pattern')
+    assert rollup.loc[BRAND_TYPE, 'count'] == 5
+    assert rollup.loc[BRAND_TYPE, 'patterns'] == 4
+    assert rollup.loc[BRAND_TYPE, 'top_pattern'] == BRAND_TYPE
+    # Averaged over the four listings with a position, not the five listings
+    assert rollup.loc[BRAND_TYPE, 'avg_position'] == (1 + 10 + 4 + 20) / 4
+    assert rollup.loc[TYPE_SIZE, 'avg_position'] == 5
+
+    shoes = groups.rollup(state_of(ROWS), 'shoes').set_index('pattern')
+    assert shoes['count'].to_dict() == {BRAND_TYPE: 3, TYPE_SIZE: 1}
+    assert shoes.loc[BRAND_TYPE, 'patterns'] == 2
+
+
+def test_rollup_matches_rows():
+    groups = PatternGroups(ROWS['pattern'], 'similar')
+    for totals in (40, {"shoes": 20, "boots": 50}):
+        from_rows = groups.rollup_rows(ROWS, totals).set_index('pattern')
+        from_state = groups.rollup(state_of(ROWS), None, totals).set_index('pattern').loc[from_rows.index]
+        for column in ('count', 'avg_position', 'performance_pct', 'patterns', 'top_pattern'):
+            assert from_state[column].tolist() == from_rows[column].tolist(), column
+
+    # Per-keyword performance is worked out from every listing's position, not from the members' averages
+    totals = {"shoes": 20, "boots": 50}
+    relabelled = calculate_pattern_stats(ROWS.assign(pattern=groups.relabel(ROWS['pattern'])), totals)
+    rollup = groups.rollup(state_of(ROWS), None, totals)
+    expected = relabelled.set_index('pattern')['performance_pct']
+    assert rollup.set_index('pattern')['performance_pct'].to_dict() == expected.to_dict()
+    # (1 - 1/20) + (1 - 10/20) + (1 - 4/50) over three listings
+    assert math.isclose(expected[BRAND_TYPE], round((0.95 + 0.5 + 0.92) / 3 * 100, 1))
@@ -0,0 +1,58 @@
+import json
+from itertools import permutations
+
+import pandas as pd
+import pandas.testing as tm
+
+from utils.pattern_state import STATE_FORMAT, PatternState, merge_states
+from utils.streaming import StreamingAnalysis
+
+SCRAPE = pd.DataFrame({
+    'title': ["Nike Running Shoes", "Adidas Hoodie", "Nike Running Shoes", "Tommee Tippee Baby Bottles 260ml",
+              "Woolworths Lean Beef Mince 500g", "Adidas Hoodie", "Nike Running Shoes", "Adidas Hoodie"],
+    'position': [1, 2, None, 4, 5, 6, 7, 8],
+    'keyword': ["shoes", "shoes", "nike", "bottles", "mince", "nike", "shoes", "mince"],
+})
+TOTALS = {"shoes": 20, "nike": 60}
+
+
+def state_of(rows: pd.DataFrame, seen: str) -> PatternState:
+    analysis = StreamingAnalysis("auto", deduplicate=False, workers=None, seen=seen)
+    analysis.add_chunk(rows)
+    analysis.finish()
+    return analysis.state
+
+
+def canonical(state: PatternState) -> dict:
+    data = state.to_dict()
+    data['rows'] = sorted(data['rows'])
+    return data
+
+
+def test_merge_is_associative_and_order_independent():
+    a, b, c = (state_of(SCRAPE.iloc[i::3], f"2024-01-0{i + 1}") for i in range(3))
+    expected = canonical(merge_states([a, b, c]))
+    assert canonical(a.merge(b).merge(c)) == canonical(a.merge(b.merge(c))) == expected
+    for order in permutations([a, b, c]):
+        assert canonical(merge_states(order)) == expected
+    # Merging leaves its inputs alone
+    assert canonical(a) == canonical(state_of(SCRAPE.iloc[0::3], "2024-01-01"))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    state = state_of(SCRAPE, "2024-01-01")
+    path = tmp_path / "state.json"
+    state.save(path)
+    assert json.loads(path.read_text())['format'] == STATE_FORMAT == 2
+
+    loaded = PatternState.load(path)
+    assert loaded.to_dict() == state.to_dict()
+    tm.assert_frame_equal(loaded.to_pattern_stats(None, TOTALS), state.to_pattern_stats(None, TOTALS))
+
+
+def test_merged_halves_match_one_pass():
+    merged = state_of(SCRAPE.iloc[:4], "2024-01-01").merge(state_of(SCRAPE.iloc[4:], "2024-01-01"))
+    whole = state_of(SCRAPE, "2024-01-01")
+    for keyword in (None, "shoes"):
+        for totals in (40, TOTALS):
+            tm.assert_frame_equal(merged.to_pattern_stats(keyword, totals), whole.to_pattern_stats(keyword, totals))
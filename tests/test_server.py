@@ -0,0 +1,104 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from server import MAX_BODY_BYTES, MicroBatcher, TitleService
+from utils.title_parser import parse_title
+
+TITLES = ["Nike Running Shoes", "Tommee Tippee Baby Bottles 260ml", "Woolworths Lean Beef Mince 500g"]
+
+
+def serve(test, max_queue: int = 10_000, run_batches: bool = True):
+    """Run test(service, port) against a service on a free port (threads stand in for parser processes)."""
+    async def main():
+        with ThreadPoolExecutor(2) as executor:
+            batcher = MicroBatcher(executor, 2, max_wait=0.05, max_queue=max_queue)
+            service = TitleService(executor, batcher, max_analyses=1)
+            batch_loop = asyncio.create_task(batcher.run()) if run_batches else None
+            server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+            try:
+                return await test(service, server.sockets[0].getsockname()[1])
+            finally:
+                if batch_loop is not None:
+                    batch_loop.cancel()
+                server.close()
+                await server.wait_closed()
+    return asyncio.run(main())
+
+
+async def request(port: int, raw: bytes) -> tuple[int, dict, bytes]:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    lines = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    headers = {name.lower(): value for name, _, value in (line.partition(': ') for line in lines[1:] if line)}
+    body = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return int(lines[0].split()[1]), headers, body
+
+
+def post(path: str, payload) -> bytes:
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+
+
+def test_batcher_coalesces_concurrent_requests():
+    async def test(service, port):
+        results = await asyncio.gather(*(service.batcher.parse([title], "auto") for title in TITLES))
+        assert [result for result, in results] == [parse_title(title, "auto") for title in TITLES]
+        assert service.batcher.batch_sizes.count == 1
+        assert service.batcher.titles_parsed == len(TITLES)
+    serve(test)
+
+
+def test_full_queue_is_503():
+    async def test(service, port):
+        # Nothing takes titles off the queue, so the first two fill it
+        waiting = asyncio.create_task(service.batcher.parse(TITLES[:2], "auto"))
+        await asyncio.sleep(0)
+        status, headers, body = await request(port, post('/parse', {'titles': TITLES[2:]}))
+        assert status == 503 and headers['retry-after'] == '1'
+        assert service.rejected['/parse'] == 1
+        waiting.cancel()
+    serve(test, max_queue=len(TITLES) - 1, run_batches=False)
+
+
+def test_parse_and_analyze_round_trip():
+    async def test(service, port):
+        status, _, body = await request(port, post('/parse', {'title': TITLES[0], 'category': 'sportswear'}))
+        assert status == 200 and json.loads(body) == parse_title(TITLES[0], "sportswear")
+
+        status, _, body = await request(port, post('/parse', {'titles': TITLES}))
+        assert status == 200 and json.loads(body) == [parse_title(title, "auto") for title in TITLES]
+
+        listings = [{'title': TITLES[0], 'position': 1, 'keyword': 'a'},
+                    {'title': TITLES[0], 'position': 3, 'keyword': 'b'},
+                    {'title': None, 'position': 2, 'keyword': 'b'}]
+        status, _, body = await request(port, post('/analyze', {'listings': listings, 'shopping_results': 20}))
+        result = json.loads(body)
+        assert status == 200
+        assert result['listings'] == 1 and result['excluded_listings'] == 1
+        assert result['pattern_stats'][0]['avg_position'] == 2.0
+        assert result['pattern_stats'][0]['performance_pct'] == 90.0
+    serve(test)
+
+
+def test_error_statuses():
+    async def test(service, port):
+        cases = [
+            (post('/parse', b'{not json'), 400),
+            (post('/parse', {'title': TITLES[0], 'category': 'toys'}), 400),
+            (post('/analyze', {'listings': [{'title': TITLES[0]}]}), 400),
+            (post('/analyze', {'listings': [], 'shopping_results': True}), 400),
+            (b"POST /parse HTTP/1.1\r\nContent-Length: -5\r\n\r\n", 400),
+            (b"POST /parse HTTP/1.1\r\nContent-Length: five\r\n\r\n", 400),
+            (b"POST /parse HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n", 411),
+            (f"POST /parse HTTP/1.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode(), 413),
+            (b"GET /parse HTTP/1.1\r\nConnection: close\r\n\r\n", 405),
+            (b"GET /nowhere HTTP/1.1\r\nConnection: close\r\n\r\n", 404),
+        ]
+        for raw, expected in cases:
+            status, _, body = await request(port, raw)
+            assert status == expected, (raw, body)
+            assert 'error' in json.loads(body)
+    serve(test)
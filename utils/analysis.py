@@ -0,0 +1,398 @@
+"""
+Pattern analysis shared by the Streamlit dashboard and the command line.
+
+Nothing here imports Streamlit, so batch runs don't pay for it.
+"""
+from concurrent.futures import Executor
+from typing import Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.arrow_strings import ArrowStrings
+from utils.columnar import ParsedColumns, parse_distinct_titles, parse_titles_columnar
+from utils.parse_cache import ParseStore
+from utils.title_parser import DEFAULT_ENGINE, parse_titles_batch
+
+
+def filter_keyword(df: pd.DataFrame, keyword: Optional[str]) -> pd.DataFrame:
+    """Keep only rows for one keyword ('All' or None keeps everything)."""
+    if keyword in (None, 'All') or 'keyword' not in df.columns:
+        return df
+    return df[df['keyword'] == keyword]
+
+
+def drop_missing_titles(df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """
+    Rows that have a title, and how many didn't.
+
+    A listing without a title has nothing to parse, so it is left out of
+    the analysis (a blank title still counts, as [Unknown]).
+    """
+    has_title = df['title'].notna()
+    if has_title.all():
+        return df, 0
+    return df[has_title], int((~has_title).sum())
+
+
+# Columns deduplicate_titles carries over from each title's rows by default
+DEDUP_COLUMNS = ('keyword',)
+
+
+def normalize_titles(titles: pd.Series) -> pd.Series:
+    """Titles lowercased with runs of whitespace collapsed to one space, for matching near-duplicates."""
+    return titles.str.replace(r'\s+', ' ', regex=True).str.strip().str.lower()
+
+
+def deduplicate_titles(df: pd.DataFrame, normalize: bool = False,
+                       columns: Sequence[str] = DEDUP_COLUMNS, by: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    Collapse repeated titles into one row with the average position.
+
+    Rows are ordered by title. Of the other columns only those in columns
+    are kept, each with its first non-missing value for the title (as
+    groupby's 'first'). With normalize=True titles that differ only in
+    case or whitespace count as repeats and the first one seen is kept.
+    Titles only count as repeats within the same values of the by columns
+    (e.g. ('keyword',) keeps a title once per keyword); those groups are
+    ordered by first appearance within a title and keep their by columns.
+    """
+    keys = normalize_titles(df['title']) if normalize else df['title']
+    # Codes number titles in order of first appearance (-1 for a missing title, which is dropped)
+    codes, uniques = pd.factorize(keys)
+    title_order = uniques.argsort() if len(uniques) else np.arange(0)
+    title_codes = codes
+    by = [col for col in by if col in df.columns]
+    if by:
+        # One code per (by values, title) in order of first appearance; missing by values are a value too
+        group_codes = title_codes.astype(np.int64)
+        for col in by:
+            col_codes, col_values = pd.factorize(df[col], use_na_sentinel=False)
+            group_codes = group_codes * len(col_values) + col_codes
+        valid = title_codes >= 0
+        codes = np.full(len(title_codes), -1, dtype=np.intp)
+        codes[valid], uniques = pd.factorize(group_codes[valid])
+        columns = [*columns, *(col for col in by if col not in columns)]
+    n_titles = len(uniques)
+    rows = np.flatnonzero(codes >= 0)
+    # A title's first row is where the running maximum code first reaches it
+    first_rows = np.flatnonzero(np.diff(np.maximum.accumulate(codes), prepend=-1) > 0)
+
+    positions = df['position'].to_numpy(dtype=float)
+    has_position = rows[~np.isnan(positions[rows])]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (np.bincount(codes[has_position], weights=positions[has_position], minlength=n_titles)
+                / np.bincount(codes[has_position], minlength=n_titles))
+
+    # Only the distinct titles are sorted
+    if by:
+        title_rank = np.empty(len(title_order), dtype=np.int64)
+        title_rank[title_order] = np.arange(len(title_order))
+        order = np.argsort(title_rank[title_codes[first_rows]], kind='stable')
+    else:
+        order = title_order
+    deduped = {'title': df['title'].iloc[first_rows[order]].reset_index(drop=True),
+               'position': np.round(mean[order], 1)}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        take = first_rows
+        present = values.notna().to_numpy()
+        if not present[rows].all():
+            # First row with a value; titles without any keep their (missing) first row
+            valid = rows[present[rows]]
+            titles_with_value, first_valid = np.unique(codes[valid], return_index=True)
+            take = first_rows.copy()
+            take[titles_with_value] = valid[first_valid]
+        deduped[col] = values.iloc[take[order]].reset_index(drop=True)
+    return pd.DataFrame(deduped)
+
+
+def parse_listings(titles: list, positions: list, keywords: list, category: str,
+                   workers: Optional[int] = 0, store: Optional[ParseStore] = None) -> pd.DataFrame:
+    """Parse titles into one row per listing with its pattern and attributes."""
+    results = parse_titles_batch(titles, category, workers=workers, store=store)
+
+    parsed_results = []
+    for i, (title, result) in enumerate(zip(titles, results)):
+        parsed_results.append({
+            'title': title,
+            'position': positions[i] if i < len(positions) else 0,
+            'keyword': keywords[i] if keywords and i < len(keywords) else '',
+            'pattern': result['pattern'],
+            'attributes': result['attributes'],
+            'attribute_types': [attr['type'] for attr in result['attributes']],
+        })
+
+    return pd.DataFrame(parsed_results)
+
+
+def parse_listings_columnar(titles: list, positions: list, keywords: list, category: str,
+                            workers: Optional[int] = 0, store: Optional[ParseStore] = None,
+                            engine: str = DEFAULT_ENGINE) -> tuple[pd.DataFrame, ParsedColumns]:
+    """
+    Compact form of parse_listings.
+
+    Returns a frame with title, position, keyword and a categorical pattern
+    column, plus the ParsedColumns (row-aligned with the frame) that hold
+    the attributes. titles and keywords can be ArrowStrings and positions a
+    NumPy array, so a large upload never becomes Python lists.
+    """
+    parsed = parse_titles_columnar(titles, category, workers=workers, store=store, engine=engine)
+    return _listings_frame(titles, positions, keywords, parsed), parsed
+
+
+def _listings_frame(titles, positions, keywords, parsed: ParsedColumns) -> pd.DataFrame:
+    """The compact frame of parse_listings_columnar for row-aligned columns and parse results."""
+    n = len(titles)
+    return pd.DataFrame({
+        'title': _column(titles, n, ''),
+        'position': _column(positions, n, 0),
+        'keyword': _column(keywords, n, ''),
+        'pattern': parsed.pattern_categorical(),
+    })
+
+
+def _column(values, n: int, fill):
+    """A frame column of length n from a list, array or ArrowStrings (padded with fill if short)."""
+    if len(values) == n:
+        return values.to_pandas() if isinstance(values, ArrowStrings) else values
+    values = list(values)[:n]
+    return values + [fill] * (n - len(values))
+
+
+class ParsedUpload:
+    """
+    Every distinct title of an upload, parsed once.
+
+    Parsing doesn't depend on keyword or position, so a keyword filter or
+    deduplication is a view: the rows are selected (or averaged) in pandas
+    and their parse results are sliced out of the distinct-title columns,
+    without parsing anything again.
+    """
+
+    def __init__(self, df: pd.DataFrame, category: str, workers: Optional[int] = 0,
+                 store: Optional[ParseStore] = None, executor: Optional[Executor] = None,
+                 engine: str = DEFAULT_ENGINE):
+        # Rows without a title are counted here and left out of every view
+        df, self.rows_excluded = drop_missing_titles(df)
+        self.distinct, title_codes = parse_distinct_titles(
+            ArrowStrings.from_pandas(df['title']), category, workers=workers, store=store, engine=engine,
+            executor=executor,
+        )
+        # Each row's index into the distinct titles rides along through filtering and dedup
+        self.df = df.assign(title_code=title_codes)
+
+    def view(self, keyword: Optional[str] = None, deduplicate: bool = True,
+             normalize: bool = False, per_keyword: bool = False) -> tuple[pd.DataFrame, ParsedColumns]:
+        """
+        (parsed_df, parsed_columns) for one keyword, as parse_listings_columnar
+        returns them for the filtered (and optionally deduplicated) rows.
+        normalize is passed on to deduplicate_titles; per_keyword only
+        merges repeats within a keyword, as calculate_keyword_pattern_stats
+        needs them.
+        """
+        df = filter_keyword(self.df, keyword)
+        if deduplicate:
+            df = deduplicate_titles(df, normalize, columns=(*DEDUP_COLUMNS, 'title_code'),
+                                    by=('keyword',) if per_keyword else ())
+        parsed = self.distinct.take(df['title_code'].to_numpy(dtype=np.int64))
+        keywords = ArrowStrings.from_pandas(df['keyword']) if 'keyword' in df.columns else []
+        parsed_df = _listings_frame(
+            ArrowStrings.from_pandas(df['title']), df['position'].to_numpy(), keywords, parsed
+        )
+        # Only the patterns of the selected rows, as if they had been parsed on their own
+        parsed_df['pattern'] = parsed_df['pattern'].cat.remove_unused_categories()
+        return parsed_df, parsed
+
+
+def with_attributes(parsed_df: pd.DataFrame, parsed: ParsedColumns) -> pd.DataFrame:
+    """
+    Add the attributes/attribute_types columns of parse_listings to (some
+    rows of) a compact frame, with each row's detected category and its
+    confidence.
+    """
+    rows = parsed_df.index
+    return parsed_df.assign(
+        attributes=parsed.attribute_lists(rows),
+        attribute_types=parsed.attribute_type_lists(rows),
+        detected_category=np.asarray(parsed.categories, dtype=object)[parsed.category_codes[rows]],
+        category_confidence=parsed.category_confidence[rows],
+    )
+
+
+# About how many results Google Shopping shows for a keyword
+DEFAULT_SHOPPING_RESULTS = 40
+# Positions that count as "top" for top3_share
+TOP_POSITIONS = 3
+
+
+def calculate_pattern_stats(parsed_df: pd.DataFrame,
+                            total_shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS
+                            ) -> pd.DataFrame:
+    """
+    Calculate statistics for each pattern.
+
+    Performance % = what percentage of competitors you're outranking
+    Based on typical Google Shopping showing ~40 results; pass a
+    {keyword: results} mapping when keywords show different numbers
+    (keywords missing from it get DEFAULT_SHOPPING_RESULTS).
+
+    Besides count, average position, usage and performance, every pattern
+    gets its median, 25th/75th percentile and standard deviation of
+    position and the % of its listings in the top 3, all from one sort of
+    the positions by pattern.
+    """
+    codes, patterns = pd.factorize(parsed_df['pattern'], sort=True)
+    positions = parsed_df['position'].to_numpy(dtype=float)
+    has_title = parsed_df['title'].notna().to_numpy()
+
+    pattern_stats = pd.DataFrame({
+        'pattern': pd.Series(np.asarray(patterns), dtype=object).astype(str),
+        # As groupby's 'count': listings with a title
+        'count': np.bincount(codes[(codes >= 0) & has_title], minlength=len(patterns)),
+    })
+    spread = _position_stats(codes, len(patterns), positions)
+    pattern_stats['avg_position'] = spread.pop('avg_position')
+
+    if isinstance(total_shopping_results, Mapping):
+        totals = _shopping_results_per_row(parsed_df, total_shopping_results)
+        pattern_stats = finish_pattern_stats(pattern_stats, len(parsed_df))
+        # Performance of each listing against its own keyword's results, averaged per pattern
+        performance = _group_mean(codes, len(patterns), (1 - positions / totals) * 100)
+        pattern_stats['performance_pct'] = performance[pattern_stats.index].round(1).clip(0, 100)
+    else:
+        pattern_stats = finish_pattern_stats(pattern_stats, len(parsed_df), total_shopping_results)
+
+    return pattern_stats.assign(**{column: values[pattern_stats.index] for column, values in spread.items()})
+
+
+def calculate_keyword_pattern_stats(parsed_df: pd.DataFrame,
+                                    total_shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS
+                                    ) -> pd.DataFrame:
+    """
+    calculate_pattern_stats for every keyword at once: one row per keyword
+    and pattern, ordered by keyword and then by count.
+
+    usage_pct is the share of the keyword's listings; performance_pct uses
+    the keyword's number of shopping results (an int for every keyword, or
+    a {keyword: results} mapping).
+    """
+    keywords = parsed_df['keyword'].fillna('') if 'keyword' in parsed_df.columns else pd.Series('', index=parsed_df.index)
+    keyword_codes, keyword_names = pd.factorize(keywords, sort=True)
+    pattern_codes, patterns = pd.factorize(parsed_df['pattern'], sort=True)
+    # One group per (keyword, pattern) pair that occurs, numbered in (keyword, pattern) order
+    pairs = np.where(pattern_codes >= 0, keyword_codes.astype(np.int64) * len(patterns) + pattern_codes, -1)
+    groups, codes = np.unique(pairs, return_inverse=True)
+    if len(groups) and groups[0] < 0:
+        groups, codes = groups[1:], codes - 1
+
+    positions = parsed_df['position'].to_numpy(dtype=float)
+    has_title = parsed_df['title'].notna().to_numpy()
+    group_keywords = np.asarray(keyword_names, dtype=object)[groups // max(len(patterns), 1)]
+
+    stats = pd.DataFrame({
+        'keyword': group_keywords,
+        'pattern': pd.Series(np.asarray(patterns, dtype=object)[groups % max(len(patterns), 1)], dtype=object).astype(str),
+        'count': np.bincount(codes[(codes >= 0) & has_title], minlength=len(groups)),
+        **_position_stats(codes, len(groups), positions),
+    })
+
+    keyword_listings = pd.Series(np.bincount(keyword_codes, minlength=len(keyword_names)), index=keyword_names)
+    stats['usage_pct'] = (stats['count'] / keyword_listings[group_keywords].to_numpy() * 100).round(1)
+    if isinstance(total_shopping_results, Mapping):
+        totals = np.array([total_shopping_results.get(k, DEFAULT_SHOPPING_RESULTS) for k in group_keywords], dtype=float)
+    else:
+        totals = total_shopping_results
+    stats['performance_pct'] = ((1 - stats['avg_position'] / totals) * 100).round(1).clip(0, 100)
+
+    stats = stats.sort_values(['keyword', 'count'], ascending=[True, False], kind='stable', ignore_index=True)
+    return stats[['keyword', 'pattern', 'count', 'avg_position', 'usage_pct', 'performance_pct',
+                  'median_position', 'p25_position', 'p75_position', 'position_std', 'top3_share']]
+
+
+def _position_stats(codes: np.ndarray, n_groups: int, positions: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Position statistics of every group from a single sort.
+
+    codes numbers each row's group (-1 leaves a row out) and rows without
+    a position are skipped. Quantiles interpolate linearly, as pandas'
+    quantile does; the standard deviation is the population one, as in
+    PatternState.
+    """
+    keep = (codes >= 0) & ~np.isnan(positions)
+    codes, positions = codes[keep], positions[keep]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.zeros(n_groups, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    ordered = positions[np.lexsort((positions, codes))]
+
+    # groupby's compensated sum, so averages (and how they round) match groupby().mean() exactly
+    mean = pd.Series(positions).groupby(codes).mean().reindex(range(n_groups)).to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = np.bincount(codes, weights=(positions - mean[codes]) ** 2, minlength=n_groups) / counts
+        top_share = np.bincount(codes, weights=positions <= TOP_POSITIONS, minlength=n_groups) / counts * 100
+
+    def quantile(q: float) -> np.ndarray:
+        rank = (counts - 1) * q
+        low = np.floor(rank).astype(np.int64)
+        high = np.minimum(low + 1, counts - 1)
+        values = np.full(n_groups, np.nan)
+        present = counts > 0
+        below, above = ordered[(starts + low)[present]], ordered[(starts + high)[present]]
+        values[present] = below + (above - below) * (rank - low)[present]
+        return values
+
+    return {
+        'avg_position': mean,
+        'median_position': quantile(0.5),
+        'p25_position': quantile(0.25),
+        'p75_position': quantile(0.75),
+        'position_std': np.sqrt(variance),
+        'top3_share': top_share.round(1),
+    }
+
+
+def _group_mean(codes: np.ndarray, n_groups: int, values: np.ndarray) -> np.ndarray:
+    """Mean of values per group, skipping NaN values and rows with code -1."""
+    keep = (codes >= 0) & ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.bincount(codes[keep], weights=values[keep], minlength=n_groups)
+                / np.bincount(codes[keep], minlength=n_groups))
+
+
+def _shopping_results_per_row(parsed_df: pd.DataFrame, total_shopping_results: Mapping[str, int]) -> np.ndarray:
+    """Each listing's number of shopping results, looked up by its keyword."""
+    if 'keyword' not in parsed_df.columns:
+        return np.full(len(parsed_df), float(DEFAULT_SHOPPING_RESULTS))
+    return (parsed_df['keyword'].map(total_shopping_results).astype(float)
+            .fillna(DEFAULT_SHOPPING_RESULTS).to_numpy())
+
+
+def finish_pattern_stats(pattern_stats: pd.DataFrame, total_listings: int,
+                         total_shopping_results: int = DEFAULT_SHOPPING_RESULTS) -> pd.DataFrame:
+    """Add usage/performance % to per-pattern counts and average positions."""
+    # Usage % = what percentage of listings use this pattern
+    pattern_stats['usage_pct'] = (pattern_stats['count'] / total_listings * 100).round(1)
+
+    # Performance % = what percentage of results are you ranking above
+    # Position 1 = above 97.5%, Position 10 = above 75%
+    pattern_stats['performance_pct'] = (
+        (1 - pattern_stats['avg_position'] / total_shopping_results) * 100
+    ).round(1)
+    pattern_stats['performance_pct'] = pattern_stats['performance_pct'].clip(0, 100)
+
+    pattern_stats = pattern_stats.sort_values('count', ascending=False)
+
+    return pattern_stats
+
+
+def get_popular_attributes(parsed_df: pd.DataFrame) -> dict:
+    """Get most common attributes across all titles."""
+    all_attrs = []
+    for attrs in parsed_df['attribute_types']:
+        all_attrs.extend(attrs)
+
+    attr_counts = pd.Series(all_attrs).value_counts()
+    return attr_counts.to_dict()
@@ -0,0 +1,139 @@
+"""
+Parquet and Arrow IPC input/output.
+
+Scrape exports can be CSV, Parquet or Arrow IPC (.arrow/.feather/.ipc); only
+the columns the analysis needs are read. Parsed results are written with a
+proper list-of-struct attributes column instead of a stringified list.
+"""
+import io
+import os
+from typing import Iterator, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.columnar import ParsedColumns
+
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+# Arrow type of the parsed attributes column
+ATTRIBUTE_TYPE = pa.list_(pa.struct([
+    ('type', pa.string()),
+    ('value', pa.string()),
+    ('position', pa.int32()),
+]))
+# Struct fields added to the attributes when the results have spans ('spans' engine)
+SPAN_FIELDS = [('span_start', pa.int32()), ('span_end', pa.int32())]
+
+
+def scrape_format(source) -> str:
+    """'csv', 'parquet' or 'arrow', from a path or an uploaded file's name."""
+    name = os.fspath(source) if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+    name = str(name).lower()
+    if name.endswith('.parquet'):
+        return 'parquet'
+    if name.endswith(ARROW_SUFFIXES):
+        return 'arrow'
+    return 'csv'
+
+
+def _open_arrow(source) -> tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """Schema and record batches of an Arrow IPC file or stream (memory-mapped for paths)."""
+    if isinstance(source, (str, os.PathLike)):
+        source = pa.memory_map(os.fspath(source))
+    try:
+        reader = pa.ipc.open_file(source)
+        return reader.schema, (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        # Not the file format - read it as a stream
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+        return reader.schema, iter(reader)
+
+
+def iter_arrow_batches(source, columns: list[str], chunksize: int) -> Iterator[pa.RecordBatch]:
+    """Record batches of at most chunksize rows, with the given columns (those present)."""
+    schema, batches = _open_arrow(source)
+    present = [col for col in columns if col in schema.names]
+    for batch in batches:
+        batch = batch.select(present)
+        for offset in range(0, batch.num_rows, chunksize):
+            yield batch.slice(offset, chunksize)
+
+
+def read_table(source, columns: list[str]) -> pd.DataFrame:
+    """Read the given columns (those present) of a Parquet or Arrow IPC file into a DataFrame."""
+    if scrape_format(source) == 'parquet':
+        parquet = pq.ParquetFile(source)
+        present = [col for col in columns if col in parquet.schema_arrow.names]
+        return parquet.read(columns=present).to_pandas()
+
+    schema, batches = _open_arrow(source)
+    present = [col for col in columns if col in schema.names]
+    selected = pa.schema([schema.field(col) for col in present])
+    return pa.Table.from_batches([batch.select(present) for batch in batches], schema=selected).to_pandas()
+
+
+def parsed_table(parsed_df: pd.DataFrame, parsed: ParsedColumns) -> pa.Table:
+    """
+    Parsed listings as an Arrow table.
+
+    parsed_df is (a row subset of) the frame from parse_listings_columnar;
+    attributes become a list<struct<type, value, position>> column (plus
+    span_start and span_end for 'spans' engine results) and
+    attribute_types a list<string> column, built straight from the code
+    arrays without going through Python dicts. detected_category and
+    category_confidence follow.
+    """
+    rows = parsed.take(parsed_df.index.to_numpy())
+    offsets = pa.array(rows.attr_offsets.astype(np.int32), pa.int32())
+
+    def decode(codes: np.ndarray, values: list) -> pa.Array:
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes.astype(np.int32)), pa.array(values, pa.string())
+        ).dictionary_decode()
+
+    attr_types = decode(rows.attr_type_codes, rows.attr_types)
+    fields = [attr_types, decode(rows.attr_value_codes, rows.attr_values), pa.array(rows.attr_positions, pa.int32())]
+    field_types = list(ATTRIBUTE_TYPE.value_type)
+    spans = rows.spans()
+    if spans is not None:
+        # -1 (no span) becomes null
+        fields += [pa.array(bounds, pa.int32(), mask=bounds < 0) for bounds in spans]
+        field_types += [pa.field(name, type_) for name, type_ in SPAN_FIELDS]
+    attributes = pa.StructArray.from_arrays(fields, fields=field_types)
+
+    table = pa.Table.from_pandas(parsed_df.drop(columns=['pattern']), preserve_index=False)
+    return table.append_column(
+        'pattern', pa.array(parsed_df['pattern'].astype(str).to_numpy(), pa.string())
+    ).append_column(
+        'attributes', pa.ListArray.from_arrays(offsets, attributes)
+    ).append_column(
+        'attribute_types', pa.ListArray.from_arrays(offsets, attr_types)
+    ).append_column(
+        'detected_category', decode(rows.category_codes, rows.categories)
+    ).append_column(
+        # NaN (not detected) becomes null
+        'category_confidence', pa.array(rows.category_confidence, pa.float64(), from_pandas=True)
+    )
+
+
+def write_table(data: Union[pd.DataFrame, pa.Table], sink, fmt: str):
+    """Write a frame or Arrow table as Parquet or Arrow IPC (file format) to a path or file object."""
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    if fmt == 'parquet':
+        pq.write_table(table, sink)
+    elif fmt == 'arrow':
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"unsupported table format: {fmt}")
+
+
+def table_bytes(data: Union[pd.DataFrame, pa.Table], fmt: str) -> bytes:
+    """write_table into memory (for download buttons)."""
+    buffer = io.BytesIO()
+    write_table(data, buffer, fmt)
+    return buffer.getvalue()
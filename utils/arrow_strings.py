@@ -0,0 +1,71 @@
+"""
+String columns backed by Arrow buffers.
+
+ArrowStrings wraps an Arrow string array (zero-copy from pandas 3's
+Arrow-backed strings), so millions of titles don't have to exist as Python
+str objects at once: they are materialized one slice at a time, and only
+those slices are sent to worker processes.
+"""
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Titles materialized at a time when iterating
+ITER_BATCH = 65_536
+
+
+class ArrowStrings:
+    """
+    Read-only sequence of strings in Arrow memory.
+
+    Supports len(), iteration and slicing into lists.
+    """
+
+    def __init__(self, array, column: str = "title"):
+        self.array = array if isinstance(array, pa.ChunkedArray) else pa.chunked_array([array])
+        self.column = column
+
+    @classmethod
+    def from_pandas(cls, series: pd.Series) -> "ArrowStrings":
+        """Wrap a column (zero-copy when it is already Arrow-backed; object strings are copied)."""
+        array = pa.array(series, from_pandas=True)
+        if not (pa.types.is_string(array.type) or pa.types.is_large_string(array.type)):
+            array = array.cast(pa.string())
+        return cls(array)
+
+    @classmethod
+    def from_list(cls, values: list[str]) -> "ArrowStrings":
+        return cls(pa.array(values, pa.string()))
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __iter__(self) -> Iterator[str]:
+        for start in range(0, len(self.array), ITER_BATCH):
+            yield from self.slice(start, start + ITER_BATCH)
+
+    def slice(self, start: int, stop: int) -> list[str]:
+        """Strings start..stop as a Python list."""
+        return self.array.slice(start, max(stop - start, 0)).to_pylist()
+
+    def distinct(self) -> tuple["ArrowStrings", np.ndarray]:
+        """
+        Distinct strings (in order of first appearance) and, for every row,
+        the index of its string among them.
+        """
+        encoded = self.array.dictionary_encode(null_encoding="encode")
+        if not encoded.num_chunks:
+            return ArrowStrings(pa.array([], self.array.type), column=self.column), np.zeros(0, dtype=np.int64)
+        # Chunks share one growing dictionary; the last chunk's is complete
+        unique = encoded.chunks[-1].dictionary
+        codes = np.concatenate([chunk.indices.to_numpy() for chunk in encoded.chunks]).astype(np.int64)
+        return ArrowStrings(unique, column=self.column), codes
+
+    def to_pandas(self) -> pd.Series:
+        """
+        pandas column of the default string dtype (Arrow-backed from pandas 3,
+        so no Python strings are created; object strings on pandas 2).
+        """
+        return self.array.to_pandas()
@@ -0,0 +1,130 @@
+"""
+Compiled per-category dictionaries and category detection.
+
+config.attributes holds the dictionaries as plain data; this module builds
+the matchers and scorers from them and rebuilds them only when the
+dictionary version changes.
+"""
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+import numpy as np
+
+from config.attributes import (
+    BRAND_WEIGHT, CATEGORY_INDICATORS, KEYWORD_WEIGHT, MIN_CATEGORY_SCORE,
+    get_brands_for_category, get_category_attributes, get_dictionary_version,
+)
+from utils.matcher import CategoryScorer, DictionaryMatcher
+
+
+# Categories that are detected per title, and whether they count
+# indicators only as whole words
+AUTO_CATEGORIES = {"auto": False, "auto-words": True}
+
+
+def detect_category(title: str, whole_words: bool = False) -> str:
+    """
+    Auto-detect product category based on title keywords and brands.
+    Returns the most likely category or 'all' if uncertain.
+    """
+    return score_category(title, whole_words)[0]
+
+
+def score_category(title: str, whole_words: bool = False) -> tuple[str, float]:
+    """detect_category with its confidence, as detect_categories computes it for one title."""
+    scores = dict(zip(CATEGORY_INDICATORS, get_category_scorer(whole_words).title_scores(title)))
+
+    # Find category with highest score
+    max_score = max(scores.values())
+    if max_score >= MIN_CATEGORY_SCORE:  # Minimum threshold
+        return max(scores, key=scores.get), max_score / sum(scores.values())
+
+    return "all", 0.0  # Uncertain, use combined attributes
+
+
+def detect_categories(titles: list[str], whole_words: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Auto-detect the category of many titles in one pass.
+
+    Every title is scanned once for all category keywords and brands; the
+    scores of all categories are computed together. By default indicators
+    match anywhere in the title, exactly like detect_category; whole_words
+    only counts them as whole words ("tee" no longer matches "steel").
+
+    Returns: (categories, confidence) arrays. Confidence is the winning
+    category's share of the total indicator score (0 for 'all').
+    """
+    scores = get_category_scorer(whole_words).scores(titles)
+    names = np.array([*CATEGORY_INDICATORS, "all"], dtype=object)
+
+    # argmax keeps the first category on ties
+    best = scores.argmax(axis=1) if scores.size else np.zeros(len(titles), dtype=np.int64)
+    best_score = scores.max(axis=1) if scores.size else np.zeros(len(titles))
+    certain = best_score >= MIN_CATEGORY_SCORE
+
+    categories = names[np.where(certain, best, len(names) - 1)]
+    total = scores.sum(axis=1) if scores.size else np.zeros(len(titles))
+    confidence = np.where(certain, best_score / np.where(total > 0, total, 1), 0.0)
+    return categories, confidence
+
+
+_scorer_cache: dict = {}
+
+
+def get_category_scorer(whole_words: bool = False) -> CategoryScorer:
+    """Compiled category indicators, rebuilt only when the dictionaries change."""
+    version = get_dictionary_version()
+    cached = _scorer_cache.get(whole_words)
+    if cached is None or cached[0] != version:
+        indicators = {
+            category: [(keyword, KEYWORD_WEIGHT) for keyword in entry["keywords"]]
+                      + [(brand, BRAND_WEIGHT) for brand in entry["brands"]]
+            for category, entry in CATEGORY_INDICATORS.items()
+        }
+        scorer = CategoryScorer(list(CATEGORY_INDICATORS), indicators, whole_words)
+        cached = _scorer_cache[whole_words] = (version, scorer)
+    return cached[1]
+
+
+class CategoryIndex(NamedTuple):
+    """Precomputed, read-only dictionaries for one category."""
+    category: str
+    version: str
+    brands: tuple                          # Category-filtered, longest first
+    attributes: Mapping[str, tuple]        # attr_type -> values, longest first
+    matcher: DictionaryMatcher             # Brands ("brand" group) + dictionary attributes
+
+
+_index_cache: dict = {}
+
+
+def _build_category_index(category: str, version: str) -> CategoryIndex:
+    brands = get_brands_for_category(category)
+    attributes = {attr_type: tuple(values) for attr_type, values in get_category_attributes(category).items()}
+
+    # Size and quantity are detected with regex, not dictionaries
+    groups = {"brand": brands}
+    groups.update((attr_type, values) for attr_type, values in attributes.items()
+                  if attr_type not in ("size", "quantity"))
+
+    return CategoryIndex(
+        category=category,
+        version=version,
+        brands=tuple(brands),
+        attributes=MappingProxyType(attributes),
+        matcher=DictionaryMatcher(groups),
+    )
+
+
+def get_category_index(category: str) -> CategoryIndex:
+    """
+    Immutable index of brands, attributes and the compiled matcher for a category.
+
+    Built on first use and reused until the dictionaries change (see
+    get_dictionary_version).
+    """
+    version = get_dictionary_version()
+    index = _index_cache.get(category)
+    if index is None or index.version != version:
+        index = _index_cache[category] = _build_category_index(category, version)
+    return index
@@ -0,0 +1,319 @@
+"""
+Columnar, dictionary-encoded parse results.
+
+A list of parse_title dicts costs several small Python objects per title.
+ParsedColumns keeps the same information as a handful of NumPy arrays:
+patterns, attribute types, attribute values, leftover text and categories
+are interned to integer codes, and each title's attributes are a slice of
+flat per-attribute arrays (CSR layout). It converts back to the dict shape
+losslessly for display.
+"""
+from concurrent.futures import Executor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.arrow_strings import ArrowStrings
+from utils.parse_cache import ParseStore
+from utils.title_parser import DEFAULT_ENGINE, iter_parsed_blocks
+
+
+class _Interner:
+    """Assigns consecutive integer codes to distinct values."""
+
+    def __init__(self):
+        self.codes: dict = {}
+        self.values: list = []
+
+    def code(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ParsedColumns:
+    """
+    Parse results for many titles in columnar form.
+
+    Row i's attributes are entries attr_offsets[i]:attr_offsets[i + 1] of
+    the attr_* arrays. Code arrays index into the matching value lists
+    (patterns, attr_types, attr_values, remainders, categories).
+    category_confidence is NaN where the category wasn't detected.
+    attr_span_starts/attr_span_ends hold each attribute's span (the 'spans'
+    engine); they are None when no result had spans.
+    """
+
+    def __init__(self, patterns: list, pattern_codes: np.ndarray,
+                 attr_types: list, attr_values: list, attr_offsets: np.ndarray,
+                 attr_type_codes: np.ndarray, attr_value_codes: np.ndarray, attr_positions: np.ndarray,
+                 remainders: list, remaining_codes: np.ndarray,
+                 categories: list, category_codes: np.ndarray, category_confidence: np.ndarray,
+                 attr_span_starts: Optional[np.ndarray] = None, attr_span_ends: Optional[np.ndarray] = None):
+        self.patterns = patterns
+        self.pattern_codes = pattern_codes
+        self.attr_types = attr_types
+        self.attr_values = attr_values
+        self.attr_offsets = attr_offsets
+        self.attr_type_codes = attr_type_codes
+        self.attr_value_codes = attr_value_codes
+        self.attr_positions = attr_positions
+        self.remainders = remainders
+        self.remaining_codes = remaining_codes
+        self.categories = categories
+        self.category_codes = category_codes
+        self.category_confidence = category_confidence
+        self.attr_span_starts = attr_span_starts
+        self.attr_span_ends = attr_span_ends
+
+    @classmethod
+    def from_results(cls, results: list[dict]) -> "ParsedColumns":
+        """Encode parse_title results."""
+        builder = ParsedColumnsBuilder()
+        builder.extend(results)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.pattern_codes)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the code arrays (the value lists are shared, interned strings)."""
+        return sum(arr.nbytes for arr in (
+            self.pattern_codes, self.attr_offsets, self.attr_type_codes, self.attr_value_codes,
+            self.attr_positions, self.remaining_codes, self.category_codes, self.category_confidence,
+            *(self.spans() or ()),
+        ))
+
+    def spans(self) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """(attr_span_starts, attr_span_ends), or None without spans."""
+        if self.attr_span_starts is None:
+            return None
+        return self.attr_span_starts, self.attr_span_ends
+
+    def attributes(self, i: int) -> list[dict]:
+        """Attribute dicts for row i, as parse_title returns them."""
+        start, end = self.attr_offsets[i], self.attr_offsets[i + 1]
+        attributes = [
+            {
+                "type": self.attr_types[type_code],
+                "value": self.attr_values[value_code],
+                "position": int(position),
+            }
+            for type_code, value_code, position in zip(
+                self.attr_type_codes[start:end].tolist(),
+                self.attr_value_codes[start:end].tolist(),
+                self.attr_positions[start:end].tolist(),
+            )
+        ]
+        if self.attr_span_starts is not None:
+            for attr, span_start, span_end in zip(attributes, self.attr_span_starts[start:end].tolist(),
+                                                  self.attr_span_ends[start:end].tolist()):
+                if span_start >= 0:
+                    attr["span"] = [span_start, span_end]
+        return attributes
+
+    def result(self, i: int) -> dict:
+        """Row i in the parse_title dict shape."""
+        return {
+            "attributes": self.attributes(i),
+            "pattern": self.patterns[self.pattern_codes[i]],
+            "remaining": self.remainders[self.remaining_codes[i]],
+            "detected_category": self.categories[self.category_codes[i]],
+            "category_confidence": self.confidence(i),
+        }
+
+    def confidence(self, i: int) -> Optional[float]:
+        """Row i's category_confidence, None where the category wasn't detected."""
+        value = float(self.category_confidence[i])
+        return None if np.isnan(value) else value
+
+    def to_results(self) -> list[dict]:
+        return [self.result(i) for i in range(len(self))]
+
+    def attribute_lists(self, rows=None) -> list[list[dict]]:
+        """Attribute dicts for the given rows (default: every row)."""
+        rows = range(len(self)) if rows is None else rows
+        return [self.attributes(i) for i in rows]
+
+    def attribute_type_lists(self, rows=None) -> list[list[str]]:
+        """Attribute type names for the given rows (default: every row)."""
+        rows = range(len(self)) if rows is None else rows
+        offsets = self.attr_offsets
+        type_codes = self.attr_type_codes
+        return [[self.attr_types[code] for code in type_codes[offsets[i]:offsets[i + 1]].tolist()] for i in rows]
+
+    def pattern_categorical(self) -> pd.Categorical:
+        """Per-row pattern as a pandas Categorical (categories sorted, so groupby order matches strings)."""
+        order = sorted(range(len(self.patterns)), key=self.patterns.__getitem__)
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        return pd.Categorical.from_codes(remap[self.pattern_codes], categories=[self.patterns[i] for i in order])
+
+    def attribute_type_counts(self) -> dict:
+        """Occurrences of each attribute type over all rows, most common first."""
+        counts = np.bincount(self.attr_type_codes, minlength=len(self.attr_types))
+        order = np.argsort(-counts, kind='stable')
+        return {self.attr_types[i]: int(counts[i]) for i in order if counts[i]}
+
+    def pattern_index(self) -> "PatternIndex":
+        """Row numbers of each pattern."""
+        return PatternIndex(self.patterns, self.pattern_codes)
+
+    def take(self, rows: np.ndarray) -> "ParsedColumns":
+        """New ParsedColumns with the given rows (repeats allowed); value lists are shared."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.attr_offsets[rows]
+        lengths = self.attr_offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Index of every attribute to copy: its row's start plus its rank within the row
+        gather = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+        return ParsedColumns(
+            self.patterns, self.pattern_codes[rows],
+            self.attr_types, self.attr_values, offsets,
+            self.attr_type_codes[gather], self.attr_value_codes[gather], self.attr_positions[gather],
+            self.remainders, self.remaining_codes[rows],
+            self.categories, self.category_codes[rows], self.category_confidence[rows],
+            *((self.attr_span_starts[gather], self.attr_span_ends[gather]) if self.spans() else ()),
+        )
+
+
+class ParsedColumnsBuilder:
+    """
+    Encodes parse results into ParsedColumns a batch at a time.
+
+    Each extend() turns its batch into code arrays right away, so the
+    result dicts can be dropped as soon as they are encoded.
+    """
+
+    def __init__(self):
+        self._patterns, self._types, self._values, self._remainders, self._categories = (
+            _Interner() for _ in range(5))
+        self._batches: list[tuple] = []
+        # An empty batch gives build() the dtypes even if nothing is added
+        self.extend([])
+
+    def extend(self, results: list[dict]):
+        """Encode a batch of parse_title results (appended after the earlier ones)."""
+        patterns, types, values, remainders, categories = (
+            self._patterns, self._types, self._values, self._remainders, self._categories)
+        pattern_codes, remaining_codes, category_codes, confidence = [], [], [], []
+        lengths = []
+        type_codes, value_codes, positions, span_starts, span_ends = [], [], [], [], []
+
+        for result in results:
+            pattern_codes.append(patterns.code(result['pattern']))
+            remaining_codes.append(remainders.code(result['remaining']))
+            category_codes.append(categories.code(result['detected_category']))
+            # Results cached before confidences were recorded have none
+            confidence.append(result.get('category_confidence'))
+            for attr in result['attributes']:
+                type_codes.append(types.code(attr['type']))
+                value_codes.append(values.code(attr['value']))
+                positions.append(attr['position'])
+                # -1 where the engine gives no span
+                span_start, span_end = attr.get('span', (-1, -1))
+                span_starts.append(span_start)
+                span_ends.append(span_end)
+            lengths.append(len(result['attributes']))
+
+        self._batches.append((
+            np.array(pattern_codes, dtype=np.int32), np.array(lengths, dtype=np.int64),
+            np.array(type_codes, dtype=np.int16), np.array(value_codes, dtype=np.int32),
+            np.array(positions, dtype=np.int32), np.array(remaining_codes, dtype=np.int32),
+            np.array(category_codes, dtype=np.int16), np.array(confidence, dtype=np.float64),
+            np.array(span_starts, dtype=np.int32), np.array(span_ends, dtype=np.int32),
+        ))
+
+    def build(self) -> ParsedColumns:
+        """ParsedColumns of every result added so far."""
+        (pattern_codes, lengths, type_codes, value_codes, positions, remaining_codes, category_codes,
+         confidence, span_starts, span_ends) = (np.concatenate(parts) for parts in zip(*self._batches))
+        # Only kept if some result had spans, so classic results cost nothing extra
+        spans = (span_starts, span_ends) if (span_starts >= 0).any() else ()
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return ParsedColumns(
+            self._patterns.values, pattern_codes,
+            self._types.values, self._values.values, offsets,
+            type_codes, value_codes, positions,
+            self._remainders.values, remaining_codes,
+            self._categories.values, category_codes, confidence, *spans,
+        )
+
+
+class PatternIndex:
+    """
+    Row numbers grouped by pattern, so a pattern's rows are found without
+    scanning the whole frame.
+
+    rows holds every row number ordered by pattern (and by row within a
+    pattern); a pattern's rows are rows[offsets[code]:offsets[code + 1]].
+    """
+
+    def __init__(self, patterns: list[str], pattern_codes: np.ndarray):
+        self.codes = {pattern: code for code, pattern in enumerate(patterns)}
+        self.rows = np.argsort(pattern_codes, kind='stable')
+        self.offsets = np.zeros(len(patterns) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pattern_codes, minlength=len(patterns)), out=self.offsets[1:])
+
+    @classmethod
+    def from_labels(cls, patterns) -> "PatternIndex":
+        """Index a column of pattern strings."""
+        codes, uniques = pd.factorize(pd.Series(patterns), use_na_sentinel=False)
+        return cls(list(uniques), codes)
+
+    def rows_for(self, pattern: str, limit: Optional[int] = None) -> np.ndarray:
+        """Row numbers with this pattern in frame order (at most limit of them)."""
+        code = self.codes.get(pattern)
+        if code is None:
+            return self.rows[:0]
+        start, end = self.offsets[code], self.offsets[code + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.rows[start:end]
+
+
+def parse_distinct_titles(titles: list[str], category: str, workers: Optional[int] = None,
+                          chunksize: int = 2000, store: Optional[ParseStore] = None,
+                          engine: str = DEFAULT_ENGINE,
+                          executor: Optional[Executor] = None) -> tuple[ParsedColumns, np.ndarray]:
+    """
+    Parse each distinct title once.
+
+    Returns the ParsedColumns of the distinct titles and, for every input
+    row, the index of its title among them. titles can be a list or
+    ArrowStrings; executor is a parser_pool() to parse in.
+    """
+    if isinstance(titles, ArrowStrings):
+        # Deduplicated in Arrow, without a Python string per row
+        unique, rows = titles.distinct()
+    else:
+        index: dict[str, int] = {}
+        rows = np.fromiter((index.setdefault(title, len(index)) for title in titles), dtype=np.int64,
+                           count=len(titles))
+        unique = list(index)
+    # Encoded a block at a time, so the result dicts of every distinct title are never held at once
+    builder = ParsedColumnsBuilder()
+    for results in iter_parsed_blocks(unique, category, workers=workers, chunksize=chunksize, store=store,
+                                      engine=engine, executor=executor):
+        builder.extend(results)
+    return builder.build(), rows
+
+
+def parse_titles_columnar(titles: list[str], category: str, workers: Optional[int] = None,
+                          chunksize: int = 2000, store: Optional[ParseStore] = None,
+                          engine: str = DEFAULT_ENGINE) -> ParsedColumns:
+    """
+    parse_titles_batch, returned as ParsedColumns.
+
+    Each distinct title is parsed (and held as a dict) once; repeats only
+    cost their row in the code arrays. titles can be a list or ArrowStrings.
+    """
+    distinct, rows = parse_distinct_titles(titles, category, workers=workers, chunksize=chunksize, store=store,
+                                           engine=engine)
+    return distinct.take(rows)
@@ -0,0 +1,307 @@
+"""
+Compiled matchers for title parsing.
+
+DictionaryMatcher builds a character trie over the lowercased dictionary values
+once, then finds every whole-word hit in a title with a single scan. Word
+boundaries follow the same rules as the regex \\b used by the per-value search,
+so results match find_attribute_in_original (equivalence/reference.py) exactly.
+
+RegexBank combines an ordered list of regex patterns into one alternation, so a
+title with no match costs one scan instead of one per pattern.
+
+CategoryScorer finds every category indicator in a title with one regex scan
+and scores all categories at once.
+"""
+import re
+from typing import Optional
+
+import numpy as np
+
+
+def is_word_char(ch: str) -> bool:
+    """Same definition of a word character as the regex engine's \\w."""
+    return ch.isalnum() or ch == "_"
+
+
+class DictionaryMatcher:
+    """
+    Trie over one or more named dictionaries (e.g. 'brand', 'product_type').
+
+    Every group keeps its own priority order (the order of its value list),
+    so the first value in the list still wins when several are in a title.
+    """
+
+    def __init__(self, groups: dict[str, list[str]]):
+        self.groups = list(groups)
+        self._root: dict = {}
+        self._priorities: dict[str, dict[str, int]] = {}
+        self._values: dict[str, dict[str, str]] = {}
+
+        for group, values in groups.items():
+            priorities = {}
+            originals = {}
+            for priority, value in enumerate(values):
+                key = value.lower()
+                # Case-only duplicates ("Nuk"/"NUK") - the first one always wins
+                if not key or key in priorities:
+                    continue
+                priorities[key] = priority
+                originals[key] = value
+                self._insert(key)
+            self._priorities[group] = priorities
+            self._values[group] = originals
+
+    def _insert(self, key: str):
+        node = self._root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        # "" can never be a character, so it marks the end of a value
+        node[""] = (key, is_word_char(key[-1]))
+
+    def scan(self, text: str) -> list[tuple[int, str]]:
+        """
+        Find every whole-word dictionary hit in an already-lowercased text.
+
+        Returns (start, key) tuples ordered by start position.
+        """
+        n = len(text)
+        flags = [ch.isalnum() or ch == "_" for ch in text]
+        root = self._root
+        hits = []
+
+        prev_flag = False
+        for start in range(n):
+            flag = flags[start]
+            # A value can only start where \b holds
+            if flag == prev_flag:
+                continue
+            prev_flag = flag
+
+            node = root.get(text[start])
+            end = start
+            while node is not None:
+                end += 1
+                terminal = node.get("")
+                if terminal is not None:
+                    key, last_flag = terminal
+                    # ...and only end where \b holds
+                    if last_flag != (end < n and flags[end]):
+                        hits.append((start, key))
+                if end == n:
+                    break
+                node = node.get(text[end])
+
+        return hits
+
+    def first_match(self, hits: list[tuple[int, str]], group: str,
+                    consumed: Optional[bytearray] = None) -> Optional[tuple[str, str, int, int]]:
+        """
+        Pick the hit a sequential search over the group's values would return:
+        the highest-priority value, at its first occurrence.
+
+        consumed marks characters already taken by earlier matches (nonzero
+        bytes); hits overlapping them are skipped.
+
+        Returns: (value, key, start, end) or None
+        """
+        priorities = self._priorities[group]
+        best_priority = None
+        best = None
+        for start, key in hits:
+            priority = priorities.get(key)
+            # Hits are ordered by start, so strict < keeps the first occurrence
+            if priority is not None and (best_priority is None or priority < best_priority):
+                if consumed is not None and consumed.find(1, start, start + len(key)) >= 0:
+                    continue
+                best_priority = priority
+                best = (start, key)
+
+        if best is None:
+            return None
+        start, key = best
+        return self._values[group][key], key, start, start + len(key)
+
+    @staticmethod
+    def first_positions(hits: list[tuple[int, str]]) -> dict[str, int]:
+        """Map each matched key to its first start position."""
+        positions = {}
+        for start, key in hits:
+            positions.setdefault(key, start)
+        return positions
+
+
+class RegexBank:
+    """
+    Ordered regex patterns compiled into one alternation with named groups.
+
+    search() returns the same match as trying each pattern in turn with
+    re.search and keeping the first one that matches.
+    """
+
+    def __init__(self, patterns: list[str], flags: int = 0, precheck: Optional[str] = None):
+        self.patterns = [re.compile(p, flags) for p in patterns]
+        # _banks[k] is the alternation of the first k patterns (the ones that outrank pattern k)
+        self._banks = [None] + [
+            re.compile("|".join(f"(?P<p{i}>{p})" for i, p in enumerate(patterns[:k])), flags)
+            for k in range(1, len(patterns) + 1)
+        ]
+        # Cheap test that every pattern needs to pass (e.g. "contains a digit")
+        self._precheck = re.compile(precheck, flags) if precheck else None
+
+    def search(self, text: str, pos: int = 0, endpos: Optional[int] = None) -> Optional[tuple[int, re.Match]]:
+        """
+        Returns: (pattern_index, match) for the highest-priority pattern found
+        in text[pos:endpos], or None
+        """
+        return self._search(text, pos, len(text) if endpos is None else endpos, len(self.patterns))
+
+    def _search(self, text: str, pos: int, endpos: int, limit: int) -> Optional[tuple[int, re.Match]]:
+        """search() among the first limit patterns only."""
+        if self._precheck is not None and not self._precheck.search(text, pos, endpos):
+            return None
+
+        # The leftmost bank hit is the best pattern matching at that position.
+        # Only higher-priority patterns further right can still beat it.
+        best = None
+        bank = self._banks[limit]
+        while bank is not None:
+            match = bank.search(text, pos, endpos)
+            if match is None:
+                break
+            index = int(match.lastgroup[1:])
+            best = (index, match)
+            bank = self._banks[index]
+            pos = match.start() + 1
+
+        return best
+
+    def search_segments(self, text: str, segments: list[tuple[int, int]]) -> Optional[tuple[int, re.Match]]:
+        """
+        search() over several [start, end) slices of text, ordered by start,
+        without copying them: the highest-priority pattern found in any
+        slice, at its first match. No match spans two slices.
+        """
+        best = None
+        for start, end in segments:
+            # Later slices only matter for patterns that outrank the best so far
+            found = self._search(text, start, end, len(self.patterns) if best is None else best[0])
+            if found is not None:
+                best = found
+                if best[0] == 0:
+                    break
+        return best
+
+
+def trie_regex(words: list[str]) -> str:
+    """
+    Regex source matching any of the words, factored by common prefix.
+
+    At each position the regex engine only follows the branch for the next
+    character instead of trying every word, and deeper branches come first,
+    so the longest word starting there is the one matched.
+    """
+    root: dict = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # The word ending here is only used if no longer one matches
+            body = body + "?" if len(branches) == 1 and len(branches[0]) == 1 else f"(?:{body})?"
+        return body
+
+    return build(root)
+
+
+class CategoryScorer:
+    """
+    Scores titles against weighted category indicators in one regex scan each.
+
+    A lookahead over a prefix-factored alternation reports the longest
+    indicator starting at every position; the shorter indicators that are
+    prefixes of it are implied, so every distinct indicator in the title is
+    found without testing them one by one. Each distinct indicator counts
+    once, as with a plain substring check per indicator.
+    """
+
+    def __init__(self, categories: list[str], indicators: dict[str, list[tuple[str, int]]],
+                 whole_words: bool = False):
+        """
+        categories: Category names, in tie-break order
+        indicators: category -> [(lowercase indicator, weight), ...]
+        whole_words: Only count indicators that are whole words (\\b on both ends)
+        """
+        self.categories = list(categories)
+        self.whole_words = whole_words
+
+        weights: dict[str, np.ndarray] = {}
+        for column, category in enumerate(self.categories):
+            for indicator, weight in indicators.get(category, []):
+                if indicator:
+                    weights.setdefault(indicator, np.zeros(len(self.categories)))[column] += weight
+
+        self._indicators = sorted(weights, key=lambda x: -len(x))
+        self._ids = {indicator: i for i, indicator in enumerate(self._indicators)}
+        self._weights = np.array([weights[indicator] for indicator in self._indicators]).reshape(
+            len(self._indicators), len(self.categories)
+        )
+        self._weight_rows = [tuple(row) for row in self._weights.tolist()]
+        # Indicator id -> ids of every indicator that is a prefix of it (itself included)
+        self._prefixes = [
+            [self._ids[other] for other in self._indicators if indicator.startswith(other)]
+            for indicator in self._indicators
+        ]
+
+        alternation = trie_regex(self._indicators)
+        if whole_words:
+            self._pattern = re.compile(rf"(?=\b({alternation})\b)") if alternation else None
+        else:
+            self._pattern = re.compile(f"(?=({alternation}))") if alternation else None
+
+    def indicator_ids(self, text: str) -> set[int]:
+        """Ids of the distinct indicators found in an already-lowercased text."""
+        if self._pattern is None:
+            return set()
+        ids = set()
+        if not self.whole_words:
+            for indicator in self._pattern.findall(text):
+                ids.update(self._prefixes[self._ids[indicator]])
+            return ids
+
+        n = len(text)
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            for i in self._prefixes[self._ids[match.group(1)]]:
+                # A shorter prefix still needs \b where it ends
+                end = start + len(self._indicators[i])
+                if is_word_char(text[end - 1]) != (end < n and is_word_char(text[end])):
+                    ids.add(i)
+        return ids
+
+    def title_scores(self, title: str) -> list[float]:
+        """Per-category scores for one title (no NumPy overhead)."""
+        scores = [0.0] * len(self.categories)
+        for i in self.indicator_ids(title.lower()):
+            for column, weight in enumerate(self._weight_rows[i]):
+                scores[column] += weight
+        return scores
+
+    def scores(self, titles: list[str]) -> np.ndarray:
+        """Score matrix of shape (len(titles), len(categories))."""
+        rows, ids = [], []
+        for row, title in enumerate(titles):
+            found = self.indicator_ids(title.lower())
+            rows.extend([row] * len(found))
+            ids.extend(found)
+
+        scores = np.zeros((len(titles), len(self.categories)))
+        if ids:
+            np.add.at(scores, np.array(rows, dtype=np.int64), self._weights[np.array(ids, dtype=np.int64)])
+        return scores
@@ -0,0 +1,176 @@
+"""
+Caching for parse_title results.
+
+Scrapes repeat the same merchant titles across keywords and snapshots, so
+parse results are kept in a bounded LRU cache in front of the parser
+(ParseCache) and, for batch runs, in a SQLite file shared by every process
+and run on the machine (ParseStore).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from contextlib import closing
+from typing import Optional
+
+# Where ParseStore keeps its database unless told otherwise
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "title-pattern-analyzer", "parse_cache.sqlite3")
+# Bump when parse_title's results change for the same dictionaries (parser
+# logic or result format), so ParseStore stops serving older results
+PARSER_VERSION = 1
+
+
+def copy_result(result: dict) -> dict:
+    """Copy a parse result deep enough that callers can't corrupt a cached one."""
+    copied = dict(result)
+    copied["attributes"] = [dict(attr) for attr in result["attributes"]]
+    return copied
+
+
+class ParseCache:
+    """
+    Bounded LRU cache of parse results keyed by (title, category).
+
+    Entries are tagged with the attribute dictionary version; when the
+    version changes the whole cache is dropped. Results are copied on the
+    way in and on the way out.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, title: str, category: str, version: str) -> Optional[dict]:
+        """Return a copy of the cached result, or None on a miss."""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+        key = (title, category)
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy_result(result)
+
+    def put(self, title: str, category: str, version: str, result: dict):
+        """Store a copy of a result, evicting the least recently used entries."""
+        if self.max_entries <= 0 or version != self._version:
+            return
+
+        self._entries[(title, category)] = copy_result(result)
+        self._entries.move_to_end((title, category))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def resize(self, max_entries: int):
+        """Change the maximum number of entries (0 disables caching)."""
+        self.max_entries = max_entries
+        while len(self._entries) > max(max_entries, 0):
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def title_key(title: str) -> bytes:
+    """Fixed-size hash of a title, used as the on-disk key."""
+    return hashlib.blake2b(title.encode("utf-8"), digest_size=16).digest()
+
+
+class ParseStore:
+    """
+    Persistent parse cache in a SQLite file.
+
+    Rows are keyed by (title hash, category, version), where version is
+    the dictionary version plus PARSER_VERSION, so results from an older
+    config/attributes.py or an older parser are never returned. A new
+    connection is opened per call, which keeps the store safe to share
+    between Streamlit sessions, worker processes and CLI runs.
+    """
+
+    # Stay well under SQLite's bound-parameter limit
+    _BATCH = 500
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("TITLE_PARSER_CACHE", DEFAULT_STORE_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_results ("
+                " title_hash BLOB NOT NULL,"
+                " category TEXT NOT NULL,"
+                " version TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " PRIMARY KEY (title_hash, category, version)"
+                ") WITHOUT ROWID"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _stored_version(version: str) -> str:
+        return f"{version}:parser-{PARSER_VERSION}"
+
+    def get_many(self, titles: list[str], category: str, version: str) -> dict[str, dict]:
+        """Look up distinct titles; returns {title: result} for the ones stored."""
+        keys = {title_key(title): title for title in titles}
+        found = {}
+        hashes = list(keys)
+        with closing(self._connect()) as conn:
+            for i in range(0, len(hashes), self._BATCH):
+                batch = hashes[i:i + self._BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT title_hash, result FROM parse_results"
+                    f" WHERE category = ? AND version = ? AND title_hash IN ({placeholders})",
+                    [category, self._stored_version(version), *batch],
+                )
+                for title_hash, result in rows:
+                    found[keys[title_hash]] = json.loads(result)
+        return found
+
+    def put_many(self, results: dict[str, dict], category: str, version: str):
+        """Store {title: result} for a category and dictionary version."""
+        version = self._stored_version(version)
+        rows = [
+            (title_key(title), category, version, json.dumps(result, ensure_ascii=False))
+            for title, result in results.items()
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO parse_results VALUES (?, ?, ?, ?)", rows)
+
+    def prune(self, version: str) -> int:
+        """Delete rows from every other dictionary or parser version; returns rows removed."""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("DELETE FROM parse_results WHERE version != ?",
+                                (self._stored_version(version),)).rowcount
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM parse_results").fetchone()[0]
@@ -0,0 +1,190 @@
+"""
+Grouping of similar title patterns.
+
+Patterns that differ only by an optional attribute (a Color) or by
+repeating one (a second Brand) are the same title structure for
+reporting. Each pattern gets a key: its attribute types with optional
+types and repeats dropped, in order. Keys go into a trie of integer type
+codes, so grouping n patterns takes time linear in their total length,
+with no pairwise comparisons. Trie nodes are groups at every level:
+a key's node groups similar patterns, and its ancestor at depth d groups
+every key sharing those first d attributes.
+"""
+from typing import Iterable, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.analysis import DEFAULT_SHOPPING_RESULTS, calculate_pattern_stats
+from utils.pattern_state import PatternState, attribute_types_from_pattern
+
+# Attribute types that are dropped when comparing patterns
+OPTIONAL_TYPES = ('Color',)
+# Leading attributes shared by a 'prefix' group
+PREFIX_DEPTH = 2
+# 'pattern' keeps every pattern on its own
+LEVELS = ('pattern', 'similar', 'prefix')
+
+
+def pattern_key(types: Sequence[str], optional_types: Iterable[str] = OPTIONAL_TYPES) -> tuple:
+    """
+    Attribute types without optional types and repeats, in order of first appearance.
+
+    ["Brand", "Product Type", "Brand", "Color"] -> ("Brand", "Product Type").
+    A pattern made only of optional types keeps them.
+    """
+    optional = set(optional_types)
+    key = tuple(dict.fromkeys(t for t in types if t not in optional))
+    return key or tuple(dict.fromkeys(types))
+
+
+def format_pattern(types: Sequence[str]) -> str:
+    """("Brand", "Size") -> "[Brand] + [Size]", as parse_title formats patterns."""
+    return " + ".join(f"[{t}]" for t in types) if types else "[Unknown]"
+
+
+class PatternTrie:
+    """
+    Trie of attribute-type sequences with integer-coded nodes.
+
+    Node 0 is the root (the empty sequence). parent and depth are indexed
+    by node; a node's children are found through (parent, type code) pairs.
+    """
+
+    def __init__(self):
+        self.type_codes: dict[str, int] = {}
+        self.types: list[str] = []
+        self._children: dict[tuple[int, int], int] = {}
+        self._parent = [0]
+        self._node_type = [-1]
+        self._depth = [0]
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def insert(self, types: Sequence[str]) -> int:
+        """Add a sequence (and its prefixes); returns the node it ends at."""
+        node = 0
+        for name in types:
+            code = self.type_codes.get(name)
+            if code is None:
+                code = self.type_codes[name] = len(self.types)
+                self.types.append(name)
+            child = self._children.get((node, code))
+            if child is None:
+                child = self._children[(node, code)] = len(self._parent)
+                self._parent.append(node)
+                self._node_type.append(code)
+                self._depth.append(self._depth[node] + 1)
+            node = child
+        return node
+
+    def ancestors(self, nodes: np.ndarray, depth: int) -> np.ndarray:
+        """Each node's ancestor at depth (nodes no deeper than that are returned as they are)."""
+        parent = np.asarray(self._parent, dtype=np.int64)
+        depths = np.asarray(self._depth, dtype=np.int64)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        # One step up per level, for all nodes at once
+        while True:
+            deeper = depths[nodes] > depth
+            if not deeper.any():
+                return nodes
+            nodes = np.where(deeper, parent[nodes], nodes)
+
+    def sequence(self, node: int) -> list[str]:
+        """Attribute types from the root to node."""
+        types = []
+        while node:
+            types.append(self.types[self._node_type[node]])
+            node = self._parent[node]
+        return types[::-1]
+
+
+class PatternGroups:
+    """
+    Patterns mapped to groups of similar patterns.
+
+    level is 'similar' (same pattern_key), 'prefix' (same first
+    PREFIX_DEPTH attributes of the key) or 'pattern' (no grouping).
+    codes[i] is the group of patterns[i] and labels[code] its name,
+    formatted like a pattern.
+    """
+
+    def __init__(self, patterns: Iterable[str], level: str = 'similar',
+                 optional_types: Iterable[str] = OPTIONAL_TYPES, depth: int = PREFIX_DEPTH):
+        if level not in LEVELS:
+            raise ValueError(f"unknown grouping level {level!r} (expected one of: {', '.join(LEVELS)})")
+        self.patterns = list(dict.fromkeys(patterns))
+        self.level = level
+
+        if level == 'pattern':
+            self.codes = np.arange(len(self.patterns), dtype=np.int64)
+            self.labels = list(self.patterns)
+        else:
+            trie = PatternTrie()
+            optional_types = tuple(optional_types)
+            nodes = np.array([
+                trie.insert(pattern_key(attribute_types_from_pattern(pattern), optional_types))
+                for pattern in self.patterns
+            ], dtype=np.int64)
+            if level == 'prefix':
+                nodes = trie.ancestors(nodes, depth)
+            self.codes, group_nodes = pd.factorize(nodes)
+            self.labels = [format_pattern(trie.sequence(node)) for node in group_nodes]
+        self._pattern_codes = dict(zip(self.patterns, self.codes.tolist()))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def group_of(self, pattern: str) -> str:
+        """Label of the group a pattern belongs to."""
+        return self.labels[self._pattern_codes[pattern]]
+
+    def relabel(self, pattern_column: pd.Series) -> pd.Series:
+        """
+        Per-row group labels for a column of patterns, as a categorical.
+
+        Only the column's distinct patterns are looked up; patterns the
+        groups were not built from become missing.
+        """
+        row_codes, uniques = pd.factorize(pattern_column)
+        lookup = np.array([self._pattern_codes.get(pattern, -1) for pattern in uniques] + [-1], dtype=np.int64)
+        # row_codes is -1 for a missing pattern, which picks the trailing -1
+        codes = lookup[row_codes]
+        return pd.Series(pd.Categorical.from_codes(codes, categories=self.labels),
+                         index=pattern_column.index, name=pattern_column.name)
+
+    def rollup(self, state: PatternState, keyword: Optional[str] = None,
+               total_shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS) -> pd.DataFrame:
+        """
+        Per-group stats from pattern totals (low-memory mode, saved states).
+
+        The state's aggregates are merged by group before anything is
+        derived, so average position (over the listings with one), spread
+        and per-keyword performance are as exact as for a single pattern.
+        Besides the PatternState.to_pattern_stats columns, each group gets
+        the number of patterns in it and its most common one (top_pattern).
+        """
+        labels = {pattern: self.group_of(pattern) for pattern in state.by_pattern(keyword)}
+        group_stats = state.relabel(labels).to_pattern_stats(keyword, total_shopping_results)
+        listings = {pattern: aggregate.count for pattern, aggregate in state.by_pattern(keyword).items()}
+        return self._with_members(group_stats, listings)
+
+    def rollup_rows(self, parsed_df: pd.DataFrame,
+                    total_shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS
+                    ) -> pd.DataFrame:
+        """rollup for parsed rows: calculate_pattern_stats with each row's group as its pattern."""
+        # Plain labels, so groups come out in name order as from rollup
+        labels = self.relabel(parsed_df['pattern']).astype(object)
+        group_stats = calculate_pattern_stats(parsed_df.assign(pattern=labels), total_shopping_results)
+        listings = parsed_df.loc[parsed_df['title'].notna(), 'pattern'].value_counts()
+        return self._with_members(group_stats, listings[listings > 0].to_dict())
+
+    def _with_members(self, group_stats: pd.DataFrame, listings: Mapping[str, int]) -> pd.DataFrame:
+        """Add each group's number of member patterns and its most common one (ties by name)."""
+        members: dict[str, list] = {}
+        for pattern in sorted(listings, key=lambda pattern: (-listings[pattern], pattern)):
+            members.setdefault(self.group_of(pattern), []).append(pattern)
+        group_stats['patterns'] = [len(members[label]) for label in group_stats['pattern']]
+        group_stats['top_pattern'] = [members[label][0] for label in group_stats['pattern']]
+        return group_stats.reset_index(drop=True)
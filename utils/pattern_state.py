@@ -0,0 +1,275 @@
+"""
+Mergeable pattern statistics.
+
+A PatternState holds running totals per (keyword, pattern). Two states
+combine by adding their totals, so a daily scrape can be folded into a
+rolling window without reprocessing the raw data; usage and performance
+percentages are only derived when reading the state.
+"""
+import json
+import math
+from collections import Counter
+from typing import Iterable, Mapping, Optional, Union
+
+import pandas as pd
+
+from utils.analysis import DEFAULT_SHOPPING_RESULTS, finish_pattern_stats
+
+# Bump when the saved layout changes (format 1 files still load)
+STATE_FORMAT = 2
+
+
+def attribute_types_from_pattern(pattern: str) -> list[str]:
+    """"[Brand] + [Size]" -> ["Brand", "Size"]."""
+    if pattern == "[Unknown]":
+        return []
+    return [part[1:-1] for part in pattern.split(" + ")]
+
+
+def _min_seen(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max_seen(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    return b if a is None else a if b is None else max(a, b)
+
+
+class PatternAggregate:
+    """
+    Running totals of listing positions for one pattern.
+
+    count is the number of listings; positions the number of them that
+    have a position, which the position totals are over.
+    """
+
+    __slots__ = ('count', 'positions', 'position_sum', 'position_sumsq', 'position_min', 'position_max',
+                 'first_seen', 'last_seen')
+
+    def __init__(self):
+        self.count = 0
+        self.positions = 0
+        self.position_sum = 0.0
+        self.position_sumsq = 0.0
+        self.position_min = float('inf')
+        self.position_max = float('-inf')
+        self.first_seen = None
+        self.last_seen = None
+
+    def add(self, count: int, positions: int, position_sum: float, position_sumsq: float,
+            position_min: float, position_max: float, seen: Optional[str] = None):
+        """Fold in the totals for a batch of listings (seen is an ISO date or None)."""
+        self.count += int(count)
+        self.positions += int(positions)
+        self.position_sum += float(position_sum)
+        self.position_sumsq += float(position_sumsq)
+        if positions:
+            self.position_min = min(self.position_min, float(position_min))
+            self.position_max = max(self.position_max, float(position_max))
+        self.first_seen = _min_seen(self.first_seen, seen)
+        self.last_seen = _max_seen(self.last_seen, seen)
+
+    def merge(self, other: "PatternAggregate"):
+        """Fold another aggregate into this one."""
+        self.add(other.count, other.positions, other.position_sum, other.position_sumsq,
+                 other.position_min, other.position_max)
+        self.first_seen = _min_seen(self.first_seen, other.first_seen)
+        self.last_seen = _max_seen(self.last_seen, other.last_seen)
+
+    @property
+    def avg_position(self) -> float:
+        """Mean position (NaN without any, as groupby's mean)."""
+        return self.position_sum / self.positions if self.positions else math.nan
+
+    @property
+    def position_std(self) -> float:
+        """Population standard deviation of the positions."""
+        if not self.positions:
+            return math.nan
+        variance = self.position_sumsq / self.positions - self.avg_position ** 2
+        return math.sqrt(max(variance, 0.0))
+
+    def to_list(self) -> list:
+        # No positions leaves min/max infinite, which JSON can't hold
+        position_min, position_max = (self.position_min, self.position_max) if self.positions else (None, None)
+        return [self.count, self.positions, self.position_sum, self.position_sumsq, position_min, position_max,
+                self.first_seen, self.last_seen]
+
+    @classmethod
+    def from_list(cls, values: list) -> "PatternAggregate":
+        aggregate = cls()
+        if len(values) == 7:
+            # Format 1 counted only listings with a position
+            values = [values[0], *values]
+        (aggregate.count, aggregate.positions, aggregate.position_sum, aggregate.position_sumsq,
+         position_min, position_max, aggregate.first_seen, aggregate.last_seen) = values
+        if aggregate.positions:
+            aggregate.position_min, aggregate.position_max = position_min, position_max
+        return aggregate
+
+
+class PatternState:
+    """
+    Per (keyword, pattern) aggregates that can be saved, loaded and merged.
+
+    Merging is associative and commutative (up to float rounding), so
+    per-day states can be combined in any grouping.
+    """
+
+    def __init__(self):
+        self.aggregates: dict[tuple[str, str], PatternAggregate] = {}
+        # Dictionary versions the patterns were parsed with
+        self.dictionary_versions: set = set()
+
+    def add(self, keyword: str, pattern: str, count: int, positions: int, position_sum: float,
+            position_sumsq: float, position_min: float, position_max: float, seen: Optional[str] = None):
+        key = ('' if pd.isna(keyword) else str(keyword), pattern)
+        aggregate = self.aggregates.get(key)
+        if aggregate is None:
+            aggregate = self.aggregates[key] = PatternAggregate()
+        aggregate.add(count, positions, position_sum, position_sumsq, position_min, position_max, seen)
+
+    def add_frame(self, df: pd.DataFrame, seen: Optional[str] = None):
+        """Fold listings with pattern, position and optional keyword columns (one row per listing)."""
+        if df.empty:
+            return
+        keywords = df['keyword'].fillna('') if 'keyword' in df.columns else pd.Series('', index=df.index)
+        positions = df['position'].astype(float)
+        grouped = pd.DataFrame({
+            'keyword': keywords,
+            'pattern': df['pattern'],
+            'position': positions,
+            'position_sq': positions ** 2,
+        }).groupby(['keyword', 'pattern'], sort=False).agg(
+            count=('position', 'size'),
+            positions=('position', 'count'),
+            position_sum=('position', 'sum'),
+            position_sumsq=('position_sq', 'sum'),
+            position_min=('position', 'min'),
+            position_max=('position', 'max'),
+        )
+        for (keyword, pattern), row in zip(grouped.index, grouped.itertuples(index=False)):
+            self.add(keyword, pattern, *row, seen=seen)
+
+    def update(self, other: "PatternState"):
+        """Fold another state into this one."""
+        for key, aggregate in other.aggregates.items():
+            self.aggregates.setdefault(key, PatternAggregate()).merge(aggregate)
+        self.dictionary_versions |= other.dictionary_versions
+
+    def merge(self, other: "PatternState") -> "PatternState":
+        """Return a new state with the totals of both."""
+        return merge_states([self, other])
+
+    def relabel(self, labels: Mapping[str, str]) -> "PatternState":
+        """New state with each pattern renamed to labels[pattern] (e.g. its group); renamed totals merge."""
+        relabelled = PatternState()
+        relabelled.dictionary_versions = set(self.dictionary_versions)
+        for (keyword, pattern), aggregate in self.aggregates.items():
+            key = (keyword, labels.get(pattern, pattern))
+            relabelled.aggregates.setdefault(key, PatternAggregate()).merge(aggregate)
+        return relabelled
+
+    def keywords(self) -> list[str]:
+        return sorted({keyword for keyword, _ in self.aggregates})
+
+    def by_pattern(self, keyword: Optional[str] = None) -> dict[str, PatternAggregate]:
+        """Collapse keywords (or keep just one) into per-pattern aggregates."""
+        patterns = {}
+        for (kw, pattern), aggregate in self.aggregates.items():
+            if keyword not in (None, 'All') and kw != keyword:
+                continue
+            patterns.setdefault(pattern, PatternAggregate()).merge(aggregate)
+        return patterns
+
+    def to_pattern_stats(self, keyword: Optional[str] = None,
+                         total_shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS
+                         ) -> pd.DataFrame:
+        """
+        Pattern stats in the calculate_pattern_stats layout, plus position
+        spread and first/last seen dates.
+
+        total_shopping_results can be a {keyword: results} mapping, as for
+        calculate_pattern_stats.
+        """
+        patterns = self.by_pattern(keyword)
+        names = sorted(patterns)
+        pattern_stats = pd.DataFrame({
+            'pattern': names,
+            'count': [patterns[p].count for p in names],
+            'avg_position': [patterns[p].avg_position for p in names],
+        })
+        total_listings = int(pattern_stats['count'].sum()) if names else 0
+        if isinstance(total_shopping_results, Mapping):
+            pattern_stats = finish_pattern_stats(pattern_stats, total_listings)
+            performance = self._performance(keyword, total_shopping_results)
+            pattern_stats['performance_pct'] = (
+                pattern_stats['pattern'].map(performance).astype(float).round(1).clip(0, 100)
+            )
+        else:
+            pattern_stats = finish_pattern_stats(pattern_stats, total_listings, total_shopping_results)
+
+        pattern_stats['position_std'] = [patterns[p].position_std for p in pattern_stats['pattern']]
+        pattern_stats['position_min'] = [patterns[p].position_min if patterns[p].positions else math.nan
+                                         for p in pattern_stats['pattern']]
+        pattern_stats['position_max'] = [patterns[p].position_max if patterns[p].positions else math.nan
+                                         for p in pattern_stats['pattern']]
+        pattern_stats['first_seen'] = [patterns[p].first_seen for p in pattern_stats['pattern']]
+        pattern_stats['last_seen'] = [patterns[p].last_seen for p in pattern_stats['pattern']]
+        return pattern_stats
+
+    def _performance(self, keyword: Optional[str], total_shopping_results: Mapping[str, int]) -> dict[str, float]:
+        """Per pattern, the mean of each listing's performance against its own keyword's results."""
+        totals = {}
+        for (kw, pattern), aggregate in self.aggregates.items():
+            if keyword not in (None, 'All') and kw != keyword:
+                continue
+            results = total_shopping_results.get(kw, DEFAULT_SHOPPING_RESULTS)
+            # sum of (1 - position / results) over the listings, and how many there are
+            total = totals.setdefault(pattern, [0.0, 0])
+            total[0] += aggregate.positions - aggregate.position_sum / results
+            total[1] += aggregate.positions
+        return {pattern: total / positions * 100 if positions else math.nan
+                for pattern, (total, positions) in totals.items()}
+
+    def popular_attributes(self, keyword: Optional[str] = None) -> dict:
+        """Attribute type counts (as get_popular_attributes), most common first."""
+        attr_counts = Counter()
+        for pattern, aggregate in self.by_pattern(keyword).items():
+            for attr_type in attribute_types_from_pattern(pattern):
+                attr_counts[attr_type] += aggregate.count
+        return dict(attr_counts.most_common())
+
+    def to_dict(self) -> dict:
+        return {
+            'format': STATE_FORMAT,
+            'dictionary_versions': sorted(self.dictionary_versions),
+            'rows': [[keyword, pattern, *aggregate.to_list()]
+                     for (keyword, pattern), aggregate in self.aggregates.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PatternState":
+        if data.get('format') not in (1, STATE_FORMAT):
+            raise ValueError(f"unsupported pattern state format: {data.get('format')}")
+        state = cls()
+        state.dictionary_versions = set(data.get('dictionary_versions', []))
+        for keyword, pattern, *values in data['rows']:
+            state.aggregates[(keyword, pattern)] = PatternAggregate.from_list(values)
+        return state
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "PatternState":
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def merge_states(states: Iterable[PatternState]) -> PatternState:
+    """Combine any number of states (e.g. the last 90 daily snapshots)."""
+    merged = PatternState()
+    for state in states:
+        merged.update(state)
+    return merged
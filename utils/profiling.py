@@ -0,0 +1,172 @@
+"""
+Opt-in profiling of parse_title.
+
+Inside a profile_parsing() block every title parsed in this process records
+the time spent in each parse_title stage and per attribute type, plus which
+dictionary entries matched. Nothing is recorded (and almost nothing is
+spent) outside such a block. Cache hits skip parsing and are only counted;
+parse with workers=None to keep every title in the profiled process.
+
+    with profile_parsing() as profiler:
+        parse_titles_batch(titles, "groceries")
+    profiler.to_dict()
+    profiler.write_prometheus("parse_profile.prom")
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Stages of parse_title, in order
+STAGES = ["detect_category", "dictionary_scan", "brands", "attributes", "size", "quantity", "sort", "pattern",
+          "remaining"]
+
+_active: Optional["ParseProfiler"] = None
+
+
+class ParseProfiler:
+    """Cumulative per-stage and per-attribute timings and dictionary match counts."""
+
+    def __init__(self):
+        self.titles = 0
+        self.cache_hits = 0
+        self.stage_seconds: Counter = Counter()
+        self.stage_calls: Counter = Counter()
+        self.attribute_seconds: Counter = Counter()
+        self.attribute_calls: Counter = Counter()
+        # (attr_type, dictionary value) -> titles it was extracted from
+        self.matches: Counter = Counter()
+
+    def start(self) -> float:
+        """Start timing a title; returns the clock for the first lap."""
+        self.titles += 1
+        return time.perf_counter()
+
+    def lap(self, stage: str, since: float) -> float:
+        """Charge the time since `since` to a stage; returns the new clock."""
+        now = time.perf_counter()
+        self.stage_seconds[stage] += now - since
+        self.stage_calls[stage] += 1
+        return now
+
+    def lap_attribute(self, attr_type: str, since: float) -> float:
+        """Charge the time since `since` to one attribute type's lookup; returns the new clock."""
+        now = time.perf_counter()
+        self.attribute_seconds[attr_type] += now - since
+        self.attribute_calls[attr_type] += 1
+        return now
+
+    def record_match(self, attr_type: str, value: str):
+        self.matches[(attr_type, value)] += 1
+
+    def merge(self, other: "ParseProfiler"):
+        """Add another profiler's totals (e.g. from a worker process)."""
+        self.titles += other.titles
+        self.cache_hits += other.cache_hits
+        for mine, theirs in ((self.stage_seconds, other.stage_seconds), (self.stage_calls, other.stage_calls),
+                             (self.attribute_seconds, other.attribute_seconds),
+                             (self.attribute_calls, other.attribute_calls), (self.matches, other.matches)):
+            mine.update(theirs)
+
+    def dead_entries(self, category: str) -> dict[str, list[str]]:
+        """
+        Dictionary entries for a category that never matched while profiling.
+
+        Only meaningful after profiling a representative set of titles for
+        that category ('auto', 'auto-words' and 'all' check the combined
+        dictionaries).
+        """
+        from utils.categories import AUTO_CATEGORIES, get_category_index
+
+        index = get_category_index("all" if category in AUTO_CATEGORIES else category)
+        matched = {(attr_type, value.lower()) for attr_type, value in self.matches}
+        groups = {"brand": index.brands, **index.attributes}
+        return {
+            attr_type: [value for value in values if (attr_type, value.lower()) not in matched]
+            for attr_type, values in groups.items() if attr_type not in ("size", "quantity")
+        }
+
+    def to_dict(self) -> dict:
+        total = sum(self.stage_seconds.values())
+        return {
+            "titles": self.titles,
+            "cache_hits": self.cache_hits,
+            "total_seconds": total,
+            "stages": {
+                stage: {
+                    "seconds": self.stage_seconds[stage],
+                    "calls": self.stage_calls[stage],
+                    "share": self.stage_seconds[stage] / total if total else 0.0,
+                }
+                for stage in STAGES if self.stage_calls[stage]
+            },
+            "attributes": {
+                attr_type: {
+                    "seconds": self.attribute_seconds[attr_type],
+                    "calls": self.attribute_calls[attr_type],
+                    "matches": sum(count for (t, _), count in self.matches.items() if t == attr_type),
+                }
+                for attr_type, _ in self.attribute_seconds.most_common()
+            },
+            "matches": [
+                {"attr_type": attr_type, "value": value, "count": count}
+                for (attr_type, value), count in self.matches.most_common()
+            ],
+        }
+
+    def to_prometheus(self, prefix: str = "title_parser") -> str:
+        """Prometheus text exposition format (counters)."""
+        def escape(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = [
+            f"# HELP {prefix}_titles_total Titles parsed while profiling.",
+            f"# TYPE {prefix}_titles_total counter",
+            f"{prefix}_titles_total {self.titles}",
+            f"# HELP {prefix}_cache_hits_total Titles served from the parse cache while profiling.",
+            f"# TYPE {prefix}_cache_hits_total counter",
+            f"{prefix}_cache_hits_total {self.cache_hits}",
+            f"# HELP {prefix}_stage_seconds_total Time spent in each parse_title stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            *(f'{prefix}_stage_seconds_total{{stage="{stage}"}} {self.stage_seconds[stage]:.9f}'
+              for stage in STAGES if self.stage_calls[stage]),
+            f"# HELP {prefix}_stage_calls_total Calls of each parse_title stage.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+            *(f'{prefix}_stage_calls_total{{stage="{stage}"}} {self.stage_calls[stage]}'
+              for stage in STAGES if self.stage_calls[stage]),
+            f"# HELP {prefix}_attribute_seconds_total Time spent looking up each attribute type.",
+            f"# TYPE {prefix}_attribute_seconds_total counter",
+            *(f'{prefix}_attribute_seconds_total{{attr_type="{escape(attr_type)}"}} {seconds:.9f}'
+              for attr_type, seconds in self.attribute_seconds.items()),
+            f"# HELP {prefix}_attribute_calls_total Lookups of each attribute type.",
+            f"# TYPE {prefix}_attribute_calls_total counter",
+            *(f'{prefix}_attribute_calls_total{{attr_type="{escape(attr_type)}"}} {calls}'
+              for attr_type, calls in self.attribute_calls.items()),
+            f"# HELP {prefix}_dictionary_matches_total Titles each dictionary entry was extracted from.",
+            f"# TYPE {prefix}_dictionary_matches_total counter",
+            *(f'{prefix}_dictionary_matches_total{{attr_type="{escape(attr_type)}",value="{escape(value)}"}} {count}'
+              for (attr_type, value), count in self.matches.items()),
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "title_parser"):
+        """Write to_prometheus() to a file (e.g. for node_exporter's textfile collector)."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(prefix))
+
+
+def get_active_profiler() -> Optional[ParseProfiler]:
+    """The profiler of the innermost profile_parsing() block, or None."""
+    return _active
+
+
+@contextmanager
+def profile_parsing(profiler: Optional[ParseProfiler] = None) -> Iterator[ParseProfiler]:
+    """Profile every parse in this process until the block exits."""
+    global _active
+    profiler = profiler or ParseProfiler()
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
@@ -0,0 +1,329 @@
+"""
+Streaming pattern analysis for scrape exports that don't fit in memory.
+
+The input is read in chunks and folded into running per-pattern aggregates,
+so memory depends on the number of patterns (plus distinct titles when
+deduplicating), not on the number of rows.
+"""
+import hashlib
+import os
+from concurrent.futures import Executor
+from itertools import repeat
+from typing import Iterator, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from config.attributes import get_dictionary_version
+from utils.analysis import DEFAULT_SHOPPING_RESULTS, drop_missing_titles, filter_keyword, normalize_titles
+from utils.arrow_io import iter_arrow_batches, read_table, scrape_format
+from utils.parse_cache import ParseStore
+from utils.pattern_state import PatternState
+from utils.title_parser import DEFAULT_ENGINE, PARSE_CHUNKSIZE, parse_titles_batch, parser_pool
+
+# The only input columns the analysis needs
+INPUT_COLUMNS = ['title', 'position', 'keyword']
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def iter_scrape_chunks(source, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read a scrape export in chunks, keeping only the analysis columns.
+
+    source is a path or file object; .parquet and .arrow/.feather/.ipc
+    names are read as Parquet and Arrow IPC, anything else as CSV.
+    """
+    fmt = scrape_format(source)
+    if fmt == 'parquet':
+        parquet = pq.ParquetFile(source)
+        columns = [col for col in INPUT_COLUMNS if col in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == 'arrow':
+        for batch in iter_arrow_batches(source, INPUT_COLUMNS, chunksize):
+            yield batch.to_pandas()
+    else:
+        with pd.read_csv(source, usecols=lambda col: col in INPUT_COLUMNS, chunksize=chunksize) as reader:
+            yield from reader
+
+
+def read_scrape(source) -> pd.DataFrame:
+    """Read a whole scrape export (CSV, Parquet or Arrow IPC), keeping only the analysis columns."""
+    if scrape_format(source) == 'csv':
+        return pd.read_csv(source, usecols=lambda col: col in INPUT_COLUMNS)
+    return read_table(source, INPUT_COLUMNS)
+
+
+def content_digest(source, blocksize: int = 1 << 20) -> str:
+    """
+    Hash of a scrape export's bytes (and its format), read in blocks.
+
+    Two files only share a digest if they have the same contents, so it
+    can key cached analyses where the row count alone would collide.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(scrape_format(source).encode())
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            while block := f.read(blocksize):
+                digest.update(block)
+    else:
+        source.seek(0)
+        while block := source.read(blocksize):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+class StreamingAnalysis:
+    """
+    Fold chunks of scrape rows into per-pattern aggregates.
+
+    With deduplicate=True a title's position is averaged over every row it
+    appears in (as deduplicate_titles does), so per-title sums are kept
+    until finish(). normalize=True also merges titles that differ only in
+    case or whitespace, and per_keyword=True deduplicates within each
+    keyword instead of across keywords, so a title that ranks for two
+    keywords counts (at its own position) for both. Without deduplicate
+    each chunk is folded straight into the pattern aggregates.
+
+    A saved state is kept per keyword, so it should be deduplicated per
+    keyword whatever the report does: keyword_state=True also fills
+    self.keyword_state that way (it is self.state when the two agree),
+    leaving pattern_stats as they would be without it.
+
+    The aggregates are a mergeable PatternState; seen (an ISO date) tags
+    them with the snapshot they came from.
+
+    Titles are parsed in executor if given, otherwise in a parser_pool()
+    started on first need and reused for every chunk until finish() or
+    close().
+    """
+
+    def __init__(self, category: str, keyword: Optional[str] = None, deduplicate: bool = True,
+                 workers: Optional[int] = 0, store: Optional[ParseStore] = None, max_examples: int = 0,
+                 seen: Optional[str] = None, engine: str = DEFAULT_ENGINE, normalize: bool = False,
+                 executor: Optional[Executor] = None, per_keyword: bool = False,
+                 keyword_state: bool = False):
+        self.category = category
+        self.keyword = keyword
+        self.deduplicate = deduplicate
+        self.workers = workers
+        self.store = store
+        self.max_examples = max_examples
+        self.seen = seen
+        self.engine = engine
+        self.normalize = normalize
+        self.per_keyword = per_keyword
+        self._executor = executor
+        self._owns_executor = executor is None
+
+        self.state = PatternState()
+        self.state.dictionary_versions.add(get_dictionary_version())
+        # Per-keyword deduplicated state, kept apart only when the report merges across keywords
+        self.keyword_state: Optional[PatternState] = None
+        self._keyword_titles: Optional[dict] = None
+        if keyword_state:
+            if deduplicate and not per_keyword:
+                self.keyword_state = PatternState()
+                self.keyword_state.dictionary_versions.add(get_dictionary_version())
+                self._keyword_titles = {}
+            else:
+                self.keyword_state = self.state
+        self.keywords_seen: set = set()
+        self.rows_read = 0
+        # Rows left out for having no title
+        self.rows_excluded = 0
+        # dedup key -> [position_sum, positions, first keyword, pattern, first title] (dedup mode only)
+        self._titles: dict[str, list] = {}
+        # pattern -> [(title, position, keyword), ...] kept for display
+        self._examples: dict[str, list] = {}
+
+    def _patterns_for(self, titles) -> dict[str, str]:
+        """Parse distinct titles (through the parse caches) and return {title: pattern}."""
+        titles = list(titles)
+        results = parse_titles_batch(titles, self.category, workers=self.workers, store=self.store,
+                                     engine=self.engine, executor=self._pool(len(titles)))
+        return {title: result['pattern'] for title, result in zip(titles, results)}
+
+    def _pool(self, titles: int) -> Optional[Executor]:
+        """The parser pool for a batch of titles (None parses them serially)."""
+        if self._executor is None and self._owns_executor and titles > PARSE_CHUNKSIZE:
+            self._executor = parser_pool(self.workers, self.category)
+            # Serial after all (workers of None or 1): don't try again
+            self._owns_executor = self._executor is not None
+        return self._executor
+
+    def close(self):
+        """Shut down the parser pool, if this analysis started one."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def add_chunk(self, chunk: pd.DataFrame):
+        """Fold one chunk of rows (title, position and optional keyword columns)."""
+        missing = [col for col in ('title', 'position') if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"input is missing required column(s): {', '.join(missing)}")
+
+        self.rows_read += len(chunk)
+        if 'keyword' in chunk.columns:
+            self.keywords_seen.update(chunk['keyword'].dropna().unique())
+        chunk, excluded = drop_missing_titles(chunk)
+        self.rows_excluded += excluded
+        chunk = filter_keyword(chunk, self.keyword)
+        if chunk.empty:
+            return
+
+        if self.deduplicate:
+            self._add_dedup_chunk(chunk)
+        else:
+            self._add_rows_chunk(chunk)
+
+    def _add_dedup_chunk(self, chunk: pd.DataFrame):
+        groupings = [(self._titles, self._group_titles(chunk, self.per_keyword))]
+        if self._keyword_titles is not None:
+            groupings.append((self._keyword_titles, self._group_titles(chunk, True)))
+
+        # Titles new to either grouping are parsed together
+        new_titles = pd.unique(np.concatenate([
+            grouped.loc[[key not in titles for key in grouped.index], 'title'].to_numpy(dtype=object)
+            for titles, grouped in groupings
+        ]))
+        patterns = self._patterns_for(new_titles)
+        for titles, grouped in groupings:
+            self._fold_titles(titles, grouped, patterns)
+
+    def _group_titles(self, chunk: pd.DataFrame, per_keyword: bool) -> pd.DataFrame:
+        """Per-title (or per keyword and title) position sums of a chunk."""
+        agg = {'position': ['sum', 'count'], 'title': 'first'}
+        if 'keyword' in chunk.columns:
+            agg['keyword'] = 'first'
+        keys = [(normalize_titles(chunk['title']) if self.normalize else chunk['title']).rename('key')]
+        if per_keyword and 'keyword' in chunk.columns:
+            keys.insert(0, chunk['keyword'].fillna('').rename('keyword_key'))
+        grouped = chunk.groupby(keys, sort=False).agg(agg)
+        grouped.columns = ['position_sum', 'positions', 'title', *(['keyword'] if 'keyword' in chunk.columns else [])]
+        return grouped
+
+    @staticmethod
+    def _fold_titles(titles: dict, grouped: pd.DataFrame, patterns: dict[str, str]):
+        keywords = grouped['keyword'] if 'keyword' in grouped.columns else repeat('')
+        for key, position_sum, positions, title, keyword in zip(grouped.index, grouped['position_sum'],
+                                                                grouped['positions'], grouped['title'], keywords):
+            state = titles.get(key)
+            if state is None:
+                titles[key] = [position_sum, positions, keyword, patterns[title], title]
+            else:
+                state[0] += position_sum
+                state[1] += positions
+                # 'first' skips missing keywords, so a later chunk may fill it in
+                if pd.isna(state[2]):
+                    state[2] = keyword
+
+    def _add_rows_chunk(self, chunk: pd.DataFrame):
+        patterns = self._patterns_for(chunk['title'].unique())
+        chunk = chunk.assign(pattern=chunk['title'].map(patterns))
+
+        self.state.add_frame(chunk, self.seen)
+
+        if self.max_examples:
+            keywords = chunk['keyword'] if 'keyword' in chunk.columns else [''] * len(chunk)
+            for title, position, keyword, pattern in zip(chunk['title'], chunk['position'], keywords, chunk['pattern']):
+                examples = self._examples.setdefault(pattern, [])
+                if len(examples) < self.max_examples:
+                    examples.append((title, position, keyword))
+
+    @staticmethod
+    def _titles_frame(titles: dict) -> pd.DataFrame:
+        """Per-title sums as listings with their average position."""
+        titles = pd.DataFrame.from_dict(
+            titles, orient='index', columns=['position_sum', 'positions', 'keyword', 'pattern', 'title']
+        )
+        with np.errstate(invalid='ignore', divide='ignore'):
+            titles['position'] = np.round(titles['position_sum'] / titles['positions'], 1)
+        return titles
+
+    def _finish_dedup(self):
+        """Turn per-title sums into average positions and fold them by pattern."""
+        if self._keyword_titles:
+            self.keyword_state.add_frame(self._titles_frame(self._keyword_titles), self.seen)
+            self._keyword_titles = {}
+        if not self._titles:
+            return
+        titles = self._titles_frame(self._titles)
+
+        self.state.add_frame(titles, self.seen)
+
+        if self.max_examples:
+            # Deduplicated listings are ordered by title (or normalized title)
+            titles = titles.sort_index()
+            for pattern, group in titles.groupby('pattern', sort=False):
+                self._examples[pattern] = list(zip(
+                    group['title'].iloc[:self.max_examples],
+                    group['position'].iloc[:self.max_examples],
+                    group['keyword'].iloc[:self.max_examples],
+                ))
+        self._titles = {}
+
+    def finish(self, total_shopping_results: Union[int, Mapping[str, int]] = DEFAULT_SHOPPING_RESULTS
+               ) -> tuple[pd.DataFrame, dict, pd.DataFrame]:
+        """
+        Returns: (pattern_stats, popular_attributes, examples)
+
+        pattern_stats has the calculate_pattern_stats columns (plus the
+        extra PatternState.to_pattern_stats ones), with performance against
+        total_shopping_results (an int or a {keyword: results} mapping);
+        examples holds up to
+        max_examples parsed listings per pattern.
+        """
+        if self.deduplicate:
+            self._finish_dedup()
+        self.close()
+
+        pattern_stats = self.state.to_pattern_stats(total_shopping_results=total_shopping_results)
+        popular_attrs = self.state.popular_attributes()
+
+        return pattern_stats, popular_attrs, self._example_frame()
+
+    def _example_frame(self) -> pd.DataFrame:
+        rows = [row for examples in self._examples.values() for row in examples]
+        if not rows:
+            return pd.DataFrame(columns=['title', 'position', 'keyword', 'pattern', 'attributes', 'attribute_types'])
+
+        titles = [row[0] for row in rows]
+        results = parse_titles_batch(titles, self.category, store=self.store, engine=self.engine)
+        return pd.DataFrame({
+            'title': titles,
+            'position': [row[1] for row in rows],
+            'keyword': [row[2] for row in rows],
+            'pattern': [result['pattern'] for result in results],
+            'attributes': [result['attributes'] for result in results],
+            'attribute_types': [[attr['type'] for attr in result['attributes']] for result in results],
+        })
+
+
+def stream_pattern_analysis(source, category: str, keyword: Optional[str] = None, deduplicate: bool = True,
+                            chunksize: int = DEFAULT_CHUNKSIZE, workers: Optional[int] = 0,
+                            store: Optional[ParseStore] = None, max_examples: int = 0,
+                            seen: Optional[str] = None, engine: str = DEFAULT_ENGINE,
+                            normalize: bool = False, per_keyword: bool = False,
+                            keyword_state: bool = False) -> StreamingAnalysis:
+    """
+    Analyze a scrape export chunk by chunk with bounded memory.
+
+    Returns the StreamingAnalysis: call finish() for the same
+    (pattern_stats, popular_attributes) as the in-memory path plus up to
+    max_examples parsed example listings per pattern, or use its state.
+    """
+    analysis = StreamingAnalysis(category, keyword, deduplicate, workers, store, max_examples, seen, engine,
+                                 normalize, per_keyword=per_keyword, keyword_state=keyword_state)
+    try:
+        for chunk in iter_scrape_chunks(source, chunksize):
+            analysis.add_chunk(chunk)
+    except BaseException:
+        analysis.close()
+        raise
+    return analysis
@@ -1,9 +1,21 @@
 """
 Title parser utility for extracting product attributes and patterns.
 """
+import os
 import re
-from typing import Optional
-from config.attributes import BRANDS, get_category_attributes, detect_category, get_brands_for_category
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+from typing import Iterator, Optional
+from config.attributes import ATTRIBUTES, get_dictionary_version
+from utils.arrow_strings import ArrowStrings
+from utils.categories import AUTO_CATEGORIES, detect_categories, get_category_index, score_category
+from utils.matcher import DictionaryMatcher, RegexBank
+from utils.parse_cache import ParseCache, ParseStore, copy_result
+from utils.profiling import get_active_profiler
+
+# LRU cache in front of parse_title (resize to 0 to disable)
+parse_cache = ParseCache(max_entries=100_000)
 
 
 def normalize(text: str) -> str:
@@ -42,52 +54,122 @@ def find_attribute_in_original(original_title: str, current_title: str, values:
     return None, -1, current_title
 
 
+def get_category_matcher(category: str) -> DictionaryMatcher:
+    """
+    Compiled matcher for brands and dictionary attributes of a category.
+    Built once per category and dictionary version; brands are always the first group.
+    """
+    return get_category_index(category).matcher
+
+
+def find_attribute_compiled(matcher: DictionaryMatcher, group: str, current_title: str,
+                            current_hits: list, original_positions: dict) -> tuple[Optional[str], int, str, list]:
+    """
+    Compiled equivalent of find_attribute_in_original.
+    Returns: (matched_value, position_in_original, remaining_title, remaining_hits)
+
+    current_hits is the matcher scan of current_title. The title is only
+    re-scanned when something was removed from it.
+    """
+    found = matcher.first_match(current_hits, group)
+    if found is None:
+        return None, -1, current_title, current_hits
+
+    value, key, start, end = found
+    remaining = current_title[:start] + current_title[end:]
+    remaining = re.sub(r'\s+', ' ', remaining).strip()  # Clean up extra spaces
+
+    # Position in ORIGINAL title for correct ordering
+    original_pos = original_positions.get(key, start)
+
+    return value, original_pos, remaining, matcher.scan(remaining.lower())
+
+
+# Quantity patterns, highest priority first
+QUANTITY_PATTERNS = [
+    # "x 24 Pack" or "x24 Pack" or "x 24 pack"
+    r'\bx\s?\d+\s?pack\b',
+    # "24 Pack" or "24 pack"
+    r'\b\d+\s?pack\b',
+    # "16 Piece" or "24 Piece"
+    r'\b\d+\s?piece\b',
+    # "224 Nappies" or "60 Wipes"
+    r'\b\d+\s?nappies\b',
+    r'\b\d+\s?wipes\b',
+    # "Set of 4"
+    r'\bset\s+of\s+\d+\b',
+    # "12pk"
+    r'\b\d+\s?pk\b',
+    # "x20" or "X20" (standalone, without "pack")
+    r'\bx\s?\d+\b',
+    # "Dozen"
+    r'\bdozen\b',
+    # "Single Pack" only - not standalone "Single" (too ambiguous)
+    r'\bsingle\s+pack\b',
+]
+
+# Size patterns, highest priority first
+SIZE_PATTERNS = [
+    # Nappy sizes: "Size 1 Newborn (Up to 5 kg)", "Size 2 Infant"
+    r'\bSize\s+\d+\s+\w+\s*\([^)]+\)',
+    r'\bSize\s+\d+\s+\w+',
+    # Size ranges: "600-800g", "1-2kg", "500-750ml"
+    r'\b\d+-\d+\s?kg\b',
+    r'\b\d+-\d+\s?g\b',
+    r'\b\d+-\d+\s?ml\b',
+    r'\b\d+-\d+\s?lbs?\b',
+    # Combined quantity + size with space: "6x 250ml", "6x 250mL", "12x 330ml"
+    r'\b\d+\s?x\s+\d+\s?ml\b',
+    r'\b\d+\s?x\s+\d+\s?g\b',
+    r'\b\d+\s?x\s+\d+(\.\d+)?\s?L\b',
+    # Combined quantity + size no space: "6x250ml", "12x330ml"
+    r'\b\d+x\d+\s?ml\b',
+    r'\b\d+x\d+\s?g\b',
+    r'\b\d+x\d+(\.\d+)?\s?L\b',
+    # Litres: "1.5L", "2 L", "1 Litre"
+    r'\b\d+(\.\d+)?\s?(L|Litre|Liter)\b',
+    # Millilitres: "500ml", "250 ml", "250mL"
+    r'\b\d+\s?m[lL]\b',
+    # Ounces: "12oz", "16 oz"
+    r'\b\d+\s?oz\b',
+    # Kilograms: "1.5kg", "1 kg"
+    r'\b\d+(\.\d+)?\s?kg\b',
+    # Grams: "500g", "250 g"
+    r'\b\d+\s?g\b',
+    # Pounds: "25 Pound", "5 lb", "10 lbs"
+    r'\b\d+\s?pounds?\b',
+    r'\b\d+\s?lbs?\b',
+]
+
+# Compiled once at import. Every quantity pattern needs a digit, "dozen" or
+# "single" and every size pattern needs a digit, so most titles skip the bank.
+QUANTITY_BANK = RegexBank(QUANTITY_PATTERNS, re.IGNORECASE, precheck=r'\d|dozen|single')
+SIZE_BANK = RegexBank(SIZE_PATTERNS, re.IGNORECASE, precheck=r'\d')
+
+
 def find_quantity_regex(original_title: str, current_title: str) -> tuple[Optional[str], int, str]:
     """
     Find quantity using regex patterns.
     Matches: "x 24 Pack", "x24 pack", "24 Pack", "Set of 4", "12pk", "Dozen", "Single"
     """
-    patterns = [
-        # "x 24 Pack" or "x24 Pack" or "x 24 pack"
-        r'\bx\s?\d+\s?pack\b',
-        # "24 Pack" or "24 pack"
-        r'\b\d+\s?pack\b',
-        # "16 Piece" or "24 Piece"
-        r'\b\d+\s?piece\b',
-        # "224 Nappies" or "60 Wipes"
-        r'\b\d+\s?nappies\b',
-        r'\b\d+\s?wipes\b',
-        # "Set of 4"
-        r'\bset\s+of\s+\d+\b',
-        # "12pk"
-        r'\b\d+\s?pk\b',
-        # "x20" or "X20" (standalone, without "pack")
-        r'\bx\s?\d+\b',
-        # "Dozen"
-        r'\bdozen\b',
-        # "Single Pack" only - not standalone "Single" (too ambiguous)
-        r'\bsingle\s+pack\b',
-    ]
-
     current_lower = current_title.lower()
-    original_lower = original_title.lower()
 
-    for pattern in patterns:
-        match = re.search(pattern, current_lower, re.IGNORECASE)
-        if match:
-            # Get the actual matched text from current title (preserve case)
-            start, end = match.start(), match.end()
-            matched_value = current_title[start:end]
+    found = QUANTITY_BANK.search(current_lower)
+    if found:
+        index, match = found
+        # Get the actual matched text from current title (preserve case)
+        start, end = match.start(), match.end()
+        matched_value = current_title[start:end]
 
-            # Remove from current title
-            remaining = current_title[:start] + current_title[end:]
-            remaining = re.sub(r'\s+', ' ', remaining).strip()
+        # Remove from current title
+        remaining = current_title[:start] + current_title[end:]
+        remaining = re.sub(r'\s+', ' ', remaining).strip()
 
-            # Find position in ORIGINAL title for correct ordering
-            original_match = re.search(pattern, original_lower, re.IGNORECASE)
-            original_pos = original_match.start() if original_match else start
+        # Find position in ORIGINAL title for correct ordering
+        original_match = QUANTITY_BANK.patterns[index].search(original_title.lower())
+        original_pos = original_match.start() if original_match else start
 
-            return matched_value, original_pos, remaining
+        return matched_value, original_pos, remaining
 
     return None, -1, current_title
 
@@ -97,54 +179,22 @@ def find_size_regex(original_title: str, current_title: str) -> tuple[Optional[s
     Find size using regex patterns.
     Matches: "500ml", "1.5L", "12oz", "500g", "1kg", "6x250ml", "6x 250mL", "Size 1 Newborn (Up to 5 kg)"
     """
-    patterns = [
-        # Nappy sizes: "Size 1 Newborn (Up to 5 kg)", "Size 2 Infant"
-        r'\bSize\s+\d+\s+\w+\s*\([^)]+\)',
-        r'\bSize\s+\d+\s+\w+',
-        # Size ranges: "600-800g", "1-2kg", "500-750ml"
-        r'\b\d+-\d+\s?kg\b',
-        r'\b\d+-\d+\s?g\b',
-        r'\b\d+-\d+\s?ml\b',
-        r'\b\d+-\d+\s?lbs?\b',
-        # Combined quantity + size with space: "6x 250ml", "6x 250mL", "12x 330ml"
-        r'\b\d+\s?x\s+\d+\s?ml\b',
-        r'\b\d+\s?x\s+\d+\s?g\b',
-        r'\b\d+\s?x\s+\d+(\.\d+)?\s?L\b',
-        # Combined quantity + size no space: "6x250ml", "12x330ml"
-        r'\b\d+x\d+\s?ml\b',
-        r'\b\d+x\d+\s?g\b',
-        r'\b\d+x\d+(\.\d+)?\s?L\b',
-        # Litres: "1.5L", "2 L", "1 Litre"
-        r'\b\d+(\.\d+)?\s?(L|Litre|Liter)\b',
-        # Millilitres: "500ml", "250 ml", "250mL"
-        r'\b\d+\s?m[lL]\b',
-        # Ounces: "12oz", "16 oz"
-        r'\b\d+\s?oz\b',
-        # Kilograms: "1.5kg", "1 kg"
-        r'\b\d+(\.\d+)?\s?kg\b',
-        # Grams: "500g", "250 g"
-        r'\b\d+\s?g\b',
-        # Pounds: "25 Pound", "5 lb", "10 lbs"
-        r'\b\d+\s?pounds?\b',
-        r'\b\d+\s?lbs?\b',
-    ]
+    found = SIZE_BANK.search(current_title)
+    if found:
+        index, match = found
+        # Get the actual matched text (preserve case)
+        start, end = match.start(), match.end()
+        matched_value = current_title[start:end]
 
-    for pattern in patterns:
-        match = re.search(pattern, current_title, re.IGNORECASE)
-        if match:
-            # Get the actual matched text (preserve case)
-            start, end = match.start(), match.end()
-            matched_value = current_title[start:end]
-
-            # Remove from current title
-            remaining = current_title[:start] + current_title[end:]
-            remaining = re.sub(r'\s+', ' ', remaining).strip()
+        # Remove from current title
+        remaining = current_title[:start] + current_title[end:]
+        remaining = re.sub(r'\s+', ' ', remaining).strip()
 
-            # Find position in ORIGINAL title for correct ordering
-            original_match = re.search(pattern, original_title, re.IGNORECASE)
-            original_pos = original_match.start() if original_match else start
+        # Find position in ORIGINAL title for correct ordering
+        original_match = SIZE_BANK.patterns[index].search(original_title)
+        original_pos = original_match.start() if original_match else start
 
-            return matched_value, original_pos, remaining
+        return matched_value, original_pos, remaining
 
     return None, -1, current_title
 
@@ -159,13 +209,53 @@ def get_remaining_label(category: str) -> str:
     return labels.get(category, "Product Type")
 
 
-def parse_title(title: str, category: str) -> dict:
+# Name of the parsing engine used unless another is asked for (see ENGINES)
+DEFAULT_ENGINE = "classic"
+
+
+def get_engine(name: str):
+    """The uncached parse function of a parsing engine."""
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"unknown parsing engine {name!r} (expected one of: {', '.join(ENGINES)})") from None
+
+
+def _cache_category(category: str, engine: str) -> str:
+    """Category that an engine's results are cached under (the category itself for the default engine)."""
+    return category if engine == DEFAULT_ENGINE else f"{category}:{engine}"
+
+
+def parse_title(title: str, category: str, engine: str = DEFAULT_ENGINE) -> dict:
+    """
+    Parse a product title and extract attributes with their positions.
+
+    Results are memoized in parse_cache; see parse_title_uncached for the
+    arguments and the returned dictionary, and ENGINES for engine.
+    """
+    parse = get_engine(engine)
+    version = get_dictionary_version()
+    cache_category = _cache_category(category, engine)
+    result = parse_cache.get(title, cache_category, version)
+    if result is None:
+        result = parse(title, category)
+        parse_cache.put(title, cache_category, version, result)
+    else:
+        profiler = get_active_profiler()
+        if profiler:
+            profiler.cache_hits += 1
+    return result
+
+
+def parse_title_uncached(title: str, category: str) -> dict:
     """
     Parse a product title and extract attributes with their positions.
 
     Args:
         title: The product title to parse
-        category: Product category (e.g., 'baby', 'sportswear', 'groceries', 'auto', 'all')
+        category: Product category (e.g., 'baby', 'sportswear', 'groceries', 'auto', 'all').
+            'auto-words' detects the category like 'auto' but only counts
+            whole-word indicators ("tee" doesn't match "steel").
 
     Returns:
         Dictionary with:
@@ -173,44 +263,57 @@ def parse_title(title: str, category: str) -> dict:
         - pattern: string like "[Brand] + [Product Type] + [Size]"
         - remaining: unparsed text (could be model name, etc.)
         - detected_category: the category used (useful when 'auto' is selected)
+        - category_confidence: the detected category's share of the
+          indicator score (0 for 'all'), or None if it wasn't detected
     """
+    # Stage timings, only inside a profile_parsing() block
+    profiler = get_active_profiler()
+    if profiler:
+        clock = profiler.start()
+
     # Auto-detect category if requested
-    if category == "auto":
-        category = detect_category(title)
+    confidence = None
+    if category in AUTO_CATEGORIES:
+        category, confidence = score_category(title, AUTO_CATEGORIES[category])
+        if profiler:
+            clock = profiler.lap("detect_category", clock)
 
     attributes = []
     original_title = title  # Keep original for position lookup
     remaining = title
     detected_category = category  # Track what category was used
 
-    # 1. Extract brands (can have multiple - retailer + product brand)
-    # Get category-filtered brands list
-    category_brands = get_brands_for_category(detected_category)
+    # Compiled matcher for category-filtered brands and dictionary attributes
+    matcher = get_category_matcher(detected_category)
+    hits = matcher.scan(original_title.lower())
+    original_positions = matcher.first_positions(hits)
+    if profiler:
+        clock = profiler.lap("dictionary_scan", clock)
 
+    # 1. Extract brands (can have multiple - retailer + product brand)
     # Loop to find all brands in the title
     for _ in range(3):  # Max 3 brands
-        brand, pos, remaining = find_attribute_in_original(original_title, remaining, category_brands)
+        brand, pos, remaining, hits = find_attribute_compiled(matcher, "brand", remaining, hits, original_positions)
         if brand:
             attributes.append({
                 "type": "Brand",
                 "value": brand,
                 "position": pos
             })
+            if profiler:
+                profiler.record_match("brand", brand)
         else:
             break
+    if profiler:
+        clock = profiler.lap("brands", clock)
+        stage_clock = clock
 
-    # 2. Extract category-specific attributes (except size and quantity - we use regex)
-    category_attrs = get_category_attributes(category)
-
-    for attr_type, values in category_attrs.items():
-        # Skip size and quantity - we'll use regex for those
-        if attr_type in ['size', 'quantity']:
-            continue
-
+    # 2. Extract category-specific attributes (size and quantity use regex below)
+    for attr_type in matcher.groups[1:]:
         # Allow multiple matches for variant and modifier (like we do for brands)
         if attr_type in ['variant', 'modifier']:
             for _ in range(3):  # Max 3 of each
-                value, pos, remaining = find_attribute_in_original(original_title, remaining, values)
+                value, pos, remaining, hits = find_attribute_compiled(matcher, attr_type, remaining, hits, original_positions)
                 if value:
                     display_type = attr_type.replace("_", " ").title()
                     attributes.append({
@@ -218,10 +321,12 @@ def parse_title(title: str, category: str) -> dict:
                         "value": value,
                         "position": pos
                     })
+                    if profiler:
+                        profiler.record_match(attr_type, value)
                 else:
                     break
         else:
-            value, pos, remaining = find_attribute_in_original(original_title, remaining, values)
+            value, pos, remaining, hits = find_attribute_compiled(matcher, attr_type, remaining, hits, original_positions)
             if value:
                 # Convert attr_type to display name (e.g., "product_type" -> "Product Type")
                 display_type = attr_type.replace("_", " ").title()
@@ -230,6 +335,12 @@ def parse_title(title: str, category: str) -> dict:
                     "value": value,
                     "position": pos
                 })
+                if profiler:
+                    profiler.record_match(attr_type, value)
+        if profiler:
+            clock = profiler.lap_attribute(attr_type, clock)
+    if profiler:
+        clock = profiler.lap("attributes", stage_clock)
 
     # 3. Extract size using regex (dynamic detection)
     size, pos, remaining = find_size_regex(original_title, remaining)
@@ -239,6 +350,8 @@ def parse_title(title: str, category: str) -> dict:
             "value": size,
             "position": pos
         })
+    if profiler:
+        clock = profiler.lap("size", clock)
 
     # 4. Extract quantity using regex (dynamic detection)
     quantity, pos, remaining = find_quantity_regex(original_title, remaining)
@@ -248,12 +361,18 @@ def parse_title(title: str, category: str) -> dict:
             "value": quantity,
             "position": pos
         })
+    if profiler:
+        clock = profiler.lap("quantity", clock)
 
     # 5. Sort attributes by their position in the original title
     attributes.sort(key=lambda x: x["position"])
+    if profiler:
+        clock = profiler.lap("sort", clock)
 
     # 6. Generate pattern string
     pattern = " + ".join([f"[{attr['type']}]" for attr in attributes])
+    if profiler:
+        clock = profiler.lap("pattern", clock)
 
     # 7. Clean up remaining text (could be model, description, etc.)
     remaining = re.sub(r'\s+', ' ', remaining).strip()
@@ -293,17 +412,307 @@ def parse_title(title: str, category: str) -> dict:
         # Regenerate pattern
         pattern = " + ".join([f"[{attr['type']}]" for attr in attributes])
 
+    if profiler:
+        profiler.lap("remaining", clock)
+
     return {
         "attributes": attributes,
         "pattern": pattern if pattern else "[Unknown]",
         "remaining": remaining,
         "detected_category": detected_category,
+        "category_confidence": confidence,
+    }
+
+
+# Characters stripped from both ends of the leftover text
+REMAINING_SEPARATORS = re.compile(r'^[\s\-\+,\|]+|[\s\-\+,\|]+$')
+WHITESPACE = re.compile(r'\s+')
+
+
+def _lowered(title: str) -> str:
+    """title.lower(), one character per character so offsets line up with title."""
+    lower = title.lower()
+    if len(lower) != len(title):
+        # A few characters lowercase to two ("İ"); keep the first
+        lower = "".join(ch.lower()[0] for ch in title)
+    return lower
+
+
+def _free_segments(length: int, spans: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """The [start, end) stretches of range(length) not covered by any span."""
+    segments = []
+    prev = 0
+    for start, end in sorted(spans):
+        if start > prev:
+            segments.append((prev, start))
+        prev = end
+    if length > prev:
+        segments.append((prev, length))
+    return segments
+
+
+def parse_title_spans(title: str, category: str) -> dict:
+    """
+    Span-based parse of a product title ('spans' engine).
+
+    Same stages and priorities as parse_title_uncached, but matches are
+    never cut out of the title. The dictionaries are scanned once over the
+    lowercased title, each match marks its characters as consumed, and
+    later searches skip hits that overlap consumed characters. Positions
+    are the offsets of the matches themselves, and every attribute also
+    gets its exact "span" ([start, end) in title).
+
+    The result differs from parse_title_uncached where that one depends on
+    rebuilding the title: a value repeated in the title is placed at the
+    occurrence that was matched rather than the first one, text on either
+    side of a removed match is not joined into a new match, and regexes
+    see the title's own whitespace.
+    """
+    confidence = None
+    if category in AUTO_CATEGORIES:
+        category, confidence = score_category(title, AUTO_CATEGORIES[category])
+
+    matcher = get_category_matcher(category)
+    hits = matcher.scan(_lowered(title))
+    consumed = bytearray(len(title))
+    spans = []
+    attributes = []
+
+    def take(attr_type: str, value: str, start: int, end: int):
+        consumed[start:end] = b"\x01" * (end - start)
+        spans.append((start, end))
+        attributes.append({"type": attr_type, "value": value, "position": start, "span": [start, end]})
+
+    # 1. Brands, then 2. category-specific attributes (variant and modifier up to 3 times)
+    for group in matcher.groups:
+        display_type = group.replace("_", " ").title()
+        for _ in range(3 if group in ("brand", "variant", "modifier") else 1):
+            found = matcher.first_match(hits, group, consumed)
+            if found is None:
+                break
+            value, _, start, end = found
+            take(display_type, value, start, end)
+
+    # 3. Size and 4. quantity, searched in the stretches of the title nothing consumed yet
+    for attr_type, bank in (("Size", SIZE_BANK), ("Quantity", QUANTITY_BANK)):
+        found = bank.search_segments(title, _free_segments(len(title), spans))
+        if found:
+            start, end = found[1].span()
+            take(attr_type, title[start:end], start, end)
+
+    # 5. Order by position in the title
+    attributes.sort(key=lambda x: x["position"])
+
+    # 6./7. Leftover text: what no match consumed, with whitespace collapsed and separators trimmed
+    remaining = "".join(title[start:end] for start, end in _free_segments(len(title), spans))
+    remaining = REMAINING_SEPARATORS.sub('', WHITESPACE.sub(' ', remaining).strip())
+
+    if remaining and len(remaining) > 2:
+        existing_product_type = next((attr for attr in attributes if attr["type"] == "Product Type"), None)
+        if existing_product_type:
+            existing_product_type["value"] = f"{existing_product_type['value']} {remaining}"
+        else:
+            # From the first to the last unconsumed character that survived the trimming
+            kept = [i for i, flag in enumerate(consumed) if not flag and not REMAINING_SEPARATORS.match(title[i])]
+            start, end = kept[0], kept[-1] + 1
+            attributes.append({
+                "type": get_remaining_label(category),
+                "value": remaining,
+                "position": start,
+                "span": [start, end],
+            })
+            attributes.sort(key=lambda x: x["position"])
+        remaining = ""
+
+    pattern = " + ".join([f"[{attr['type']}]" for attr in attributes])
+
+    return {
+        "attributes": attributes,
+        "pattern": pattern if pattern else "[Unknown]",
+        "remaining": remaining,
+        "detected_category": category,
+        "category_confidence": confidence,
     }
 
 
-def parse_titles_batch(titles: list[str], category: str) -> list[dict]:
-    """Parse multiple titles."""
-    return [parse_title(title, category) for title in titles]
+# Parsing engines by name. 'classic' is the behaviour the golden corpus in
+# equivalence/ pins down; 'spans' reports exact match spans instead.
+ENGINES = {
+    "classic": parse_title_uncached,
+    "spans": parse_title_spans,
+}
+
+
+def _init_worker(category: str):
+    """Build the compiled matchers once per worker process."""
+    # 'auto' can resolve to any category (or 'all') per title
+    categories = [*ATTRIBUTES, "all"] if category in AUTO_CATEGORIES else [category]
+    for name in categories:
+        get_category_matcher(name)
+
+
+def _parse_chunk(titles: list[str], category: str, engine: str = DEFAULT_ENGINE) -> list[dict]:
+    """
+    Parse titles in order, like parse_title on each.
+
+    For 'auto' and 'auto-words', the categories of all uncached titles are
+    detected in one detect_categories pass instead of title by title.
+    """
+    if category not in AUTO_CATEGORIES:
+        return [parse_title(title, category, engine) for title in titles]
+
+    parse = get_engine(engine)
+    version = get_dictionary_version()
+    cache_category = _cache_category(category, engine)
+    results = [parse_cache.get(title, cache_category, version) for title in titles]
+    missing = list(dict.fromkeys(title for title, result in zip(titles, results) if result is None))
+    profiler = get_active_profiler()
+    if profiler:
+        profiler.cache_hits += len(titles) - sum(result is None for result in results)
+    if not missing:
+        return results
+
+    parsed = {}
+    clock = time.perf_counter()
+    detected, confidence = detect_categories(missing, AUTO_CATEGORIES[category])
+    if profiler:
+        profiler.lap("detect_category", clock)
+    for title, detected_category, title_confidence in zip(missing, detected, confidence.tolist()):
+        parsed[title] = parse(title, detected_category)
+        parsed[title]["category_confidence"] = title_confidence
+        parse_cache.put(title, cache_category, version, parsed[title])
+
+    return [copy_result(parsed[title]) if result is None else result for title, result in zip(titles, results)]
+
+
+# Titles sent to a worker process at a time
+PARSE_CHUNKSIZE = 2000
+# Distinct titles looked up in the store, parsed and written back at a time
+STORE_BLOCKSIZE = 50_000
+
+
+def parse_titles_batch(titles: list[str], category: str, workers: Optional[int] = None,
+                       chunksize: int = PARSE_CHUNKSIZE, store: Optional[ParseStore] = None,
+                       engine: str = DEFAULT_ENGINE,
+                       executor: Optional[ProcessPoolExecutor] = None) -> list[dict]:
+    """
+    Parse multiple titles.
+
+    Args:
+        titles: Titles to parse, as a list or ArrowStrings. ArrowStrings are
+            turned into Python strings a chunk at a time.
+        category: Product category (same values as parse_title)
+        workers: Number of worker processes. None or 1 parses serially,
+            0 uses every CPU.
+        chunksize: Titles sent to a worker at a time
+        store: Optional persistent cache; only titles it doesn't have yet
+            are parsed, and their results are written back
+        engine: Parsing engine (see ENGINES)
+        executor: A parser_pool() to use instead of starting a pool for
+            this call (workers is then ignored)
+
+    Results are always in input order and identical to the serial path.
+    """
+    get_engine(engine)
+    if store is None:
+        return _parse_many(titles, category, workers, chunksize, engine, executor)
+
+    distinct = list(dict.fromkeys(titles))
+    blocks = iter_parsed_blocks(distinct, category, workers, chunksize, store, engine, executor)
+    if len(distinct) == len(titles):
+        # No repeats, so every result is already its own object
+        return list(chain.from_iterable(blocks))
+    results = dict(zip(distinct, chain.from_iterable(blocks)))
+    return [copy_result(results[title]) for title in titles]
+
+
+def iter_parsed_blocks(titles: list[str], category: str, workers: Optional[int] = None,
+                       chunksize: int = PARSE_CHUNKSIZE, store: Optional[ParseStore] = None,
+                       engine: str = DEFAULT_ENGINE, executor: Optional[ProcessPoolExecutor] = None,
+                       blocksize: int = STORE_BLOCKSIZE) -> Iterator[list[dict]]:
+    """
+    Parse distinct titles blockwise, yielding each block's results in order.
+
+    Arguments as in parse_titles_batch. Each block of blocksize titles is
+    looked up in the store, its missing titles parsed and written back
+    before the next one, so only one block of results is held at a time.
+    A pool is started (unless executor is given) the first time a block
+    needs one and kept for the following blocks.
+    """
+    get_engine(engine)
+    version = get_dictionary_version()
+    cache_category = _cache_category(category, engine)
+    pool, own_pool = executor, None
+    try:
+        for start in range(0, len(titles), blocksize):
+            if isinstance(titles, ArrowStrings):
+                block = titles.slice(start, start + blocksize)
+            else:
+                block = titles[start:start + blocksize]
+            known = store.get_many(block, cache_category, version) if store is not None else {}
+            missing = [title for title in block if title not in known]
+            if missing:
+                if pool is None and len(missing) > chunksize:
+                    pool = own_pool = parser_pool(workers, category)
+                # Serial unless there is a pool, which _parse_many would otherwise start for this block alone
+                parsed = dict(zip(missing, _parse_many(missing, category, workers if pool else None, chunksize,
+                                                       engine, pool)))
+                if store is not None:
+                    store.put_many(parsed, cache_category, version)
+                known.update(parsed)
+            yield [known[title] for title in block]
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown()
+
+
+def parser_pool(workers: Optional[int] = 0, category: str = "auto", mp_context=None) -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for parse_titles_batch(executor=...), to reuse across calls.
+
+    workers as in parse_titles_batch; returns None when that means serial
+    parsing. The caller shuts the pool down.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if not workers or workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                               initializer=_init_worker, initargs=(category,))
+
+
+def _parse_many(titles: list[str], category: str, workers: Optional[int], chunksize: int,
+                engine: str = DEFAULT_ENGINE, executor: Optional[ProcessPoolExecutor] = None) -> list[dict]:
+    """Parse titles serially or in a process pool (executor, or a new one), keeping input order."""
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    starts = range(0, len(titles), chunksize)
+
+    # A pool is not worth using for a single chunk
+    if (executor is None and (not workers or workers <= 1)) or len(titles) <= chunksize:
+        if isinstance(titles, ArrowStrings):
+            return [result for start in starts
+                    for result in _parse_chunk(titles.slice(start, start + chunksize), category, engine)]
+        return _parse_chunk(titles, category, engine)
+
+    if executor is not None:
+        return _map_chunks(executor, titles, category, chunksize, engine)
+    with parser_pool(min(workers, len(starts)), category) as executor:
+        return _map_chunks(executor, titles, category, chunksize, engine)
+
+
+def _map_chunks(executor: ProcessPoolExecutor, titles: list[str], category: str, chunksize: int,
+                engine: str) -> list[dict]:
+    """Parse chunks of titles in the pool; map() yields chunk results in submission order."""
+    starts = range(0, len(titles), chunksize)
+    # ArrowStrings become Python strings one chunk at a time, as they are sent
+    take = titles.slice if isinstance(titles, ArrowStrings) else lambda start, stop: titles[start:stop]
+    chunks = (take(start, start + chunksize) for start in starts)
+    results = []
+    for chunk_results in executor.map(_parse_chunk, chunks, repeat(category), repeat(engine)):
+        results.extend(chunk_results)
+    return results
 
 
 # Quick test